@@ -18,8 +18,11 @@ import random
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import Google Gemini
-from google import genai
 from google.genai import types
+from api_usage_tracker import create_genai_client
+from prediction_metrics import invalidate_prediction_metrics
+from match_scoring import score_line, count_matches, BONUS_FROM_MAIN_POOL
+import prize_payouts
 
 # Import Near-Miss Learning System
 try:
@@ -56,35 +59,16 @@ class AILotteryPredictor:
     """Optimized AI Lottery Predictor with focused game-specific analysis"""
     
     def __init__(self):
-        self.client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY_SNAP_LOTTERY"))
+        self.client = create_genai_client(os.environ.get("GOOGLE_API_KEY_SNAP_LOTTERY"), source='predictor')
         self.connection_string = os.environ.get("DATABASE_URL")
         self._initialize_tables()
     
     def _initialize_tables(self):
-        """Initialize prediction tables"""
+        """Initialize prediction tables (lottery_predictions itself is created by db_migrations)"""
         try:
             with psycopg2.connect(self.connection_string) as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
-                        CREATE TABLE IF NOT EXISTS lottery_predictions (
-                            id SERIAL PRIMARY KEY,
-                            game_type VARCHAR(50) NOT NULL,
-                            predicted_numbers INTEGER[] NOT NULL,
-                            bonus_numbers INTEGER[],
-                            confidence_score DECIMAL(5,4),
-                            prediction_method VARCHAR(100),
-                            reasoning TEXT,
-                            target_draw_date DATE,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            main_number_matches INTEGER DEFAULT 0,
-                            bonus_number_matches INTEGER DEFAULT 0,
-                            accuracy_percentage DECIMAL(5,2),
-                            prize_tier VARCHAR(50),
-                            validation_status VARCHAR(20) DEFAULT 'pending',
-                            ensemble_composition JSONB,
-                            model_weights JSONB
-                        );
-                        
                         CREATE TABLE IF NOT EXISTS model_performance_tracking (
                             id SERIAL PRIMARY KEY,
                             model_name VARCHAR(100) NOT NULL,
@@ -664,6 +648,7 @@ class AILotteryPredictor:
             
             response = self.client.models.generate_content(
                 model="gemini-2.5-pro",
+                operation='pattern_analysis_prediction',
                 contents=prompt,
                 config=types.GenerateContentConfig(
                     response_mime_type="application/json",
@@ -718,6 +703,7 @@ class AILotteryPredictor:
             
             response = self.client.models.generate_content(
                 model="gemini-2.5-pro",
+                operation='frequency_analysis_prediction',
                 contents=prompt,
                 config=types.GenerateContentConfig(
                     response_mime_type="application/json",
@@ -780,6 +766,7 @@ class AILotteryPredictor:
                 
                 response = self.client.models.generate_content(
                     model="gemini-2.5-pro",
+                    operation='statistical_regression_prediction',
                     contents=prompt,
                     config=types.GenerateContentConfig(
                         response_mime_type="application/json",
@@ -836,6 +823,7 @@ class AILotteryPredictor:
             
             response = self.client.models.generate_content(
                 model="gemini-2.5-pro",
+                operation='anomaly_detection_prediction',
                 contents=prompt,
                 config=types.GenerateContentConfig(
                     response_mime_type="application/json",
@@ -891,6 +879,7 @@ class AILotteryPredictor:
             
             response = self.client.models.generate_content(
                 model="gemini-2.5-pro",
+                operation='hybrid_mathematical_prediction',
                 contents=prompt,
                 config=types.GenerateContentConfig(
                     response_mime_type="application/json",
@@ -1112,6 +1101,7 @@ class AILotteryPredictor:
             # Generate prediction
             response = self.client.models.generate_content(
                 model="gemini-2.5-pro",
+                operation='intelligent_prediction',
                 contents=prediction_prompt,
                 config=types.GenerateContentConfig(
                     response_mime_type="application/json",
@@ -1283,6 +1273,7 @@ class AILotteryPredictor:
             
             response = self.client.models.generate_content(
                 model="gemini-2.5-pro",
+                operation='ai_prediction',
                 contents=prediction_prompt,
                 config=types.GenerateContentConfig(
                     response_mime_type="application/json",
@@ -1474,6 +1465,7 @@ class AILotteryPredictor:
                         logger.info(f"✅ Stored new {prediction.prediction_method} prediction for {prediction.game_type}")
                     
                     conn.commit()
+                    invalidate_prediction_metrics()
                     return True
         except Exception as e:
             logger.error(f"Error storing prediction: {e}")
@@ -1499,15 +1491,17 @@ class AILotteryPredictor:
                     actual_bonus = actual_bonus or []
                     
                     # Calculate matches
-                    main_matches = len(set(predicted_numbers) & set(actual_numbers))
-                    bonus_matches = len(set(predicted_bonus) & set(actual_bonus)) if predicted_bonus and actual_bonus else 0
+                    score = score_line(predicted_numbers, actual_numbers, predicted_bonus, actual_bonus)
+                    main_matches = score['main_matches']
+                    bonus_matches = score['bonus_matches']
                     
                     # Determine accuracy level
                     total_predicted = len(predicted_numbers)
                     accuracy_percentage = (main_matches / total_predicted) * 100 if total_predicted > 0 else 0
                     
-                    # Calculate prize tier (simplified)
-                    prize_tier = self.calculate_prize_tier(game_type, main_matches, bonus_matches)
+                    # Lotto's bonus ball comes from the main pool - it counts when it is among the predicted numbers
+                    tier_bonus = count_matches(predicted_numbers, actual_bonus) if game_type in BONUS_FROM_MAIN_POOL else bonus_matches
+                    prize_tier = self.calculate_prize_tier(game_type, main_matches, tier_bonus)
                     
                     # Update prediction with validation results
                     cur.execute("""
@@ -1523,11 +1517,10 @@ class AILotteryPredictor:
                             verified_at = NOW()
                         WHERE id = %s
                     """, (main_matches, bonus_matches, accuracy_percentage, prize_tier, 
-                          list(set(predicted_numbers) & set(actual_numbers)),
-                          list(set(predicted_bonus) & set(actual_bonus)) if predicted_bonus and actual_bonus else [],
-                          prediction_id))
+                          score['matched_main'], score['matched_bonus'], prediction_id))
                     
                     conn.commit()
+                    invalidate_prediction_metrics()
                     
                     validation_result = {
                         'prediction_id': prediction_id,
@@ -1540,8 +1533,8 @@ class AILotteryPredictor:
                         'bonus_matches': bonus_matches,
                         'accuracy_percentage': round(accuracy_percentage, 2),
                         'prize_tier': prize_tier,
-                        'matched_main_numbers': list(set(predicted_numbers) & set(actual_numbers)),
-                        'matched_bonus_numbers': list(set(predicted_bonus) & set(actual_bonus)) if predicted_bonus and actual_bonus else [],
+                        'matched_main_numbers': score['matched_main'],
+                        'matched_bonus_numbers': score['matched_bonus'],
                         'validation_status': 'validated'
                     }
                     
@@ -1553,56 +1546,9 @@ class AILotteryPredictor:
             return {'error': f'Validation failed: {str(e)}'}
     
     def calculate_prize_tier(self, game_type: str, main_matches: int, bonus_matches: int) -> str:
-        """Calculate prize tier based on matches"""
+        """Calculate prize tier based on matches (bonus_matches: bonus ball / PowerBall matched)"""
         try:
-            if game_type in ['POWERBALL', 'POWERBALL PLUS']:
-                if main_matches == 5 and bonus_matches == 1:
-                    return "Division 1"
-                elif main_matches == 5:
-                    return "Division 2"
-                elif main_matches == 4 and bonus_matches == 1:
-                    return "Division 3"
-                elif main_matches == 4:
-                    return "Division 4"
-                elif main_matches == 3 and bonus_matches == 1:
-                    return "Division 5"
-                elif main_matches == 3:
-                    return "Division 6"
-                elif main_matches == 2 and bonus_matches == 1:
-                    return "Division 7"
-                elif main_matches == 1 and bonus_matches == 1:
-                    return "Division 8"
-                elif bonus_matches == 1:
-                    return "Division 9"
-                else:
-                    return "No prize"
-            
-            elif game_type in ['LOTTO', 'LOTTO PLUS 1', 'LOTTO PLUS 2']:
-                if main_matches == 6:
-                    return "Division 1"
-                elif main_matches == 5:
-                    return "Division 2"  
-                elif main_matches == 4:
-                    return "Division 3"
-                elif main_matches == 3:
-                    return "Division 4"
-                else:
-                    return "No prize"
-            
-            elif game_type == 'DAILY LOTTO':
-                if main_matches == 5:
-                    return "Division 1"
-                elif main_matches == 4:
-                    return "Division 2"
-                elif main_matches == 3:
-                    return "Division 3"
-                elif main_matches == 2:
-                    return "Division 4"
-                else:
-                    return "No prize"
-            
-            return "No prize"
-            
+            return prize_payouts.prize_tier(game_type, main_matches, bonus_matches)
         except Exception as e:
             logger.error(f"Error calculating prize tier: {e}")
-            return "No prize"
\ No newline at end of file
+            return prize_payouts.NO_PRIZE
\ No newline at end of file
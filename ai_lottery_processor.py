@@ -10,17 +10,65 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import psycopg2
-from psycopg2.extras import DictCursor
-from google import genai
+from psycopg2.extras import execute_values
 from google.genai import types
+from api_usage_tracker import create_genai_client
 import traceback
 import time
 from screenshot_archival_system import ScreenshotArchivalSystem
+from screenshot_preprocessing import prepare_for_extraction
+from draw_extraction import ExtractionPipeline, DomParserBackend, GeminiVisionBackend
+from draw_events import DrawEvent, DRAW_INSERTED, DRAW_UPDATED, notify_draw_events, dispatch_draw_events
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Stored value -> value after saving a newer extraction of the same draw.
+# More complete data wins: numbers and dates come from the latest extraction
+# (they may be corrections), prize divisions only when at least as many were
+# read, and every other field only when the new extraction has it.
+DRAW_MERGE_RULES = {
+    'draw_date': 'EXCLUDED.draw_date',
+    'main_numbers': 'EXCLUDED.main_numbers',
+    'bonus_numbers': 'COALESCE(EXCLUDED.bonus_numbers, r.bonus_numbers)',
+    # json_array_length raises on anything but an array, so check the type first
+    'prize_divisions': """CASE
+            WHEN json_typeof(EXCLUDED.prize_divisions::TEXT::JSON) IS DISTINCT FROM 'array'
+                THEN COALESCE(r.prize_divisions, EXCLUDED.prize_divisions)
+            WHEN json_typeof(NULLIF(NULLIF(r.prize_divisions::TEXT, ''), 'null')::JSON) IS DISTINCT FROM 'array'
+                THEN EXCLUDED.prize_divisions
+            WHEN json_array_length(EXCLUDED.prize_divisions::TEXT::JSON)
+                  >= json_array_length(r.prize_divisions::TEXT::JSON)
+                THEN EXCLUDED.prize_divisions
+            ELSE r.prize_divisions END""",
+    'rollover_amount': 'COALESCE(EXCLUDED.rollover_amount, r.rollover_amount)',
+    'next_jackpot': 'COALESCE(EXCLUDED.next_jackpot, r.next_jackpot)',
+    'total_pool_size': 'COALESCE(EXCLUDED.total_pool_size, r.total_pool_size)',
+    'total_sales': 'COALESCE(EXCLUDED.total_sales, r.total_sales)',
+    'draw_machine': 'COALESCE(EXCLUDED.draw_machine, r.draw_machine)',
+    'next_draw_date': 'COALESCE(EXCLUDED.next_draw_date, r.next_draw_date)',
+}
+
+# One round trip for a whole batch. Draws whose merged values equal what is
+# stored are left untouched and return no row.
+DRAW_UPSERT_SQL = """
+    INSERT INTO lottery_results AS r (
+        lottery_type, draw_number, draw_date, main_numbers, bonus_numbers,
+        prize_divisions, rollover_amount, next_jackpot, total_pool_size,
+        total_sales, draw_machine, next_draw_date, created_at, updated_at
+    ) VALUES %s
+    ON CONFLICT (lottery_type, draw_number) DO UPDATE SET
+        {assignments},
+        updated_at = EXCLUDED.updated_at
+    WHERE {changed}
+    RETURNING id, lottery_type, draw_number, (xmax = 0) AS inserted
+""".format(
+    assignments=',\n        '.join(f"{column} = {rule}" for column, rule in DRAW_MERGE_RULES.items()),
+    changed='\n       OR '.join(f"({rule})::TEXT IS DISTINCT FROM r.{column}::TEXT"
+                                  for column, rule in DRAW_MERGE_RULES.items()),
+)
+
 class CompleteLotteryProcessor:
     def __init__(self):
         """Initialize processor with Gemini API client and archival system"""
@@ -28,8 +76,17 @@ class CompleteLotteryProcessor:
             api_key = os.environ.get("GOOGLE_API_KEY_SNAP_LOTTERY")
             if not api_key:
                 raise ValueError("GOOGLE_API_KEY_SNAP_LOTTERY environment variable not found")
-            self.client = genai.Client(api_key=api_key)
+            self.client = create_genai_client(api_key, source='processor')
             self.db_connection = None
+            self.last_preprocessing = {}
+            # What the draw events of the latest _save_extractions did
+            self.event_counts = {'draws_inserted': 0, 'draws_updated': 0,
+                                 'predictions_validated': 0, 'predictions_generated': 0}
+            # Parse the saved page first; the vision model only when that fails validation
+            gemini_backend = GeminiVisionBackend(self)
+            self.extraction_pipeline = ExtractionPipeline(
+                [DomParserBackend(), gemini_backend], verify_backend=gemini_backend
+            )
             self.archival_system = ScreenshotArchivalSystem()
             logger.info("AI Lottery Processor initialized successfully with archival system")
         except Exception as e:
@@ -58,9 +115,8 @@ class CompleteLotteryProcessor:
         logger.info(f"Starting AI processing for: {image_path} (Type: {lottery_type})")
         
         try:
-            # Read image file
-            with open(image_path, "rb") as f:
-                image_bytes = f.read()
+            # Crop to the results region, downscale and re-encode before upload
+            image_bytes, image_mime_type, self.last_preprocessing = prepare_for_extraction(image_path, lottery_type)
             
             # Create comprehensive extraction prompt
             extraction_prompt = f"""
@@ -134,10 +190,11 @@ class CompleteLotteryProcessor:
             # Call Gemini 2.5 Pro for extraction
             response = self.client.models.generate_content(
                 model="gemini-2.5-pro",
+                operation='results_extraction',
                 contents=[
                     types.Part.from_bytes(
                         data=image_bytes,
-                        mime_type="image/png",
+                        mime_type=image_mime_type,
                     ),
                     extraction_prompt
                 ],
@@ -168,7 +225,117 @@ class CompleteLotteryProcessor:
             logger.error(f"Error processing {image_path}: {e}")
             logger.error(traceback.format_exc())
             raise
+
+    def extract_draw(self, image_path: str, lottery_type: str) -> Dict[str, Any]:
+        """
+        Draw data for a capture from the first extraction backend whose output
+        validates - see draw_extraction. The 'extraction' key reports the backend,
+        confidence, rejected attempts and field agreement.
+        """
+        self.last_preprocessing = {}
+        return self.extraction_pipeline.run(image_path, lottery_type)
     
+    def process_ticket_image(self, image_path: str) -> Dict[str, Any]:
+        """
+        Extract the player's lines and draw details from a photographed lottery ticket
+        """
+        logger.info(f"Starting AI ticket processing for: {image_path}")
+
+        try:
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+
+            mime_type = "image/png" if image_path.lower().endswith('.png') else "image/jpeg"
+
+            extraction_prompt = """
+            You are analyzing a photo of a South African National Lottery ticket (a player's ticket, not a results screenshot).
+
+            Extract ALL the following data with EXACT values from the ticket:
+
+            - Lottery Type (LOTTO, POWERBALL or DAILY LOTTO)
+            - Draw Date (convert to YYYY-MM-DD format)
+            - Draw Number (if printed)
+            - Every played line (A, B, C...) with its main numbers in the order printed
+            - The PowerBall number for each line (POWERBALL tickets only)
+            - Whether LOTTO PLUS 1 / LOTTO PLUS 2 / POWERBALL PLUS is marked YES or NO
+
+            Return ONLY valid JSON in this exact format:
+            {
+                "lottery_type": "POWERBALL",
+                "draw_date": "2025-07-18",
+                "draw_number": "1632",
+                "all_lines": [[3, 11, 24, 35, 42], [7, 19, 22, 31, 48]],
+                "all_powerball": [5, 17],
+                "main_numbers": [3, 11, 24, 35, 42],
+                "powerball_number": 5,
+                "powerball_plus_included": "YES",
+                "lotto_plus_1_included": "NO",
+                "lotto_plus_2_included": "NO",
+                "extraction_confidence": 97
+            }
+
+            CRITICAL REQUIREMENTS:
+            - Use null for anything not visible on the ticket
+            - main_numbers and powerball_number repeat the first line
+            - Return only the JSON object, no other text
+            """
+
+            response = self.client.models.generate_content(
+                model="gemini-2.5-pro",
+                operation='ticket_extraction',
+                contents=[
+                    types.Part.from_bytes(
+                        data=image_bytes,
+                        mime_type=mime_type,
+                    ),
+                    extraction_prompt
+                ],
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    temperature=0.1,
+                ),
+            )
+
+            if not response.text:
+                raise ValueError("Empty response from Gemini API")
+
+            ticket_data = json.loads(response.text)
+            ticket_data['included_games'] = self.get_ticket_included_games(ticket_data)
+
+            logger.info(f"Ticket extraction completed with {ticket_data.get('extraction_confidence', 0)}% confidence")
+            logger.info(f"Ticket: {ticket_data.get('lottery_type')} Draw {ticket_data.get('draw_number')}, "
+                        f"{len(ticket_data.get('all_lines') or [])} lines, games {ticket_data['included_games']}")
+
+            return ticket_data
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Ticket JSON parsing error: {e}")
+            return {'error': 'Could not read the ticket - please try a clearer photo'}
+        except Exception as e:
+            logger.error(f"Error processing ticket {image_path}: {e}")
+            logger.error(traceback.format_exc())
+            return {'error': str(e)}
+
+    def get_ticket_included_games(self, ticket_data: Dict[str, Any]) -> List[str]:
+        """List every game a ticket takes part in, including the PLUS add-ons marked YES"""
+        lottery_type = (ticket_data.get('lottery_type') or '').upper()
+
+        if 'DAILY' in lottery_type:
+            return ['DAILY LOTTO']
+        if 'POWERBALL' in lottery_type:
+            games = ['POWERBALL']
+            if str(ticket_data.get('powerball_plus_included', '')).upper() == 'YES':
+                games.append('POWERBALL PLUS')
+            return games
+        if 'LOTTO' in lottery_type:
+            games = ['LOTTO']
+            if str(ticket_data.get('lotto_plus_1_included', '')).upper() == 'YES':
+                games.append('LOTTO PLUS 1')
+            if str(ticket_data.get('lotto_plus_2_included', '')).upper() == 'YES':
+                games.append('LOTTO PLUS 2')
+            return games
+        return []
+
     def clean_currency_value(self, value: Any) -> float:
         """
         Clean currency values by removing 'R' prefix and commas, then convert to float
@@ -185,155 +352,153 @@ class CompleteLotteryProcessor:
                 return None
         return None
     
-    def save_to_database(self, lottery_data: Dict[str, Any]) -> int:
+    def _draw_row(self, lottery_data: Dict[str, Any]) -> tuple:
+        """Values for DRAW_UPSERT_SQL from one extraction"""
+        draw_date = datetime.strptime(lottery_data['draw_date'], '%Y-%m-%d').date()
+        next_draw_date = None
+        if lottery_data.get('next_draw_date'):
+            next_draw_date = datetime.strptime(lottery_data['next_draw_date'], '%Y-%m-%d').date()
+        now = datetime.now()
+        return (
+            lottery_data['lottery_type'],
+            int(lottery_data['draw_id']),
+            draw_date,
+            json.dumps(lottery_data['winning_numbers']),
+            json.dumps(lottery_data['bonus_numbers']) if lottery_data.get('bonus_numbers') else None,
+            json.dumps(lottery_data.get('prize_divisions') or []),
+            self.clean_currency_value(lottery_data.get('rollover_amount')),
+            self.clean_currency_value(lottery_data.get('next_jackpot')),
+            self.clean_currency_value(lottery_data.get('total_pool_size')),
+            self.clean_currency_value(lottery_data.get('total_sales')),
+            lottery_data.get('draw_machine'),
+            next_draw_date,
+            now,
+            now
+        )
+
+    def save_batch(self, extractions: List[Dict[str, Any]]) -> List[int]:
         """
-        Save extracted lottery data to PostgreSQL database with duplicate prevention
+        Upsert extracted draws in one statement and one transaction; returns
+        the lottery_results id of each extraction, in order
         """
+        if not extractions:
+            return []
         try:
-            cursor = self.db_connection.cursor(cursor_factory=DictCursor)
-            
-            # Prepare data for insertion
-            draw_date = datetime.strptime(lottery_data['draw_date'], '%Y-%m-%d').date()
-            next_draw_date = None
-            if lottery_data.get('next_draw_date'):
-                next_draw_date = datetime.strptime(lottery_data['next_draw_date'], '%Y-%m-%d').date()
-            
-            # Check if this draw already exists (prevent duplicates)
-            check_query = """
-                SELECT id, main_numbers, prize_divisions 
-                FROM lottery_results 
-                WHERE lottery_type = %s AND draw_number = %s AND draw_date = %s
-                ORDER BY id DESC
-                LIMIT 1
-            """
-            
-            cursor.execute(check_query, (
-                lottery_data['lottery_type'],
-                lottery_data['draw_id'],
-                draw_date
-            ))
-            
-            existing_record = cursor.fetchone()
-            
-            if existing_record:
-                # Record exists - check if we should update it
-                existing_id = existing_record[0]
-                existing_numbers = existing_record[1]
-                existing_divisions = existing_record[2]
-                
-                new_numbers = json.dumps(lottery_data['winning_numbers'])
-                new_divisions = json.dumps(lottery_data['prize_divisions'])
-                
-                # Compare if the new data has more complete information
-                should_update = False
-                update_reasons = []
-                
-                # Check if new extraction has better prize division data
-                if existing_divisions is None or existing_divisions == '[]':
-                    if lottery_data.get('prize_divisions') and len(lottery_data['prize_divisions']) > 0:
-                        should_update = True
-                        update_reasons.append("adding prize divisions")
-                
-                # Check if numbers are different (might be a correction)
-                if existing_numbers != new_numbers:
-                    should_update = True
-                    update_reasons.append("updating numbers")
-                
-                if should_update:
-                    logger.info(f"Updating existing record ID {existing_id}: {', '.join(update_reasons)}")
-                    
-                    update_query = """
-                        UPDATE lottery_results SET
-                            main_numbers = %s,
-                            bonus_numbers = %s,
-                            prize_divisions = %s,
-                            rollover_amount = %s,
-                            next_jackpot = %s,
-                            total_pool_size = %s,
-                            total_sales = %s,
-                            draw_machine = %s,
-                            next_draw_date = %s,
-                            updated_at = %s
-                        WHERE id = %s
-                        RETURNING id
-                    """
-                    
-                    cursor.execute(update_query, (
-                        new_numbers,
-                        json.dumps(lottery_data['bonus_numbers']) if lottery_data.get('bonus_numbers') else None,
-                        new_divisions,
-                        self.clean_currency_value(lottery_data.get('rollover_amount')),
-                        self.clean_currency_value(lottery_data.get('next_jackpot')),
-                        self.clean_currency_value(lottery_data.get('total_pool_size')),
-                        self.clean_currency_value(lottery_data.get('total_sales')),
-                        lottery_data.get('draw_machine'),
-                        next_draw_date,
-                        datetime.now(),
-                        existing_id
-                    ))
-                    
-                    self.db_connection.commit()
-                    logger.info(f"Successfully updated record ID: {existing_id}")
-                    return existing_id
-                else:
-                    logger.info(f"Duplicate found but no update needed for {lottery_data['lottery_type']} Draw {lottery_data['draw_id']} - skipping")
-                    return existing_id
-            
-            # No existing record found - insert new one
-            insert_query = """
-                INSERT INTO lottery_results (
-                    lottery_type, draw_number, draw_date, main_numbers, bonus_numbers,
-                    prize_divisions, rollover_amount, next_jackpot, total_pool_size,
-                    total_sales, draw_machine, next_draw_date, created_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """
-            
-            cursor.execute(insert_query, (
-                lottery_data['lottery_type'],
-                lottery_data['draw_id'],
-                draw_date,
-                json.dumps(lottery_data['winning_numbers']),
-                json.dumps(lottery_data['bonus_numbers']) if lottery_data.get('bonus_numbers') else None,
-                json.dumps(lottery_data['prize_divisions']),
-                self.clean_currency_value(lottery_data.get('rollover_amount')),
-                self.clean_currency_value(lottery_data.get('next_jackpot')),
-                self.clean_currency_value(lottery_data.get('total_pool_size')),
-                self.clean_currency_value(lottery_data.get('total_sales')),
-                lottery_data.get('draw_machine'),
-                next_draw_date,
-                datetime.now()
-            ))
-            
-            record_id = cursor.fetchone()[0]
+            # A draw extracted twice keeps the later copy - one statement
+            # cannot update the same row twice
+            rows = {}
+            for lottery_data in extractions:
+                row = self._draw_row(lottery_data)
+                rows[row[:2]] = row
+
+            with self.db_connection.cursor() as cursor:
+                returned = execute_values(cursor, DRAW_UPSERT_SQL, list(rows.values()), fetch=True)
+                saved = {(row[1], row[2]): row for row in returned}
+                ids = {key: row[0] for key, row in saved.items()}
+                # Draws whose stored data was already as complete return nothing
+                unchanged = [key for key in rows if key not in saved]
+                if unchanged:
+                    cursor.execute("""
+                        SELECT id, lottery_type, draw_number FROM lottery_results
+                        WHERE (lottery_type, draw_number) IN %s
+                    """, (tuple(unchanged),))
+                    ids.update({(row[1], row[2]): row[0] for row in cursor.fetchall()})
+                events = [
+                    DrawEvent(DRAW_INSERTED if row[3] else DRAW_UPDATED, row[0], row[1], row[2])
+                    for row in saved.values()
+                ]
+                notify_draw_events(cursor, events)
             self.db_connection.commit()
-            
-            logger.info(f"Successfully saved new record to database with ID: {record_id}")
-            
-            # 🔮 ENHANCED WORKFLOW: Execute post-database-update workflow
-            try:
-                from enhanced_workflow_integration import get_workflow_orchestrator
-                orchestrator = get_workflow_orchestrator()
-                workflow_result = orchestrator.execute_post_database_update_workflow(
-                    lottery_type=lottery_data['lottery_type'],
-                    database_record_id=record_id
-                )
-                if workflow_result.get('workflow_complete'):
-                    logger.info(f"✅ Enhanced workflow complete for {lottery_data['lottery_type']}")
-                    logger.info(f"   - Predictions validated: {workflow_result['prediction_validation'].get('count', 0)}")
-                    logger.info(f"   - Predictions generated: {workflow_result['prediction_generation'].get('count', 0)}")
-                else:
-                    logger.warning(f"⚠️ Enhanced workflow incomplete: {workflow_result.get('error', 'Unknown error')}")
-            except Exception as orchestration_error:
-                logger.error(f"⚠️ Enhanced workflow failed: {orchestration_error}")
-                # Don't fail the main workflow if orchestration fails
-            
-            return record_id
-            
+
         except Exception as e:
             logger.error(f"Database save error: {e}")
             self.db_connection.rollback()
             raise
+
+        inserted = sum(1 for row in saved.values() if row[3])
+        logger.info(f"Saved {len(rows)} draws: {inserted} inserted, "
+                    f"{len(saved) - inserted} updated, {len(unchanged)} unchanged")
+        # Caches, indexes, model refresh and prediction validation/generation
+        # all hang off the draw events (see draw_events)
+        event_results = dispatch_draw_events(events)
+        self.event_counts['draws_inserted'] += inserted
+        self.event_counts['draws_updated'] += len(saved) - inserted
+        self.event_counts['predictions_validated'] += event_results.get('prediction_validation') or 0
+        self.event_counts['predictions_generated'] += event_results.get('prediction_generation') or 0
+
+        return [ids[(lottery_data['lottery_type'], int(lottery_data['draw_id']))] for lottery_data in extractions]
+
+    def save_to_database(self, lottery_data: Dict[str, Any]) -> int:
+        """
+        Save extracted lottery data to PostgreSQL database with duplicate prevention
+        """
+        return self.save_batch([lottery_data])[0]
+
+    def _save_extractions(self, extracted: List[Dict[str, Any]]) -> List[tuple]:
+        """
+        (entry, record_id, error) for each extracted screenshot. Saved as one
+        batch; if that fails, draw by draw so one bad row does not sink the rest.
+        """
+        self.event_counts = dict.fromkeys(self.event_counts, 0)
+        if not extracted:
+            return []
+        try:
+            record_ids = self.save_batch([entry['lottery_data'] for entry in extracted])
+            return [(entry, record_id, None) for entry, record_id in zip(extracted, record_ids)]
+        except Exception as e:
+            logger.warning(f"Batch save failed ({e}) - saving draws one at a time")
+        outcomes = []
+        for entry in extracted:
+            try:
+                outcomes.append((entry, self.save_to_database(entry['lottery_data']), None))
+            except Exception as e:
+                outcomes.append((entry, None, e))
+        return outcomes
+    
+    def _extract_screenshot(self, filename: str, file_path: str) -> Dict[str, Any]:
+        """Extract one screenshot's draw, ready for _save_extractions"""
+        # Extract lottery type
+        lottery_type = self.get_lottery_type_from_filename(filename)
+        if lottery_type == "UNKNOWN":
+            raise ValueError(f"Could not determine lottery type from filename: {filename}")
+        
+        # Parse the saved page, falling back to AI vision
+        start_time = time.time()
+        lottery_data = self.extract_draw(file_path, lottery_type)
+        processing_time = time.time() - start_time
+        
+        # Validate confidence
+        confidence = lottery_data.get('extraction_confidence', 0)
+        if confidence < 95:
+            logger.warning(f"Low confidence ({confidence}%) for {filename}")
+        
+        return {
+            "filename": filename,
+            "file_path": file_path,
+            "lottery_type": lottery_type,
+            "lottery_data": lottery_data,
+            "confidence": confidence,
+            "processing_time": processing_time,
+            # Preprocessing stats are per screenshot; keep a copy before the next one
+            "preprocessing": dict(self.last_preprocessing),
+        }
+    
+    def _processed_file(self, entry: Dict[str, Any], record_id: int) -> Dict[str, Any]:
+        lottery_data = entry['lottery_data']
+        return {
+            "filename": entry['filename'],
+            "lottery_type": entry['lottery_type'],
+            "draw_id": lottery_data.get('draw_id'),
+            "draw_date": lottery_data.get('draw_date'),
+            "confidence": entry['confidence'],
+            "record_id": record_id,
+            "processing_time": round(entry['processing_time'], 2),
+            "extraction_backend": lottery_data['extraction']['backend'],
+            "field_agreement": lottery_data['extraction']['field_agreement'],
+            "upload_bytes": entry['preprocessing'].get('prepared_bytes'),
+            "original_bytes": entry['preprocessing'].get('original_bytes'),
+            "status": "success"
+        }
     
     def get_lottery_type_from_filename(self, filename: str) -> str:
         """Extract lottery type from screenshot filename"""
@@ -380,63 +545,14 @@ class CompleteLotteryProcessor:
             
             logger.info(f"Processing batch of {len(screenshot_files)} screenshots")
             
-            # Process each screenshot in the batch
+            # Extract every screenshot in the batch, then save them together
+            extracted = []
             for i, filename in enumerate(screenshot_files, 1):
                 file_path = os.path.join(screenshots_dir, filename)
                 logger.info(f"Batch processing [{i}/{len(screenshot_files)}]: {filename}")
                 
                 try:
-                    # Extract lottery type
-                    lottery_type = self.get_lottery_type_from_filename(filename)
-                    if lottery_type == "UNKNOWN":
-                        raise ValueError(f"Could not determine lottery type from filename: {filename}")
-                    
-                    # Process with AI
-                    start_time = time.time()
-                    lottery_data = self.process_single_image(file_path, lottery_type)
-                    processing_time = time.time() - start_time
-                    
-                    # Validate confidence
-                    confidence = lottery_data.get('extraction_confidence', 0)
-                    if confidence < 95:
-                        logger.warning(f"Low confidence ({confidence}%) for {filename}")
-                    
-                    # Save to database
-                    record_id = self.save_to_database(lottery_data)
-                    
-                    # 📁 ARCHIVE SUCCESSFUL SCREENSHOT
-                    try:
-                        archive_result = self.archival_system.archive_successful_screenshot(
-                            screenshot_path=file_path,
-                            lottery_type=lottery_type,
-                            draw_number=lottery_data.get('draw_id', 0),
-                            draw_date=lottery_data.get('draw_date', datetime.now().strftime('%Y-%m-%d')),
-                            confidence=confidence,
-                            database_id=record_id
-                        )
-                        if archive_result.get('success'):
-                            logger.info(f"📁 Screenshot archived: {archive_result.get('archived_path')}")
-                        else:
-                            logger.warning(f"⚠️ Screenshot archival failed: {archive_result.get('error')}")
-                    except Exception as archive_error:
-                        logger.warning(f"⚠️ Screenshot archival error: {archive_error}")
-                        # Don't fail main workflow if archival fails
-                    
-                    # Record success
-                    results["total_success"] += 1
-                    results["processed_files"].append({
-                        "filename": filename,
-                        "lottery_type": lottery_type,
-                        "draw_id": lottery_data.get('draw_id'),
-                        "draw_date": lottery_data.get('draw_date'),
-                        "confidence": confidence,
-                        "record_id": record_id,
-                        "processing_time": round(processing_time, 2),
-                        "status": "success"
-                    })
-                    
-                    results["database_records"].append(record_id)
-                    logger.info(f"✓ BATCH SUCCESS: {filename} -> DB ID {record_id} ({confidence}% confidence, {processing_time:.1f}s)")
+                    extracted.append(self._extract_screenshot(filename, file_path))
                     
                     # Small delay between processing
                     time.sleep(0.5)
@@ -450,6 +566,46 @@ class CompleteLotteryProcessor:
                         "status": "failed"
                     })
             
+            for entry, record_id, error in self._save_extractions(extracted):
+                filename = entry['filename']
+                if error:
+                    logger.error(f"✗ BATCH FAILED: {filename} - {str(error)}")
+                    results["total_failed"] += 1
+                    results["failed_files"].append({
+                        "filename": filename,
+                        "error": str(error),
+                        "status": "failed"
+                    })
+                    continue
+                
+                lottery_data = entry['lottery_data']
+                
+                # 📁 ARCHIVE SUCCESSFUL SCREENSHOT
+                try:
+                    archive_result = self.archival_system.archive_successful_screenshot(
+                        screenshot_path=entry['file_path'],
+                        lottery_type=entry['lottery_type'],
+                        draw_number=lottery_data.get('draw_id', 0),
+                        draw_date=lottery_data.get('draw_date', datetime.now().strftime('%Y-%m-%d')),
+                        confidence=entry['confidence'],
+                        database_id=record_id
+                    )
+                    if archive_result.get('success'):
+                        logger.info(f"📁 Screenshot archived: {archive_result.get('archived_path')}")
+                    else:
+                        logger.warning(f"⚠️ Screenshot archival failed: {archive_result.get('error')}")
+                except Exception as archive_error:
+                    logger.warning(f"⚠️ Screenshot archival error: {archive_error}")
+                    # Don't fail main workflow if archival fails
+                
+                # Record success
+                results["total_success"] += 1
+                results["processed_files"].append(self._processed_file(entry, record_id))
+                results["database_records"].append(record_id)
+                logger.info(f"✓ BATCH SUCCESS: {filename} -> DB ID {record_id} "
+                            f"({entry['confidence']}% confidence, {entry['processing_time']:.1f}s)")
+            
+            results.update(self.event_counts)
             results["end_time"] = datetime.now().isoformat()
             logger.info(f"Batch processing complete: {results['total_success']}/{results['total_processed']} successful")
             
@@ -491,46 +647,14 @@ class CompleteLotteryProcessor:
             logger.info(f"=== STARTING AI PROCESSING WORKFLOW ===")
             logger.info(f"Found {len(screenshot_files)} screenshots to process")
             
-            # Process each screenshot individually
+            # Extract each screenshot individually, then save them together
+            extracted = []
             for i, filename in enumerate(screenshot_files, 1):
                 file_path = os.path.join(screenshots_dir, filename)
                 logger.info(f"Processing [{i}/{len(screenshot_files)}]: {filename}")
                 
                 try:
-                    # Extract lottery type
-                    lottery_type = self.get_lottery_type_from_filename(filename)
-                    if lottery_type == "UNKNOWN":
-                        raise ValueError(f"Could not determine lottery type from filename: {filename}")
-                    
-                    # Process with AI
-                    start_time = time.time()
-                    lottery_data = self.process_single_image(file_path, lottery_type)
-                    processing_time = time.time() - start_time
-                    
-                    # Validate confidence
-                    confidence = lottery_data.get('extraction_confidence', 0)
-                    if confidence < 95:
-                        logger.warning(f"Low confidence ({confidence}%) for {filename}")
-                    
-                    # Save to database
-                    record_id = self.save_to_database(lottery_data)
-                    
-                    # Record success
-                    results["total_success"] += 1
-                    results["processed_files"].append({
-                        "filename": filename,
-                        "lottery_type": lottery_type,
-                        "draw_id": lottery_data.get('draw_id'),
-                        "draw_date": lottery_data.get('draw_date'),
-                        "confidence": confidence,
-                        "record_id": record_id,
-                        "processing_time": round(processing_time, 2),
-                        "status": "success"
-                    })
-                    
-                    results["database_records"].append(record_id)
-                    
-                    logger.info(f"✓ SUCCESS: {filename} -> DB ID {record_id} ({confidence}% confidence, {processing_time:.1f}s)")
+                    extracted.append(self._extract_screenshot(filename, file_path))
                     
                     # Small delay between processing
                     time.sleep(1)
@@ -544,6 +668,27 @@ class CompleteLotteryProcessor:
                         "status": "failed"
                     })
             
+            for entry, record_id, error in self._save_extractions(extracted):
+                if error:
+                    logger.error(f"✗ FAILED: {entry['filename']} - {str(error)}")
+                    results["total_failed"] += 1
+                    results["failed_files"].append({
+                        "filename": entry['filename'],
+                        "error": str(error),
+                        "status": "failed"
+                    })
+                    continue
+                
+                # Record success
+                results["total_success"] += 1
+                results["processed_files"].append(self._processed_file(entry, record_id))
+                results["database_records"].append(record_id)
+                
+                logger.info(f"✓ SUCCESS: {entry['filename']} -> DB ID {record_id} "
+                            f"({entry['confidence']}% confidence, {entry['processing_time']:.1f}s)")
+            
+            results.update(self.event_counts)
+            
             # Close database connection
             if self.db_connection:
                 self.db_connection.close()
@@ -596,6 +741,8 @@ def process_screenshots_chunked(max_batch_size=6):
         total_success = 0
         total_failed = 0
         all_database_records = []
+        event_totals = {'draws_inserted': 0, 'draws_updated': 0,
+                        'predictions_validated': 0, 'predictions_generated': 0}
         
         # Split into chunks
         for i in range(0, len(screenshot_files), max_batch_size):
@@ -611,6 +758,8 @@ def process_screenshots_chunked(max_batch_size=6):
             total_success += batch_results.get('total_success', 0)
             total_failed += batch_results.get('total_failed', 0)
             all_database_records.extend(batch_results.get('database_records', []))
+            for key in event_totals:
+                event_totals[key] += batch_results.get(key, 0)
             
             logger.info(f"Batch {batch_num} complete: {batch_results.get('total_success', 0)}/{batch_results.get('total_processed', 0)} successful")
         
@@ -619,6 +768,7 @@ def process_screenshots_chunked(max_batch_size=6):
             "total_success": total_success,
             "total_failed": total_failed,
             "database_records": all_database_records,
+            **event_totals,
             "status": "chunked_processing_complete",
             "batches_processed": (len(screenshot_files) + max_batch_size - 1) // max_batch_size
         }
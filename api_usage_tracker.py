@@ -0,0 +1,261 @@
+"""
+Gemini API Usage Tracker
+Wraps every Gemini call to record model, image bytes, token counts, latency,
+retries, cache hits and failures.
+
+Each call is written to the compact gemini_api_calls table and folded into
+the gemini_api_daily rollup in the same transaction, so the admin API
+tracking page reads per-day cost and latency without scanning raw calls.
+Both tables are created by db_migrations (0009).
+"""
+
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Retries for transient Gemini errors (rate limits, overload, timeouts)
+GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', 2))
+GEMINI_RETRY_BACKOFF = float(os.environ.get('GEMINI_RETRY_BACKOFF', 2.0))
+
+# Estimated USD price per million tokens (input, output) - used for cost charts only
+MODEL_PRICING_PER_MILLION = {
+    'gemini-2.5-pro': (1.25, 10.00),
+    'gemini-2.5-flash': (0.30, 2.50),
+    'gemini-2.0-flash': (0.10, 0.40),
+    'gemini-2.0-flash-exp': (0.10, 0.40),
+}
+
+TRANSIENT_ERROR_MARKERS = ('429', '500', '503', 'RESOURCE_EXHAUSTED', 'UNAVAILABLE', 'DEADLINE_EXCEEDED', 'timed out')
+
+def estimate_cost(model, prompt_tokens, response_tokens):
+    """Estimated USD cost of a call from its token counts"""
+    input_price, output_price = MODEL_PRICING_PER_MILLION.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * input_price + (response_tokens or 0) * output_price) / 1_000_000
+
+
+def record_api_call(source, operation, model, status, latency_ms=0, image_bytes=0,
+                    prompt_tokens=None, response_tokens=None, total_tokens=None,
+                    retries=0, error=None):
+    """Store one call and update today's rollup - never raises"""
+    try:
+        from db_pool import get_db_connection
+
+        cost = estimate_cost(model, prompt_tokens, response_tokens)
+        is_call = status in ('success', 'error')
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO gemini_api_calls
+                        (source, operation, model, status, latency_ms, image_bytes,
+                         prompt_tokens, response_tokens, total_tokens, retries, error)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, (source, operation, model, status, int(latency_ms), image_bytes,
+                      prompt_tokens, response_tokens, total_tokens, retries,
+                      error[:500] if error else None))
+                cur.execute("""
+                    INSERT INTO gemini_api_daily AS d
+                        (day, source, operation, model, calls, failures, cache_hits, retries,
+                         total_latency_ms, max_latency_ms, image_bytes, prompt_tokens, response_tokens, cost_usd)
+                    VALUES (CURRENT_DATE, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (day, source, operation, model) DO UPDATE SET
+                        calls = d.calls + EXCLUDED.calls,
+                        failures = d.failures + EXCLUDED.failures,
+                        cache_hits = d.cache_hits + EXCLUDED.cache_hits,
+                        retries = d.retries + EXCLUDED.retries,
+                        total_latency_ms = d.total_latency_ms + EXCLUDED.total_latency_ms,
+                        max_latency_ms = GREATEST(d.max_latency_ms, EXCLUDED.max_latency_ms),
+                        image_bytes = d.image_bytes + EXCLUDED.image_bytes,
+                        prompt_tokens = d.prompt_tokens + EXCLUDED.prompt_tokens,
+                        response_tokens = d.response_tokens + EXCLUDED.response_tokens,
+                        cost_usd = d.cost_usd + EXCLUDED.cost_usd
+                """, (source, operation, model or 'unknown',
+                      1 if is_call else 0, 1 if status == 'error' else 0, 1 if status == 'cache_hit' else 0, retries,
+                      int(latency_ms) if is_call else 0, int(latency_ms) if is_call else 0,
+                      image_bytes, prompt_tokens or 0, response_tokens or 0, cost))
+    except Exception as e:
+        logger.warning(f"Failed to record Gemini API usage: {e}")
+
+
+def record_cache_hit(source, operation, model):
+    """Record a Gemini call that was avoided because the result was cached"""
+    record_api_call(source, operation, model, 'cache_hit')
+
+
+def record_skipped_call(source, operation, model, status='skipped_dom_parse'):
+    """
+    Record a Gemini call that was not needed at all (the saved page parsed).
+    Logged with its own status; neither a call nor a cache hit in the rollup.
+    """
+    record_api_call(source, operation, model, status)
+
+
+def _image_bytes(contents):
+    """Total inline image payload in a generate_content `contents` argument"""
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    total = 0
+    for part in contents:
+        inline_data = getattr(part, 'inline_data', None)
+        data = getattr(inline_data, 'data', None) if inline_data is not None else None
+        if isinstance(data, (bytes, bytearray)):
+            total += len(data)
+        elif isinstance(part, dict) and isinstance(part.get('data'), (bytes, bytearray)):
+            total += len(part['data'])
+    return total
+
+
+def _is_transient(error):
+    message = str(error)
+    return any(marker in message for marker in TRANSIENT_ERROR_MARKERS)
+
+
+class _TrackedModels:
+    """Stands in for client.models, timing and recording generate_content"""
+
+    def __init__(self, models, source):
+        self._models = models
+        self._source = source
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+    def generate_content(self, *args, model=None, contents=None, operation='generate_content', **kwargs):
+        # `operation` names the call in usage reports; it is not sent to Gemini
+        image_bytes = _image_bytes(contents)
+
+        retries = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                response = self._models.generate_content(*args, model=model, contents=contents, **kwargs)
+                break
+            except Exception as e:
+                if retries < GEMINI_MAX_RETRIES and _is_transient(e):
+                    retries += 1
+                    delay = GEMINI_RETRY_BACKOFF ** retries
+                    logger.warning(f"Gemini {operation} failed ({e}) - retry {retries} in {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+                record_api_call(self._source, operation, model, 'error',
+                                latency_ms=(time.perf_counter() - started) * 1000,
+                                image_bytes=image_bytes, retries=retries, error=str(e))
+                raise
+
+        usage = getattr(response, 'usage_metadata', None)
+        record_api_call(
+            self._source, operation, model, 'success',
+            latency_ms=(time.perf_counter() - started) * 1000,
+            image_bytes=image_bytes,
+            prompt_tokens=getattr(usage, 'prompt_token_count', None),
+            response_tokens=getattr(usage, 'candidates_token_count', None),
+            total_tokens=getattr(usage, 'total_token_count', None),
+            retries=retries,
+        )
+        return response
+
+
+class TrackedGenaiClient:
+    """genai.Client wrapper whose models.generate_content calls are tracked"""
+
+    def __init__(self, client, source):
+        self._client = client
+        self.models = _TrackedModels(client.models, source)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def create_genai_client(api_key, source):
+    """Create a tracked Gemini client - `source` names the component in reports"""
+    from google import genai
+    return TrackedGenaiClient(genai.Client(api_key=api_key), source)
+
+
+def get_usage_report(days=30):
+    """Rollup data for the API tracking page"""
+    from psycopg2.extras import RealDictCursor
+    from db_pool import get_db_connection
+
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT
+                    COALESCE(SUM(calls) FILTER (WHERE day = CURRENT_DATE), 0) AS today_requests,
+                    COALESCE(SUM(prompt_tokens + response_tokens) FILTER (WHERE day = CURRENT_DATE), 0) AS today_tokens,
+                    COALESCE(SUM(calls) FILTER (WHERE day = CURRENT_DATE - 1), 0) AS yesterday_requests,
+                    COALESCE(SUM(prompt_tokens + response_tokens) FILTER (WHERE day = CURRENT_DATE - 1), 0) AS yesterday_tokens,
+                    COALESCE(SUM(calls) FILTER (WHERE day >= date_trunc('week', CURRENT_DATE)), 0) AS week_requests,
+                    COALESCE(SUM(prompt_tokens + response_tokens) FILTER (WHERE day >= date_trunc('week', CURRENT_DATE)), 0) AS week_tokens,
+                    COALESCE(SUM(calls) FILTER (WHERE day >= date_trunc('month', CURRENT_DATE)), 0) AS month_requests,
+                    COALESCE(SUM(prompt_tokens + response_tokens) FILTER (WHERE day >= date_trunc('month', CURRENT_DATE)), 0) AS month_tokens,
+                    COALESCE(SUM(calls), 0) AS total_requests,
+                    COALESCE(SUM(prompt_tokens + response_tokens), 0) AS total_tokens,
+                    COALESCE(SUM(failures), 0) AS failures,
+                    COALESCE(SUM(cache_hits), 0) AS cache_hits,
+                    COALESCE(SUM(retries), 0) AS retries,
+                    COALESCE(SUM(cost_usd), 0) AS cost_usd,
+                    COALESCE(SUM(total_latency_ms), 0) AS total_latency_ms
+                FROM gemini_api_daily
+            """)
+            totals = cur.fetchone()
+
+            cur.execute("""
+                SELECT day,
+                       SUM(calls) AS calls,
+                       SUM(failures) AS failures,
+                       SUM(prompt_tokens + response_tokens) AS tokens,
+                       SUM(cost_usd) AS cost_usd,
+                       SUM(total_latency_ms) / NULLIF(SUM(calls), 0) AS avg_latency_ms,
+                       MAX(max_latency_ms) AS max_latency_ms
+                FROM gemini_api_daily
+                WHERE day > CURRENT_DATE - %s
+                GROUP BY day
+                ORDER BY day
+            """, (days,))
+            daily = cur.fetchall()
+
+            cur.execute("""
+                SELECT source, operation,
+                       SUM(calls) AS calls,
+                       SUM(failures) AS failures,
+                       SUM(cache_hits) AS cache_hits,
+                       SUM(retries) AS retries,
+                       SUM(total_latency_ms) / NULLIF(SUM(calls), 0) AS avg_latency_ms,
+                       MAX(max_latency_ms) AS max_latency_ms,
+                       SUM(total_latency_ms) AS total_latency_ms,
+                       SUM(image_bytes) AS image_bytes,
+                       SUM(prompt_tokens + response_tokens) AS tokens,
+                       SUM(cost_usd) AS cost_usd
+                FROM gemini_api_daily
+                WHERE day > CURRENT_DATE - %s
+                GROUP BY source, operation
+                ORDER BY SUM(total_latency_ms) DESC
+            """, (days,))
+            operations = cur.fetchall()
+
+            cur.execute("""
+                SELECT model, SUM(calls) AS count, SUM(prompt_tokens + response_tokens) AS tokens
+                FROM gemini_api_daily
+                GROUP BY model
+                ORDER BY SUM(calls) DESC
+            """)
+            models = cur.fetchall()
+
+            cur.execute("""
+                SELECT called_at AS created_at, source AS service, model, operation AS endpoint,
+                       status, total_tokens, latency_ms AS duration_ms, image_bytes, retries, error
+                FROM gemini_api_calls
+                ORDER BY called_at DESC
+                LIMIT 50
+            """)
+            recent = cur.fetchall()
+
+    return {
+        'totals': totals,
+        'daily': daily,
+        'operations': operations,
+        'models': models,
+        'recent': recent,
+    }
@@ -0,0 +1,120 @@
+"""
+Archive Blobs
+Content-addressed storage for screenshots_archive.
+
+Each distinct screenshot is stored once under blobs/<sha[:2]>/<sha>.png and
+the dated archive paths are hard links to it, so re-capturing an unchanged
+page costs a hash and a link - no extra bytes on disk. A blob is removed when
+its last archive link goes (st_nlink drops back to 1).
+
+An optional perceptual hash (64-bit dHash, needs Pillow) lets visually
+identical captures - same page, different PNG encoder output or timestamp
+pixels - share one blob too. Enable with ARCHIVE_PERCEPTUAL_DEDUP=true.
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+BLOB_DIRNAME = 'blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+PERCEPTUAL_DEDUP = os.environ.get('ARCHIVE_PERCEPTUAL_DEDUP', 'false').lower() == 'true'
+# Max differing dHash bits for two captures to count as the same image
+PERCEPTUAL_MAX_DISTANCE = int(os.environ.get('ARCHIVE_PHASH_DISTANCE', 2))
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def perceptual_hash(path):
+    """64-bit difference hash as a 16-char hex string, or None without Pillow"""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        with Image.open(path) as image:
+            pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash for {path}: {e}")
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = bits << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def hash_distance(a, b):
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+def blob_path(archive_base_path, sha256):
+    return os.path.join(archive_base_path, BLOB_DIRNAME, sha256[:2], f"{sha256}.png")
+
+
+def store_blob(source_path, archive_base_path, sha256, reuse_sha256=None):
+    """
+    Blob for the source, whose content hashes to sha256. reuse_sha256 names a
+    visually identical capture's blob, used only while it is still stored;
+    otherwise the source is copied in under its own hash if that is new.
+    Returns (blob path, sha256 of the blob, whether bytes were written).
+    """
+    if reuse_sha256:
+        path = blob_path(archive_base_path, reuse_sha256)
+        if os.path.exists(path):
+            return path, reuse_sha256, False
+    path = blob_path(archive_base_path, sha256)
+    if os.path.exists(path):
+        return path, sha256, False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Copy to a temp name and rename, so a blob is never visible half-written
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, sha256, True
+
+
+def link_blob(blob, archived_path):
+    """Hard-link a blob at its dated archive path (copy where links are unsupported)"""
+    try:
+        os.link(blob, archived_path)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        logger.warning(f"Hard link unavailable ({e}) - copying {os.path.basename(archived_path)}")
+        shutil.copy2(blob, archived_path)
+
+
+def release_blob(archive_base_path, sha256):
+    """Delete a blob once no archive path links to it any more"""
+    if not sha256:
+        return False
+    path = blob_path(archive_base_path, sha256)
+    try:
+        if os.stat(path).st_nlink <= 1:
+            os.remove(path)
+            return True
+    except FileNotFoundError:
+        pass
+    return False
@@ -0,0 +1,289 @@
+"""
+Archive Manifest
+SQLite index of everything in screenshots_archive.
+
+Every archive and delete updates one row in a transaction, so existence
+checks, statistics, duplicate detection and retention cleanup are indexed
+queries instead of walking the year/month/day tree and opening each
+_metadata.json. The per-screenshot metadata files are still written, so the
+archive stays self-describing and the manifest can be rebuilt from them.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from archive_blobs import hash_distance, release_blob
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = 'manifest.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    id INTEGER PRIMARY KEY,
+    lottery_type TEXT NOT NULL,
+    draw_number INTEGER,
+    draw_date TEXT,
+    screenshot_path TEXT NOT NULL UNIQUE,
+    metadata_path TEXT,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    archived_at TEXT,
+    metadata TEXT NOT NULL,
+    content_sha256 TEXT,
+    phash TEXT
+);
+"""
+
+# Columns added after the first manifest release, for upgrading existing files
+ADDED_COLUMNS = {'content_sha256': 'TEXT', 'phash': 'TEXT'}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_archives_draw ON archives (lottery_type, draw_number, draw_date);
+CREATE INDEX IF NOT EXISTS idx_archives_draw_date ON archives (draw_date);
+CREATE INDEX IF NOT EXISTS idx_archives_sha256 ON archives (content_sha256);
+CREATE INDEX IF NOT EXISTS idx_archives_phash ON archives (lottery_type, phash) WHERE phash IS NOT NULL;
+"""
+
+INSERT_SQL = """
+    INSERT OR REPLACE INTO archives
+        (lottery_type, draw_number, draw_date, screenshot_path, metadata_path,
+         size_bytes, archived_at, metadata, content_sha256, phash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_init_lock = threading.Lock()
+
+
+def _row(metadata: Dict, screenshot_path: str, metadata_path: Optional[str]) -> tuple:
+    return (
+        metadata.get('lottery_type') or 'Unknown',
+        metadata.get('draw_number'),
+        metadata.get('draw_date'),
+        screenshot_path,
+        metadata_path,
+        metadata.get('screenshot_size_bytes') or 0,
+        metadata.get('archived_at'),
+        json.dumps(metadata, default=str),
+        metadata.get('content_sha256'),
+        metadata.get('perceptual_hash'),
+    )
+
+
+class ArchiveManifest:
+    """
+    Manifest for one archive folder, stored inside it.
+
+    Connections are opened per operation (SQLite connections cannot be shared
+    across threads) in WAL mode, so readers never block the archiving writer.
+    """
+
+    def __init__(self, archive_base_path: str = "screenshots_archive"):
+        self.archive_base_path = archive_base_path
+        self.path = os.path.join(archive_base_path, MANIFEST_FILENAME)
+        os.makedirs(archive_base_path, exist_ok=True)
+        with _init_lock:
+            created = not os.path.exists(self.path)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                existing = {row['name'] for row in conn.execute("PRAGMA table_info(archives)")}
+                for column, column_type in ADDED_COLUMNS.items():
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE archives ADD COLUMN {column} {column_type}")
+                conn.executescript(INDEXES)
+            if created:
+                # First use on an existing archive - index what is already there
+                self.rebuild()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _entry(row) -> Dict:
+        entry = json.loads(row['metadata'])
+        entry['screenshot_path'] = row['screenshot_path']
+        entry['metadata_path'] = row['metadata_path']
+        return entry
+
+    def add(self, metadata: Dict, screenshot_path: str, metadata_path: Optional[str] = None):
+        """Record an archived screenshot (replacing any row for the same file)"""
+        with self._connect() as conn:
+            conn.execute(INSERT_SQL, _row(metadata, screenshot_path, metadata_path))
+
+    def remove(self, screenshot_paths: List[str]) -> int:
+        """Drop rows for screenshots that were deleted"""
+        if not screenshot_paths:
+            return 0
+        with self._connect() as conn:
+            cur = conn.executemany("DELETE FROM archives WHERE screenshot_path = ?",
+                                   [(path,) for path in screenshot_paths])
+            return cur.rowcount
+
+    def is_archived(self, lottery_type: str, draw_number: int, draw_date: Optional[str] = None) -> bool:
+        query = "SELECT 1 FROM archives WHERE lottery_type = ? AND draw_number = ?"
+        params = [lottery_type, draw_number]
+        if draw_date:
+            query += " AND draw_date = ?"
+            params.append(draw_date)
+        with self._connect() as conn:
+            return conn.execute(query + " LIMIT 1", params).fetchone() is not None
+
+    def entries(self, lottery_type: Optional[str] = None, date_prefix: Optional[str] = None,
+                before_date: Optional[str] = None) -> List[Dict]:
+        """
+        Archived screenshot metadata, newest draw first.
+
+        date_prefix matches 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD'; before_date
+        selects draws strictly earlier than a 'YYYY-MM-DD' date.
+        """
+        clauses, params = [], []
+        if lottery_type:
+            clauses.append("lottery_type = ?")
+            params.append(lottery_type)
+        if date_prefix:
+            # Range instead of LIKE so the draw_date index is used
+            clauses.append("draw_date >= ? AND draw_date < ?")
+            params.extend([date_prefix, date_prefix + '\uffff'])
+        if before_date:
+            clauses.append("draw_date < ?")
+            params.append(before_date)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT screenshot_path, metadata_path, metadata FROM archives {where} "
+                                f"ORDER BY draw_date DESC, id DESC", params).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def statistics(self) -> Dict:
+        with self._connect() as conn:
+            totals = conn.execute("""
+                SELECT COUNT(*), MIN(draw_date), MAX(draw_date), COALESCE(SUM(size_bytes), 0)
+                FROM archives
+            """).fetchone()
+            by_type = conn.execute("SELECT lottery_type, COUNT(*) FROM archives GROUP BY lottery_type").fetchall()
+        return {
+            'total_screenshots': totals[0],
+            'lottery_types': {row[0]: row[1] for row in by_type},
+            'oldest_date': totals[1],
+            'newest_date': totals[2],
+            'total_size_mb': round(totals[3] / (1024 * 1024), 2)
+        }
+
+    def duplicates(self) -> Dict:
+        """
+        {(lottery_type, draw_number): [entries, earliest archived first]} for
+        draws archived more than once
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT lottery_type, draw_number, screenshot_path, metadata_path, metadata
+                FROM archives
+                WHERE (lottery_type, draw_number) IN (
+                    SELECT lottery_type, draw_number FROM archives
+                    GROUP BY lottery_type, draw_number HAVING COUNT(*) > 1
+                )
+                ORDER BY lottery_type, draw_number, archived_at, id
+            """).fetchall()
+        groups = {}
+        for row in rows:
+            groups.setdefault((row['lottery_type'], row['draw_number']), []).append(self._entry(row))
+        return groups
+
+    def find_similar(self, lottery_type: str, draw_number: int, phash: str, max_distance: int) -> Optional[str]:
+        """
+        content_sha256 of an archived capture of the same draw whose perceptual
+        hash is within max_distance bits. Other draws never match: results
+        pages of one game differ only in a few digits.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT DISTINCT phash, content_sha256 FROM archives
+                WHERE lottery_type = ? AND draw_number = ?
+                  AND phash IS NOT NULL AND content_sha256 IS NOT NULL
+            """, (lottery_type, draw_number)).fetchall()
+        for row in rows:
+            if hash_distance(row['phash'], phash) <= max_distance:
+                return row['content_sha256']
+        return None
+
+    def storage_statistics(self) -> Dict:
+        """Logical archive size vs bytes actually stored, counting each content blob once"""
+        with self._connect() as conn:
+            logical, blobs = conn.execute(
+                "SELECT COALESCE(SUM(size_bytes), 0), COUNT(DISTINCT content_sha256) FROM archives"
+            ).fetchone()
+            stored = conn.execute("""
+                SELECT COALESCE(SUM(size_bytes), 0) FROM (
+                    SELECT MAX(size_bytes) AS size_bytes FROM archives
+                    GROUP BY COALESCE(content_sha256, screenshot_path)
+                )
+            """).fetchone()[0]
+        return {
+            'logical_size_mb': round(logical / (1024 * 1024), 2),
+            'distinct_blobs': blobs,
+            'stored_size_mb': round(stored / (1024 * 1024), 2)
+        }
+
+    def unique_draws(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM (SELECT DISTINCT lottery_type, draw_number FROM archives)").fetchone()[0]
+
+    def rebuild(self) -> int:
+        """
+        Re-index the archive from its _metadata.json files - the only full walk,
+        needed once for archives created before the manifest existed
+        """
+        records = []
+        for root, dirs, files in os.walk(self.archive_base_path):
+            for file in files:
+                if not file.endswith('_metadata.json'):
+                    continue
+                metadata_path = os.path.join(root, file)
+                try:
+                    with open(metadata_path, 'r') as f:
+                        metadata = json.load(f)
+                except Exception as e:
+                    logger.warning(f"Failed to read metadata {metadata_path}: {e}")
+                    continue
+                screenshot_path = os.path.join(root, file.replace('_metadata.json', '.png'))
+                if not metadata.get('screenshot_size_bytes') and os.path.exists(screenshot_path):
+                    metadata['screenshot_size_bytes'] = os.path.getsize(screenshot_path)
+                records.append((metadata, screenshot_path, metadata_path))
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM archives")
+            conn.executemany(INSERT_SQL, [_row(*record) for record in records])
+
+        logger.info(f"Archive manifest rebuilt: {len(records)} screenshots indexed at {datetime.now().isoformat()}")
+        return len(records)
+
+
+def remove_archived_files(entries: List[Dict], archive_base_path: Optional[str] = None) -> List[str]:
+    """
+    Delete screenshot + metadata files; returns the screenshot paths removed.
+    With archive_base_path, content blobs left without any archive link go too.
+    """
+    removed = []
+    for entry in entries:
+        try:
+            for path in (entry.get('screenshot_path'), entry.get('metadata_path')):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            removed.append(entry['screenshot_path'])
+            if archive_base_path:
+                release_blob(archive_base_path, entry.get('content_sha256'))
+        except Exception as e:
+            logger.warning(f"Failed to remove archived screenshot {entry.get('screenshot_path')}: {e}")
+    return removed
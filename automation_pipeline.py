@@ -0,0 +1,309 @@
+"""
+Automation Pipeline
+The nightly results automation as a DAG of steps:
+
+    cleanup -> capture[game] -> extract[game] -> save
+
+Each game moves through capture and extraction on its own, so one game is
+being extracted while another is still being captured. save joins the games
+and writes every extracted draw in one batch; the draw events it publishes
+validate and generate predictions (see draw_events). Steps run on per-lane
+thread pools, so browser captures and AI extractions have separate limits.
+
+Every finished step is checkpointed to a JSON file with its status, timing
+and artifact (screenshot path, extracted draw, saved record ids). A run that
+failed or stopped early is resumed by the next one: finished steps are
+reused while their artifacts still exist and nothing upstream of them ran
+again, so a failed extraction no longer means capturing every screenshot
+again.
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+AUTOMATION_CHECKPOINT_DIR = os.environ.get('AUTOMATION_CHECKPOINT_DIR', 'automation_runs')
+# Browsers open at once, and AI extractions in flight
+AUTOMATION_CAPTURE_WORKERS = int(os.environ.get('AUTOMATION_CAPTURE_WORKERS', 2))
+AUTOMATION_EXTRACT_WORKERS = int(os.environ.get('AUTOMATION_EXTRACT_WORKERS', 3))
+# An unfinished run older than this is started over rather than resumed
+AUTOMATION_RESUME_HOURS = float(os.environ.get('AUTOMATION_RESUME_HOURS', 12))
+
+# Lottery type -> screenshot name used by robust_screenshot_capture
+AUTOMATION_GAMES = {
+    'LOTTO': 'lotto',
+    'LOTTO PLUS 1': 'lotto_plus_1',
+    'LOTTO PLUS 2': 'lotto_plus_2',
+    'POWERBALL': 'powerball',
+    'POWERBALL PLUS': 'powerball_plus',
+    'DAILY LOTTO': 'daily_lotto',
+}
+
+STAGES = ('cleanup', 'capture', 'extract', 'save')
+
+STEP_DONE = 'done'
+STEP_FAILED = 'failed'
+STEP_BLOCKED = 'blocked'
+
+RUN_COMPLETE = 'complete'
+RUN_PARTIAL = 'partial'
+RUN_FAILED = 'failed'
+
+# join steps run on whatever their dependencies produced; the others need all of them
+Step = namedtuple('Step', ['name', 'stage', 'game', 'func', 'deps', 'lane', 'join', 'reusable'])
+
+# One processor (and Gemini client) per extraction thread
+_thread_state = threading.local()
+
+
+class StepFailed(Exception):
+    """Raised by a step whose work produced nothing usable"""
+
+
+# ========== Steps ==========
+
+def _cleanup(inputs):
+    from screenshot_capture import cleanup_old_screenshots
+    result = cleanup_old_screenshots()
+    if not result['success']:
+        raise StepFailed(result.get('error', 'Screenshot cleanup failed'))
+    return {'deleted': result['deleted_files']}
+
+
+def _capture(game, timestamp, inputs):
+    from screenshot_capture import capture_lottery_screenshot
+    screenshot = capture_lottery_screenshot(AUTOMATION_GAMES[game], timestamp)
+    if not screenshot:
+        raise StepFailed(f"No screenshot captured for {game}")
+    return {'screenshot': screenshot}
+
+
+def _get_processor():
+    processor = getattr(_thread_state, 'processor', None)
+    if processor is None:
+        from ai_lottery_processor import CompleteLotteryProcessor
+        processor = CompleteLotteryProcessor()
+        _thread_state.processor = processor
+    return processor
+
+
+def _extract(game, inputs):
+    screenshot = inputs[f"capture:{game}"]['screenshot']
+    return _get_processor()._extract_screenshot(os.path.basename(screenshot), screenshot)
+
+
+def _save(inputs):
+    """Save every extracted draw in one batch; its draw events do the prediction work"""
+    from ai_lottery_processor import CompleteLotteryProcessor
+    entries = [inputs[name] for name in sorted(inputs)]
+    processor = CompleteLotteryProcessor()
+    processor.connect_database()
+    try:
+        outcomes = processor._save_extractions(entries)
+    finally:
+        processor.db_connection.close()
+
+    records = {entry['lottery_type']: record_id for entry, record_id, error in outcomes if error is None}
+    failed = {entry['lottery_type']: str(error) for entry, record_id, error in outcomes if error is not None}
+    if failed:
+        raise StepFailed(f"Could not save {', '.join(f'{game} ({error})' for game, error in failed.items())}")
+    return {'records': records, **processor.event_counts}
+
+
+def build_steps(games, timestamp, until='save'):
+    """The automation DAG for the given games, up to and including stage `until`"""
+    steps = [Step('cleanup', 'cleanup', None, _cleanup, (), 'default', False, None)]
+    for game in games:
+        steps.append(Step(f"capture:{game}", 'capture', game, partial(_capture, game, timestamp),
+                          ('cleanup',), 'capture', False, lambda artifact: os.path.exists(artifact['screenshot'])))
+        steps.append(Step(f"extract:{game}", 'extract', game, partial(_extract, game),
+                          (f"capture:{game}",), 'extract', False, None))
+    steps.append(Step('save', 'save', None, _save, tuple(f"extract:{game}" for game in games),
+                      'default', True, None))
+    last = STAGES.index(until)
+    return [step for step in steps if STAGES.index(step.stage) <= last]
+
+
+# ========== Runner ==========
+
+def _record(step, status, seconds=0.0, artifact=None, error=None):
+    return {
+        'step': step.stage,
+        'game': step.game,
+        'status': status,
+        'seconds': round(seconds, 2),
+        'started_at': datetime.now().isoformat(),
+        'artifact': artifact,
+        'error': error,
+        'resumed': False,
+    }
+
+
+def _run_step(step, inputs):
+    started = time.perf_counter()
+    logger.info(f"Automation step {step.name} started")
+    try:
+        artifact = step.func(inputs)
+    except Exception as e:
+        logger.error(f"Automation step {step.name} failed: {e}")
+        return _record(step, STEP_FAILED, time.perf_counter() - started, error=str(e))
+    record = _record(step, STEP_DONE, time.perf_counter() - started, artifact=artifact)
+    logger.info(f"Automation step {step.name} done in {record['seconds']}s")
+    return record
+
+
+def run_steps(steps, previous=None, on_record=None, cancel=None):
+    """
+    Run steps as soon as their dependencies finish, each on its lane's pool.
+    Steps done in `previous` are reused when nothing they depend on ran again.
+    Once `cancel` (a threading.Event) is set, no further step starts.
+    Returns {step name: record}; on_record(name, record) sees each one as it lands.
+    """
+    previous = previous or {}
+    lanes = {'default': 1, 'capture': AUTOMATION_CAPTURE_WORKERS, 'extract': AUTOMATION_EXTRACT_WORKERS}
+    executors = {lane: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"automation-{lane}")
+                 for lane, workers in lanes.items()}
+    records = {}
+    rerun = set()
+    pending = list(steps)
+    running = {}
+
+    def land(name, record):
+        records[name] = record
+        if on_record:
+            on_record(name, record)
+
+    try:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for step in list(pending):
+                    if any(dep not in records for dep in step.deps):
+                        continue
+                    pending.remove(step)
+                    progressed = True
+                    inputs = {dep: records[dep]['artifact'] for dep in step.deps
+                              if records[dep]['status'] == STEP_DONE}
+                    if (step.deps and not inputs) or (not step.join and len(inputs) < len(step.deps)):
+                        land(step.name, _record(step, STEP_BLOCKED, error='An earlier step failed'))
+                        continue
+                    if cancel is not None and cancel.is_set():
+                        land(step.name, _record(step, STEP_BLOCKED, error='Run cancelled'))
+                        continue
+                    earlier = previous.get(step.name)
+                    if (earlier and earlier['status'] == STEP_DONE and not rerun.intersection(step.deps)
+                            and (step.reusable is None or step.reusable(earlier['artifact']))):
+                        land(step.name, dict(earlier, resumed=True))
+                        continue
+                    rerun.add(step.name)
+                    running[executors[step.lane].submit(_run_step, step, inputs)] = step
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                land(running.pop(future).name, future.result())
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+    return records
+
+
+# ========== Checkpoints ==========
+
+def _checkpoint_path():
+    return os.path.join(AUTOMATION_CHECKPOINT_DIR, 'latest.json')
+
+
+def load_checkpoint():
+    try:
+        with open(_checkpoint_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_checkpoint(state):
+    # Temp file + rename, so a crash mid-write never loses the last checkpoint
+    os.makedirs(AUTOMATION_CHECKPOINT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=AUTOMATION_CHECKPOINT_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, _checkpoint_path())
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _resumable(state):
+    return (state is not None and state.get('status') != RUN_COMPLETE
+            and time.time() - state.get('started', 0) < AUTOMATION_RESUME_HOURS * 3600)
+
+
+# ========== Entry point ==========
+
+def run_automation(until='save', games=None, resume=True, cancel=None):
+    """
+    Run the automation DAG up to stage `until`, resuming the last unfinished
+    run when there is one. Returns a summary with per-step timings.
+    """
+    games = games or list(AUTOMATION_GAMES)
+    state = load_checkpoint() if resume else None
+    resumed_run = _resumable(state)
+    if not resumed_run:
+        state = {'run_id': datetime.now().strftime('%Y%m%d_%H%M%S'), 'started': time.time(), 'steps': {}}
+    previous = dict(state['steps'])
+    state.update(status=RUN_PARTIAL, until=until)
+    logger.info(f"{'Resuming' if resumed_run else 'Starting'} automation run {state['run_id']} up to {until}")
+
+    def checkpoint(name, record):
+        state['steps'][name] = record
+        save_checkpoint(state)
+
+    started = time.perf_counter()
+    # Screenshots of a resumed run keep the run's timestamp
+    steps = build_steps(games, state['run_id'], until)
+    records = run_steps(steps, previous, on_record=checkpoint, cancel=cancel)
+
+    if any(record['status'] != STEP_DONE for record in records.values()):
+        state['status'] = RUN_FAILED
+    elif until == STAGES[-1]:
+        state['status'] = RUN_COMPLETE
+    save_checkpoint(state)
+
+    saved = records.get('save', {}).get('artifact') or {}
+    summary = {
+        'run_id': state['run_id'],
+        'status': state['status'],
+        'resumed': resumed_run,
+        'screenshots': sum(1 for s in steps if s.stage == 'capture' and records[s.name]['status'] == STEP_DONE),
+        'extracted': sum(1 for s in steps if s.stage == 'extract' and records[s.name]['status'] == STEP_DONE),
+        'records': saved.get('records', {}),
+        'draws_inserted': saved.get('draws_inserted', 0),
+        'draws_updated': saved.get('draws_updated', 0),
+        'predictions_validated': saved.get('predictions_validated', 0),
+        'predictions_generated': saved.get('predictions_generated', 0),
+        'errors': [f"{name}: {record['error']}" for name, record in records.items() if record['status'] == STEP_FAILED],
+        # What automation_logs.steps stores
+        'steps': [
+            {key: records[s.name][key] for key in ('step', 'game', 'status', 'seconds', 'resumed', 'error')}
+            for s in steps
+        ],
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    logger.info(f"Automation run {state['run_id']} {state['status']} in {summary['seconds']}s: "
+                f"{summary['screenshots']} screenshots, {summary['extracted']} extracted, "
+                f"{summary['draws_inserted']} inserted, {summary['draws_updated']} updated")
+    return summary
@@ -22,6 +22,8 @@ from psycopg2.extras import RealDictCursor
 
 # Import existing modules
 from ai_lottery_predictor import AILotteryPredictor
+from match_scoring import score_line, count_matches, BONUS_FROM_MAIN_POOL
+import prize_payouts
 from prediction_validation_system import PredictionValidationSystem
 from probability_estimator import ProbabilityEstimator
 from coverage_optimizer import CoverageOptimizer
@@ -109,6 +111,7 @@ class ComprehensiveBacktestingSystem:
             prize_tiers = {}
             confidence_scores = []
             all_predictions = []
+            scored_lines = []
             
             # Simulate predictions for each historical draw
             for i, draw in enumerate(historical_draws):
@@ -151,6 +154,8 @@ class ComprehensiveBacktestingSystem:
                     
                     prize_tier = validation_result['prize_tier']
                     prize_tiers[prize_tier] = prize_tiers.get(prize_tier, 0) + 1
+                    scored_lines.append((draw['draw_number'], main_match_count,
+                                         validation_result.get('bonus_hit', 0)))
                     
                     confidence_scores.append(prediction.get('confidence', 0.5))
                     all_predictions.append({
@@ -168,7 +173,7 @@ class ComprehensiveBacktestingSystem:
             
             # Calculate overall metrics
             accuracy_rate = self._calculate_accuracy_rate(main_matches, total_predictions)
-            roi_estimate = self._estimate_roi(prize_tiers, total_predictions)
+            roi_estimate = self._estimate_roi(config.game_type, scored_lines)
             
             # Get final model weights (approximated)
             model_weights = self._get_approximate_model_weights(config.prediction_method)
@@ -482,26 +487,18 @@ class ComprehensiveBacktestingSystem:
                            actual_draw: Dict[str, Any]) -> Dict[str, Any]:
         """Validate prediction against actual draw results"""
         try:
-            predicted_main = set(prediction['main_numbers'])
-            actual_main = set(actual_draw['main_numbers'])
-            
-            predicted_bonus = set(prediction.get('bonus_numbers', []))
-            actual_bonus = set(actual_draw.get('bonus_numbers', []))
-            
-            main_matches = len(predicted_main & actual_main)
-            bonus_matches = len(predicted_bonus & actual_bonus)
-            
-            # Determine prize tier
-            if main_matches >= 6 and bonus_matches > 0:
-                prize_tier = "Jackpot"
-            elif main_matches >= 5:
-                prize_tier = f"{main_matches} Match"
-            elif main_matches >= 3:
-                prize_tier = f"{main_matches} Match"
-            elif main_matches >= 2:
-                prize_tier = "2 Match"
+            score = score_line(prediction['main_numbers'], actual_draw['main_numbers'],
+                               prediction.get('bonus_numbers', []), actual_draw.get('bonus_numbers', []))
+            main_matches = score['main_matches']
+            bonus_matches = score['bonus_matches']
+            
+            # Determine prize tier - Lotto's bonus ball counts when it is among the main numbers
+            game_type = actual_draw.get('lottery_type')
+            if game_type in BONUS_FROM_MAIN_POOL:
+                bonus_hit = count_matches(prediction['main_numbers'], actual_draw.get('bonus_numbers', []))
             else:
-                prize_tier = "No Prize"
+                bonus_hit = bonus_matches
+            prize_tier = prize_payouts.prize_tier(game_type, main_matches, bonus_hit)
             
             accuracy = main_matches / len(prediction['main_numbers'])
             
@@ -510,8 +507,9 @@ class ComprehensiveBacktestingSystem:
                 'bonus_matches': bonus_matches,
                 'accuracy_percentage': accuracy * 100,
                 'prize_tier': prize_tier,
-                'matched_main': list(predicted_main & actual_main),
-                'matched_bonus': list(predicted_bonus & actual_bonus)
+                'bonus_hit': bonus_hit,
+                'matched_main': score['matched_main'],
+                'matched_bonus': score['matched_bonus']
             }
             
         except Exception as e:
@@ -539,31 +537,17 @@ class ComprehensiveBacktestingSystem:
         max_possible = total * 6 * 7  # Max matches * max weight
         return weighted_score / max_possible if max_possible > 0 else 0.0
     
-    def _estimate_roi(self, prize_tiers: Dict[str, int], total: int) -> float:
-        """Estimate return on investment based on prize tiers"""
-        if total == 0:
+    def _estimate_roi(self, game_type: str, scored_lines: List[Tuple[int, int, int]]) -> float:
+        """Exact ROI from the real division payouts of each draw - (draw_number, main, bonus) per prediction"""
+        if not scored_lines:
             return -1.0
         
-        # Simplified prize values (in ZAR)
-        prize_values = {
-            'Jackpot': 10000000,
-            '6 Match': 100000,
-            '5 Match': 5000,
-            '4 Match': 500,
-            '3 Match': 50,
-            '2 Match': 20,
-            'No Prize': 0
-        }
-        
-        total_winnings = sum(
-            prize_values.get(tier, 0) * count
-            for tier, count in prize_tiers.items()
-        )
-        
-        ticket_cost = 5  # R5 per ticket
-        total_cost = total * ticket_cost
-        
-        return (total_winnings - total_cost) / total_cost if total_cost > 0 else -1.0
+        try:
+            draw_numbers, main, bonus = zip(*scored_lines)
+            return prize_payouts.roi_for_matches(game_type, draw_numbers, main, bonus)['roi']
+        except Exception as e:
+            logger.error(f"Error calculating ROI for {game_type}: {e}")
+            return -1.0
     
     def _get_approximate_model_weights(self, method: str) -> Dict[str, float]:
         """Get approximate model weights for the prediction method"""
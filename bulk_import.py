@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Bulk Import
+Loads lottery results from CSV, JSON or NDJSON files in batches.
+
+Accepted inputs:
+- CSV or NDJSON/JSON Lines with one draw per row (the /admin/export_data
+  output round-trips)
+- JSON lists of draws, or objects keyed by lottery type - including the
+  historical_data_*.json / recent_draws_*.json page dumps, whose 'html' is
+  parsed with draw_extraction: parse_results_html for single-draw pages,
+  parse_archive_html (one draw per row) for archive and history pages
+
+Records are normalised and validated a batch at a time, COPYed into a
+temporary staging table and merged with one INSERT ... ON CONFLICT
+(lottery_type, draw_number) per batch, so re-running an import is a no-op:
+unchanged draws are not rewritten, and empty fields never overwrite values
+already stored.
+
+Usage:
+    python bulk_import.py recent_draws_20251003_203257.json
+    python bulk_import.py results.csv results.ndjson --dry-run
+"""
+
+import io
+import os
+import re
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from draw_events import DrawEvent, DRAW_INSERTED, DRAW_UPDATED, notify_draw_events, dispatch_draw_events
+
+logger = logging.getLogger(__name__)
+
+# Draws validated, COPYed and merged per transaction
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+
+# lottery_results columns written by the importer, in COPY order
+IMPORT_COLUMNS = (
+    'lottery_type', 'draw_number', 'draw_date', 'main_numbers', 'bonus_numbers',
+    'prize_divisions', 'rollover_amount', 'next_jackpot', 'total_pool_size',
+    'total_sales', 'draw_machine', 'next_draw_date',
+)
+# Always taken from the import; the rest only replace stored values when present
+OVERWRITE_COLUMNS = ('draw_date', 'main_numbers')
+
+JSON_COLUMNS = ('main_numbers', 'bonus_numbers', 'prize_divisions')
+MONEY_COLUMNS = ('rollover_amount', 'next_jackpot', 'total_pool_size', 'total_sales')
+DATE_COLUMNS = ('draw_date', 'next_draw_date')
+
+# Alternative field names used by the extraction output and older scripts
+FIELD_ALIASES = {
+    'game_type': 'lottery_type',
+    'draw_id': 'draw_number',
+    'winning_numbers': 'main_numbers',
+    'numbers': 'main_numbers',
+    'divisions': 'prize_divisions',
+}
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+URL_DATE_PATTERN = re.compile(
+    r'(\d{1,2})-(january|february|march|april|may|june|july|august|september|october|november|december)-(\d{4})'
+)
+
+# Pages listing many draws: /lotto/results/2025-archive, /lotto/results/history
+ARCHIVE_URL_PATTERN = re.compile(r'/results/(?:\d{4}-archive|history)/?$')
+
+MAX_REPORTED_REJECTIONS = 20
+
+
+class ImportRecordError(ValueError):
+    """A record that cannot be loaded"""
+
+
+# ========== Readers ==========
+
+def _from_page(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Draws from a saved results page ({'url', 'html', 'lottery_type'}): one for
+    a single-draw page, one per row for an archive or history page. A page
+    that yields nothing becomes a record carrying the reason, so it is
+    reported as rejected rather than silently dropped.
+    """
+    from draw_extraction import parse_results_html, parse_archive_html
+
+    url = record.get('url') or ''
+    lottery_type = record.get('lottery_type')
+    if '</html>' not in record['html'].lower():
+        return [{'lottery_type': lottery_type, 'source_url': url,
+                 'page_error': f"page is truncated ({len(record['html'])} characters)"}]
+
+    if ARCHIVE_URL_PATTERN.search(url):
+        draws = parse_archive_html(record['html'], lottery_type)
+        for data in draws:
+            data['source_url'] = data.get('source_url') or url
+        return draws or [{'lottery_type': lottery_type, 'source_url': url,
+                          'page_error': 'no draws found on the archive page'}]
+
+    data = parse_results_html(record['html'], lottery_type)
+    if not data.get('draw_date'):
+        # Single-draw pages carry the date in the URL, e.g. /results/01-october-2025
+        match = URL_DATE_PATTERN.search(url.lower())
+        if match:
+            day, month, year = match.groups()
+            data['draw_date'] = datetime.strptime(f"{day} {month} {year}", '%d %B %Y').strftime('%Y-%m-%d')
+    data['source_url'] = url
+    return [data]
+
+
+def _json_records(data: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict) and 'lottery_type' not in data and all(isinstance(v, list) for v in data.values()):
+        # {lottery_type: [draws or pages]}
+        for lottery_type, items in data.items():
+            for item in items:
+                if isinstance(item, dict):
+                    item.setdefault('lottery_type', lottery_type)
+                yield item
+    elif isinstance(data, dict):
+        yield data
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Raw records from a CSV, NDJSON/JSON Lines or JSON file"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if extension == '.csv':
+            yield from csv.DictReader(f)
+        elif extension in NDJSON_EXTENSIONS:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _json_records(json.load(f))
+
+
+def expand_pages(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Records as draws: saved pages become the draws parsed from them, the rest pass through"""
+    for record in records:
+        if isinstance(record, dict) and record.get('html'):
+            yield from _from_page(record)
+        else:
+            yield record
+
+
+# ========== Normalisation and validation ==========
+
+def _json_value(value: Any) -> Any:
+    """Lists/dicts as-is; JSON text (as stored by the older importers) decoded"""
+    if isinstance(value, str):
+        value = value.strip()
+        return json.loads(value) if value else None
+    return value
+
+
+def _money_value(value: Any) -> Optional[float]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    cleaned = re.sub(r'[^\d.]', '', str(value))
+    try:
+        return float(cleaned) if cleaned else None
+    except ValueError:
+        return None
+
+
+def _date_value(value: Any) -> Optional[str]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d')
+    # ISO timestamps from exports keep only their date part
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+
+
+def _numbers(value: Any) -> List[int]:
+    if isinstance(value, str) and value.strip().startswith('{'):
+        # {1,2,3} array literals
+        return [int(n) for n in re.findall(r'\d+', value)]
+    value = _json_value(value)
+    if not value:
+        return []
+    return [int(n) for n in value]
+
+
+def normalise_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """One import row keyed by IMPORT_COLUMNS, or ImportRecordError"""
+    if record.get('page_error'):
+        raise ImportRecordError(record['page_error'])
+    fields = {FIELD_ALIASES.get(key, key): value for key, value in record.items() if value not in (None, '')}
+
+    lottery_type = str(fields.get('lottery_type') or '').strip().upper()
+    if not lottery_type:
+        raise ImportRecordError('missing lottery_type')
+    try:
+        draw_number = int(str(fields.get('draw_number')).strip())
+    except (TypeError, ValueError):
+        raise ImportRecordError(f"draw number '{fields.get('draw_number')}' is not a number")
+
+    try:
+        prize_divisions = _json_value(fields.get('prize_divisions')) or None
+    except ValueError as e:
+        raise ImportRecordError(f"prize_divisions is not valid JSON ({e})")
+
+    try:
+        row = {
+            'lottery_type': lottery_type,
+            'draw_number': draw_number,
+            'main_numbers': sorted(_numbers(fields.get('main_numbers'))),
+            'bonus_numbers': _numbers(fields.get('bonus_numbers')),
+            'prize_divisions': prize_divisions,
+            'draw_machine': fields.get('draw_machine'),
+        }
+        for column in DATE_COLUMNS:
+            row[column] = _date_value(fields.get(column))
+        for column in MONEY_COLUMNS:
+            row[column] = _money_value(fields.get(column))
+    except (TypeError, ValueError) as e:
+        raise ImportRecordError(str(e))
+
+    from draw_extraction import validate_draw_data
+    errors = validate_draw_data({
+        'draw_id': row['draw_number'],
+        'draw_date': row['draw_date'],
+        'winning_numbers': row['main_numbers'],
+        'bonus_numbers': row['bonus_numbers'],
+    }, lottery_type)
+    if errors:
+        raise ImportRecordError('; '.join(errors))
+    return row
+
+
+def validate_batch(records: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Normalised rows and rejection messages for a batch. A draw repeated in
+    the batch keeps its last occurrence, since one INSERT ... ON CONFLICT
+    cannot touch the same row twice.
+    """
+    rows, rejected = {}, []
+    for record in records:
+        try:
+            row = normalise_record(record)
+        except ImportRecordError as e:
+            label = record.get('source_url') or record.get('url') or \
+                f"{record.get('lottery_type')} draw {record.get('draw_number') or record.get('draw_id')}"
+            rejected.append(f"{label}: {e}")
+            continue
+        rows[(row['lottery_type'], row['draw_number'])] = row
+    return list(rows.values()), rejected
+
+
+# ========== Loading ==========
+
+STAGING_SQL = f"""
+    CREATE TEMP TABLE import_staging ON COMMIT DROP AS
+    SELECT {', '.join(IMPORT_COLUMNS)} FROM lottery_results WITH NO DATA
+"""
+
+MERGE_SQL = """
+    INSERT INTO lottery_results ({columns}, created_at, updated_at)
+    SELECT {columns}, NOW(), NOW() FROM import_staging
+    ON CONFLICT (lottery_type, draw_number) DO UPDATE SET
+        {assignments},
+        updated_at = NOW()
+    WHERE {changed}
+    RETURNING id, lottery_type, draw_number, (xmax = 0) AS inserted
+""".format(
+    columns=', '.join(IMPORT_COLUMNS),
+    assignments=',\n        '.join(
+        f"{c} = EXCLUDED.{c}" if c in OVERWRITE_COLUMNS
+        else f"{c} = COALESCE(EXCLUDED.{c}, lottery_results.{c})"
+        for c in IMPORT_COLUMNS[2:]
+    ),
+    # Rows whose stored values already match are left alone (no new tuple,
+    # no trigger, no cache invalidation on a re-run)
+    changed='\n       OR '.join(
+        f"EXCLUDED.{c}::TEXT IS DISTINCT FROM lottery_results.{c}::TEXT" if c in OVERWRITE_COLUMNS
+        else f"(EXCLUDED.{c} IS NOT NULL AND EXCLUDED.{c}::TEXT IS DISTINCT FROM lottery_results.{c}::TEXT)"
+        for c in IMPORT_COLUMNS[2:]
+    ),
+)
+
+
+def _copy_value(column: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if column in JSON_COLUMNS:
+        # Matches save_to_database: no bonus balls is NULL, not '[]'
+        return json.dumps(value) if value else None
+    return value
+
+
+def load_batch(cur, rows: List[Dict[str, Any]]) -> List[DrawEvent]:
+    """
+    COPY rows into staging and merge them; returns an event per inserted or
+    updated draw, already NOTIFYed to other processes with the transaction
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # Empty unquoted CSV fields load as NULL
+        writer.writerow([_copy_value(column, row[column]) for column in IMPORT_COLUMNS])
+    buffer.seek(0)
+
+    cur.execute(STAGING_SQL)
+    cur.copy_expert(f"COPY import_staging ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cur.execute(MERGE_SQL)
+    events = [
+        DrawEvent(DRAW_INSERTED if was_insert else DRAW_UPDATED, draw_id, lottery_type, draw_number)
+        for draw_id, lottery_type, draw_number, was_insert in cur.fetchall()
+    ]
+    notify_draw_events(cur, events)
+    return events
+
+
+def _batches(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_records(records: Iterable[Dict[str, Any]], batch_size: Optional[int] = None,
+                   dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Validate and merge records into lottery_results, one transaction per batch.
+
+    Returns counts of records read, rejected, inserted, updated and unchanged,
+    plus a sample of rejection reasons.
+    """
+    started = time.perf_counter()
+    summary = {'read': 0, 'valid': 0, 'rejected': 0, 'inserted': 0, 'updated': 0,
+               'unchanged': 0, 'batches': 0, 'rejections': []}
+    events = []
+
+    for batch in _batches(expand_pages(records), batch_size or IMPORT_BATCH_SIZE):
+        summary['read'] += len(batch)
+        rows, rejected = validate_batch(batch)
+        summary['valid'] += len(rows)
+        summary['rejected'] += len(rejected)
+        remaining = MAX_REPORTED_REJECTIONS - len(summary['rejections'])
+        summary['rejections'].extend(rejected[:max(remaining, 0)])
+        for message in rejected:
+            logger.debug(f"Rejected {message}")
+        if dry_run or not rows:
+            continue
+
+        from db_pool import get_db_connection
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                batch_events = load_batch(cur, rows)
+        events.extend(batch_events)
+        inserted = sum(1 for event in batch_events if event.kind == DRAW_INSERTED)
+        updated = len(batch_events) - inserted
+        summary['batches'] += 1
+        summary['inserted'] += inserted
+        summary['updated'] += updated
+        summary['unchanged'] += len(rows) - inserted - updated
+        logger.info(f"Batch {summary['batches']}: {inserted} inserted, {updated} updated, "
+                    f"{len(rows) - inserted - updated} unchanged, {len(rejected)} rejected")
+
+    # Caches, indexes and predictions catch up once for the whole import
+    dispatch_draw_events(events)
+
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def import_files(paths: List[str], batch_size: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+    def records():
+        for path in paths:
+            logger.info(f"Reading {path}")
+            yield from read_records(path)
+    return import_records(records(), batch_size=batch_size, dry_run=dry_run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='CSV, JSON, NDJSON or JSON Lines files')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Draws per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='Read and validate only')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not args.dry_run:
+        # ON CONFLICT needs the (lottery_type, draw_number) unique index
+        from db_migrations import run_migrations
+        run_migrations()
+
+    summary = import_files(args.paths, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    print(f"\n{'=' * 60}")
+    print(f"BULK IMPORT SUMMARY{' (dry run)' if args.dry_run else ''}")
+    print(f"{'=' * 60}")
+    print(f"Records read:    {summary['read']}")
+    print(f"Valid draws:     {summary['valid']}")
+    print(f"Rejected:        {summary['rejected']}")
+    if not args.dry_run:
+        print(f"Inserted:        {summary['inserted']}")
+        print(f"Updated:         {summary['updated']}")
+        print(f"Unchanged:       {summary['unchanged']}")
+    print(f"Time:            {summary['seconds']}s")
+    for message in summary['rejections']:
+        print(f"  - {message}")
+    print(f"{'=' * 60}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
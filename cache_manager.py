@@ -1,58 +1,471 @@
 """
 Cache Manager Module
 Simple caching system for lottery analysis
+
+Cached values live in a pluggable backend so that several gunicorn workers
+(or Cloud Run instances) can share computed analytics and trained models:
+
+- memory:   per-process dict (default, same behaviour as before)
+- file:     pickle files on a shared path, /dev/shm by default
+- postgres: rows in a ``cache_entries`` table of the main database (via db_pool)
+
+The backend is chosen with the CACHE_BACKEND environment variable.
 """
 
+import os
+import time
+import pickle
+import hashlib
 import logging
+import tempfile
+import threading
+from contextlib import contextmanager
 from functools import wraps
-from datetime import datetime, timedelta
-import json
 
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache
-_cache = {}
+DEFAULT_TTL = 300
+DEFAULT_CACHE_DIR = '/dev/shm/sa_lottery_cache'
+
+
+class CacheBackend:
+    """Base class for cache backends - values are stored with an absolute expiry"""
+
+    name = 'base'
+
+    def __init__(self, namespace='default', default_ttl=DEFAULT_TTL):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def keys(self):
+        raise NotImplementedError
+
+    @classmethod
+    def clear_all(cls):
+        """Clear every namespace in the backend's shared store, including other processes' namespaces"""
+
+    def _expiry(self, ttl):
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def _record(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    # Mapping protocol so existing dict-style callers (MODEL_CACHE) keep working
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def __len__(self):
+        return len(self.keys())
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'namespace': self.namespace,
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 2) if total else 0.0
+        }
+
+
+_MISSING = object()
+
+
+class InProcessCacheBackend(CacheBackend):
+    """Per-process dictionary cache (not shared between workers)"""
+
+    name = 'memory'
+
+    def __init__(self, namespace='default', default_ttl=DEFAULT_TTL):
+        super().__init__(namespace, default_ttl)
+        self._store = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._record(True)
+                    return value
+                del self._store[key]
+        self._record(False)
+        return default
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store[key] = (value, self._expiry(ttl))
+
+    def delete(self, key):
+        with self._lock:
+            self._store.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+    def keys(self):
+        now = time.time()
+        with self._lock:
+            return [k for k, (_, exp) in self._store.items() if exp is None or exp > now]
+
+
+class FileCacheBackend(CacheBackend):
+    """
+    Pickle-per-key cache on a shared filesystem path.
+    With the default /dev/shm location this is a RAM-backed store shared by
+    every worker on the same host; writes are atomic via os.replace.
+    """
+
+    name = 'file'
+
+    def __init__(self, namespace='default', default_ttl=DEFAULT_TTL, directory=None):
+        super().__init__(namespace, default_ttl)
+        base_dir = directory or os.environ.get('CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.directory = os.path.join(base_dir, namespace)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(str(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored_key, value, expires_at = pickle.load(f)
+        except FileNotFoundError:
+            self._record(False)
+            return default
+        except Exception as e:
+            logger.warning(f"Corrupt cache entry {path}: {e}")
+            self._remove(path)
+            self._record(False)
+            return default
+
+        if stored_key != key or (expires_at is not None and expires_at <= time.time()):
+            if stored_key == key:
+                self._remove(path)
+            self._record(False)
+            return default
+
+        self._record(True)
+        return value
+
+    def set(self, key, value, ttl=None):
+        payload = pickle.dumps((key, value, self._expiry(ttl)), protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for filename in os.listdir(self.directory):
+            self._remove(os.path.join(self.directory, filename))
+
+    @classmethod
+    def clear_all(cls, directory=None):
+        base_dir = directory or os.environ.get('CACHE_DIR', DEFAULT_CACHE_DIR)
+        if not os.path.isdir(base_dir):
+            return
+        for namespace in os.listdir(base_dir):
+            namespace_dir = os.path.join(base_dir, namespace)
+            if os.path.isdir(namespace_dir):
+                for filename in os.listdir(namespace_dir):
+                    cls._remove(os.path.join(namespace_dir, filename))
+
+    def keys(self):
+        keys = []
+        now = time.time()
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.pkl'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), 'rb') as f:
+                    stored_key, _, expires_at = pickle.load(f)
+                if expires_at is None or expires_at > now:
+                    keys.append(stored_key)
+            except Exception:
+                continue
+        return keys
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PostgresCacheBackend(CacheBackend):
+    """
+    Cache stored in the ``cache_entries`` table (db_migrations 0010) so that
+    every instance connected to the same database shares entries. Queries
+    borrow connections from db_pool.
+    """
+
+    name = 'postgres'
+
+    @contextmanager
+    def _connection(self):
+        from db_pool import get_db_connection
+        with get_db_connection() as conn:
+            yield conn
+
+    def get(self, key, default=None):
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT value FROM cache_entries
+                        WHERE namespace = %s AND cache_key = %s
+                          AND (expires_at IS NULL OR expires_at > NOW())
+                    """, (self.namespace, str(key)))
+                    row = cur.fetchone()
+        except Exception as e:
+            logger.warning(f"Postgres cache read failed for {key}: {e}")
+            row = None
+
+        if row is None:
+            self._record(False)
+            return default
+
+        try:
+            value = pickle.loads(bytes(row[0]))
+        except Exception as e:
+            logger.warning(f"Corrupt postgres cache entry {self.namespace}/{key}: {e}")
+            self.delete(key)
+            self._record(False)
+            return default
+
+        self._record(True)
+        return value
+
+    def set(self, key, value, ttl=None):
+        import psycopg2
+        expires_at = self._expiry(ttl)
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO cache_entries (namespace, cache_key, value, expires_at, updated_at)
+                        VALUES (%s, %s, %s, to_timestamp(%s), NOW())
+                        ON CONFLICT (namespace, cache_key) DO UPDATE SET
+                            value = EXCLUDED.value,
+                            expires_at = EXCLUDED.expires_at,
+                            updated_at = NOW()
+                    """, (self.namespace, str(key), psycopg2.Binary(payload), expires_at))
+        except Exception as e:
+            logger.warning(f"Postgres cache write failed for {key}: {e}")
+
+    def delete(self, key):
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM cache_entries WHERE namespace = %s AND cache_key = %s",
+                                (self.namespace, str(key)))
+        except Exception as e:
+            logger.warning(f"Postgres cache delete failed for {key}: {e}")
+
+    def clear(self):
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM cache_entries WHERE namespace = %s", (self.namespace,))
+        except Exception as e:
+            logger.warning(f"Postgres cache clear failed: {e}")
+
+    @classmethod
+    def clear_all(cls):
+        from db_pool import get_db_connection
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("DELETE FROM cache_entries")
+        except Exception as e:
+            logger.warning(f"Postgres cache clear failed: {e}")
+
+    def keys(self):
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT cache_key FROM cache_entries
+                        WHERE namespace = %s AND (expires_at IS NULL OR expires_at > NOW())
+                    """, (self.namespace,))
+                    return [row[0] for row in cur.fetchall()]
+        except Exception as e:
+            logger.warning(f"Postgres cache key listing failed: {e}")
+            return []
+
+
+CACHE_BACKENDS = {
+    'memory': InProcessCacheBackend,
+    'file': FileCacheBackend,
+    'postgres': PostgresCacheBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_cache_backend(namespace='default', default_ttl=DEFAULT_TTL, shared=False):
+    """
+    Get the shared backend instance for a namespace.
+    The backend type comes from CACHE_BACKEND (memory, file or postgres);
+    unknown values or a backend that fails to start fall back to memory.
+
+    shared=True is for state every worker must see (job status polled through
+    any worker): memory is replaced by postgres when DATABASE_URL is set, or
+    file otherwise, and RuntimeError is raised rather than falling back.
+    """
+    with _backends_lock:
+        backend = _backends.get(namespace)
+        if backend is not None:
+            return backend
+
+        backend_name = os.environ.get('CACHE_BACKEND', 'memory').lower()
+        backend_cls = CACHE_BACKENDS.get(backend_name)
+        if backend_cls is None:
+            logger.warning(f"Unknown CACHE_BACKEND '{backend_name}' - using in-process cache")
+            backend_cls = InProcessCacheBackend
+        if shared and backend_cls is InProcessCacheBackend:
+            backend_cls = PostgresCacheBackend if os.environ.get('DATABASE_URL') else FileCacheBackend
+
+        try:
+            backend = backend_cls(namespace=namespace, default_ttl=default_ttl)
+        except Exception as e:
+            if shared:
+                raise RuntimeError(f"Cache namespace '{namespace}' needs a shared backend: {e}") from e
+            logger.warning(f"Could not start {backend_name} cache backend: {e} - using in-process cache")
+            backend = InProcessCacheBackend(namespace=namespace, default_ttl=default_ttl)
+
+        _backends[namespace] = backend
+        logger.info(f"Cache namespace '{namespace}' using {backend.name} backend")
+        return backend
+
+
+def _to_cacheable(result):
+    """Flask responses are not portable between processes - store body and headers instead"""
+    if hasattr(result, 'get_data') and hasattr(result, 'status_code'):
+        return {
+            '__response__': True,
+            'body': result.get_data(),
+            'status': result.status_code,
+            'mimetype': result.mimetype,
+        }
+    return result
+
+
+def _from_cacheable(value):
+    if isinstance(value, dict) and value.get('__response__'):
+        from flask import Response
+        return Response(value['body'], status=value['status'], mimetype=value['mimetype'])
+    return value
+
 
 def cached_query(ttl=300):
     """Decorator for caching query results"""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            cache = get_cache_backend('queries')
+
             # Create cache key
             cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-            
+
             # Check cache
-            if cache_key in _cache:
-                cached_data, timestamp = _cache[cache_key]
-                if datetime.now() - timestamp < timedelta(seconds=ttl):
-                    logger.info(f"Cache hit for {cache_key}")
-                    return cached_data
-                else:
-                    # Cache expired
-                    del _cache[cache_key]
-            
-            # Execute function and cache result
+            cached_data = cache.get(cache_key, _MISSING)
+            if cached_data is not _MISSING:
+                logger.info(f"Cache hit for {cache_key}")
+                return _from_cacheable(cached_data)
+
+            # Execute function and cache result - error tuples like (response, 500) are not cached
             result = func(*args, **kwargs)
-            _cache[cache_key] = (result, datetime.now())
-            logger.info(f"Cache miss for {cache_key} - result cached")
-            
+            if isinstance(result, tuple):
+                return result
+
+            try:
+                cache.set(cache_key, _to_cacheable(result), ttl=ttl)
+                logger.info(f"Cache miss for {cache_key} - result cached")
+            except Exception as e:
+                logger.warning(f"Could not cache result for {cache_key}: {e}")
+
             return result
         return wrapper
     return decorator
 
 def init_cache_manager(app):
     """Initialize cache manager"""
-    logger.info("Simple cache manager initialized")
-    
-def clear_cache():
-    """Clear all cached data"""
-    global _cache
-    _cache.clear()
-    logger.info("Cache cleared")
-    
+    backend = get_cache_backend('queries')
+    app.config.setdefault('CACHE_BACKEND', backend.name)
+    logger.info(f"Cache manager initialized ({backend.name} backend)")
+
+def clear_cache(namespace=None):
+    """
+    Clear all cached data, or a single namespace - in shared (file/postgres)
+    stores this includes namespaces created by other processes
+    """
+    if namespace is not None:
+        get_cache_backend(namespace).clear()
+    else:
+        with _backends_lock:
+            backends = list(_backends.values())
+        configured = CACHE_BACKENDS.get(os.environ.get('CACHE_BACKEND', 'memory').lower())
+        for backend_cls in {type(backend) for backend in backends} | ({configured} if configured else set()):
+            backend_cls.clear_all()
+        for backend in backends:
+            backend.clear()
+    logger.info("Cache cleared" if namespace is None else f"Cache namespace '{namespace}' cleared")
+
 def get_cache_stats():
     """Get cache statistics"""
+    backend = get_cache_backend('queries')
+    with _backends_lock:
+        namespaces = {name: b.stats() for name, b in _backends.items()}
     return {
-        'size': len(_cache),
-        'keys': list(_cache.keys())
-    }
\ No newline at end of file
+        'backend': backend.name,
+        'size': len(backend),
+        'keys': backend.keys(),
+        'namespaces': namespaces
+    }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for lottery_predictions
+Runs EXPLAIN on representative forms of the hot prediction queries and fails
+when one of them no longer uses the index it was tuned for.
+
+Sequential scans are disabled for the check session, so on a small development
+table the planner still shows which index it *would* use once the table grows;
+a query that falls back to a sequential scan anyway has lost its index.
+
+Usage:
+    python check_query_plans.py
+    python check_query_plans.py --analyze --verbose
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import psycopg2
+
+from db_migrations import PREDICTION_INDEXES
+
+# (label, expected index, query, params)
+HOT_QUERIES = [
+    ('prediction history for a game', 'idx_predictions_game_created', """
+        SELECT id, predicted_numbers, bonus_numbers, confidence_score, created_at
+        FROM lottery_predictions
+        WHERE game_type = %s
+        ORDER BY created_at DESC
+        LIMIT 20
+    """, ('LOTTO',)),
+    ('calibration window', 'idx_predictions_game_created', """
+        SELECT confidence_score, main_number_matches
+        FROM lottery_predictions
+        WHERE game_type = %s
+          AND validation_status IN ('verified', 'validated')
+          AND created_at >= CURRENT_DATE - make_interval(days => 90)
+        ORDER BY created_at DESC
+    """, ('LOTTO',)),
+    ('latest draw prediction for a game', 'idx_predictions_game_draw', """
+        SELECT id, predicted_numbers FROM lottery_predictions
+        WHERE game_type = %s AND linked_draw_id = %s
+        ORDER BY created_at DESC
+        LIMIT 1
+    """, ('LOTTO', 2500)),
+    ('predictions for a draw number', 'idx_predictions_linked_draw', """
+        SELECT id, game_type, predicted_numbers FROM lottery_predictions
+        WHERE linked_draw_id = %s
+    """, (2500,)),
+    ('store_prediction duplicate check', 'idx_predictions_game_target', """
+        SELECT id, is_locked FROM lottery_predictions
+        WHERE game_type = %s AND target_draw_date = CURRENT_DATE
+    """, ('LOTTO',)),
+    ('upcoming pending predictions', 'idx_predictions_pending_target', """
+        SELECT DISTINCT ON (game_type) game_type, predicted_numbers, target_draw_date
+        FROM lottery_predictions
+        WHERE validation_status = 'pending'
+          AND target_draw_date >= CURRENT_DATE
+        ORDER BY game_type, target_draw_date, created_at DESC
+    """, ()),
+    ('validation queue', 'idx_predictions_unverified', """
+        SELECT id, game_type, predicted_numbers FROM lottery_predictions
+        WHERE is_verified = false
+        ORDER BY created_at DESC
+        LIMIT 50
+    """, ()),
+    ('latest predictions', 'idx_predictions_created', """
+        SELECT id, game_type, predicted_numbers FROM lottery_predictions
+        ORDER BY created_at DESC
+        LIMIT 20
+    """, ()),
+]
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def explain(cur, query, params, analyze=False):
+    options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+    cur.execute(f"EXPLAIN ({options}) {query}", params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def check_plan(plan, expected_index):
+    """Return (ok, indexes used, sequential scans on lottery_predictions)"""
+    nodes = list(_plan_nodes(plan['Plan']))
+    indexes = sorted({n['Index Name'] for n in nodes if 'Index Name' in n})
+    seq_scans = [n for n in nodes
+                 if n.get('Node Type') == 'Seq Scan' and n.get('Relation Name') == 'lottery_predictions']
+    return expected_index in indexes and not seq_scans, indexes, seq_scans
+
+
+def missing_indexes(cur):
+    cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'lottery_predictions'")
+    present = {row[0] for row in cur.fetchall()}
+    return [name for name, _ in PREDICTION_INDEXES if name not in present]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--analyze', action='store_true', help='Run EXPLAIN ANALYZE and report actual timings')
+    parser.add_argument('--verbose', action='store_true', help='Print the full plan for every query')
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+    failures = 0
+    try:
+        with conn.cursor() as cur:
+            missing = missing_indexes(cur)
+            if missing:
+                print(f"Missing indexes (run db_migrations.py): {', '.join(missing)}")
+                failures += len(missing)
+
+            cur.execute("SET enable_seqscan = off")
+            for label, expected_index, query, params in HOT_QUERIES:
+                plan = explain(cur, query, params, analyze=args.analyze)
+                ok, indexes, seq_scans = check_plan(plan, expected_index)
+                timing = f" {plan['Execution Time']:.2f}ms" if 'Execution Time' in plan else ''
+                print(f"{'OK  ' if ok else 'FAIL'} {label}: cost {plan['Plan']['Total Cost']:.1f}{timing}"
+                      f" using {', '.join(indexes) or 'no index'} (expected {expected_index})")
+                if not ok:
+                    failures += 1
+                if args.verbose or not ok:
+                    print(json.dumps(plan['Plan'], indent=2, default=str))
+        conn.rollback()
+    finally:
+        conn.close()
+
+    print(f"{len(HOT_QUERIES)} queries checked, {failures} problem(s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,11 +5,10 @@ Removes duplicate archived screenshots, keeping only the first (earliest) archiv
 """
 
 import os
-import json
 import logging
-from datetime import datetime
-from collections import defaultdict
-from typing import Dict, List
+from typing import Dict
+
+from archive_manifest import ArchiveManifest, remove_archived_files
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,78 +20,18 @@ class ArchiveDuplicateCleanup:
     
     def __init__(self, archive_base_path: str = "screenshots_archive"):
         self.archive_base_path = archive_base_path
+        self.manifest = ArchiveManifest(archive_base_path)
     
-    def find_all_archived_screenshots(self) -> List[Dict]:
-        """
-        Find all archived screenshots with their metadata
-        
-        Returns:
-            List of dicts with screenshot info
+    def find_duplicates(self) -> Dict:
         """
-        archived_items = []
-        
-        try:
-            for root, dirs, files in os.walk(self.archive_base_path):
-                for file in files:
-                    if file.endswith('_metadata.json'):
-                        metadata_path = os.path.join(root, file)
-                        
-                        try:
-                            with open(metadata_path, 'r') as f:
-                                metadata = json.load(f)
-                            
-                            # Get screenshot filename
-                            screenshot_filename = file.replace('_metadata.json', '')
-                            screenshot_path = os.path.join(root, screenshot_filename)
-                            
-                            # Add paths
-                            metadata['screenshot_path'] = screenshot_path
-                            metadata['metadata_path'] = metadata_path
-                            metadata['archived_at_obj'] = datetime.fromisoformat(metadata.get('archived_at', ''))
-                            
-                            archived_items.append(metadata)
-                            
-                        except Exception as e:
-                            logger.warning(f"Failed to read metadata {metadata_path}: {e}")
-            
-            return archived_items
-            
-        except Exception as e:
-            logger.error(f"Failed to find archived screenshots: {e}")
-            return []
-    
-    def identify_duplicates(self, archived_items: List[Dict]) -> Dict:
+        {(lottery_type, draw_number): {'keep', 'remove', 'total_count'}} for draws
+        archived more than once, straight from the manifest's index - the
+        earliest archive is kept
         """
-        Identify duplicate screenshots for the same draw
-        
-        Args:
-            archived_items: List of archived screenshot metadata
-            
-        Returns:
-            Dict with duplicates organized by draw
-        """
-        # Group by lottery type and draw number
-        draw_groups = defaultdict(list)
-        
-        for item in archived_items:
-            key = (item.get('lottery_type'), item.get('draw_number'))
-            draw_groups[key].append(item)
-        
-        # Find duplicates (groups with more than 1 screenshot)
-        duplicates = {}
-        
-        for key, items in draw_groups.items():
-            if len(items) > 1:
-                # Sort by archived_at timestamp (keep earliest)
-                items_sorted = sorted(items, key=lambda x: x.get('archived_at_obj'))
-                
-                duplicates[key] = {
-                    'keep': items_sorted[0],
-                    'remove': items_sorted[1:],
-                    'total_count': len(items)
-                }
-        
-        return duplicates
+        return {
+            key: {'keep': items[0], 'remove': items[1:], 'total_count': len(items)}
+            for key, items in self.manifest.duplicates().items()
+        }
     
     def cleanup_duplicates(self, dry_run: bool = True) -> Dict:
         """
@@ -106,12 +45,10 @@ class ArchiveDuplicateCleanup:
         """
         logger.info("🔍 Scanning for duplicate archived screenshots...")
         
-        # Find all archives
-        all_archives = self.find_all_archived_screenshots()
-        logger.info(f"📂 Found {len(all_archives)} total archived screenshots")
+        logger.info(f"📂 Found {self.manifest.statistics()['total_screenshots']} total archived screenshots")
         
         # Identify duplicates
-        duplicates = self.identify_duplicates(all_archives)
+        duplicates = self.find_duplicates()
         
         if not duplicates:
             logger.info("✅ No duplicates found!")
@@ -137,25 +74,13 @@ class ArchiveDuplicateCleanup:
             logger.info(f"   🗑️  Removing {len(dup_info['remove'])} duplicate(s)")
             
             for item in dup_info['remove']:
-                screenshot_path = item['screenshot_path']
-                metadata_path = item['metadata_path']
-                
-                logger.info(f"      - {os.path.basename(screenshot_path)}")
-                
-                if not dry_run:
-                    try:
-                        # Remove screenshot
-                        if os.path.exists(screenshot_path):
-                            os.remove(screenshot_path)
-                        
-                        # Remove metadata
-                        if os.path.exists(metadata_path):
-                            os.remove(metadata_path)
-                        
-                        removed_count += 1
-                        
-                    except Exception as e:
-                        logger.error(f"      ❌ Failed to remove: {e}")
+                logger.info(f"      - {os.path.basename(item['screenshot_path'])}")
+            
+            if not dry_run:
+                # Screenshot + metadata files first, then their manifest rows
+                removed = remove_archived_files(dup_info['remove'], self.archive_base_path)
+                self.manifest.remove(removed)
+                removed_count += len(removed)
         
         if dry_run:
             logger.info(f"\n🔍 DRY RUN - No files were actually deleted")
@@ -177,22 +102,20 @@ class ArchiveDuplicateCleanup:
         Returns:
             Dict with cleanup summary
         """
-        all_archives = self.find_all_archived_screenshots()
-        duplicates = self.identify_duplicates(all_archives)
+        duplicates = self.find_duplicates()
         
         summary = {
-            'total_archives': len(all_archives),
-            'unique_draws': len(set((item.get('lottery_type'), item.get('draw_number')) for item in all_archives)),
+            'total_archives': self.manifest.statistics()['total_screenshots'],
+            'unique_draws': self.manifest.unique_draws(),
             'duplicated_draws': len(duplicates),
             'duplicate_files': sum(len(dup['remove']) for dup in duplicates.values()),
             'space_wasted_mb': 0
         }
         
-        # Calculate wasted space
+        # Calculate wasted space from the sizes recorded at archive time
         for dup_info in duplicates.values():
             for item in dup_info['remove']:
-                if os.path.exists(item['screenshot_path']):
-                    summary['space_wasted_mb'] += os.path.getsize(item['screenshot_path'])
+                summary['space_wasted_mb'] += item.get('screenshot_size_bytes') or 0
         
         summary['space_wasted_mb'] = round(summary['space_wasted_mb'] / (1024 * 1024), 2)
         
@@ -12,6 +12,8 @@ from itertools import combinations, product
 from collections import defaultdict
 import psycopg2
 from probability_estimator import ProbabilityEstimator
+from match_scoring import masks_from_lines, best_match_per_draw
+from prize_payouts import get_payout_table
 
 logger = logging.getLogger(__name__)
 
@@ -92,6 +94,7 @@ class CoverageOptimizer:
                     'diversity_score': self._calculate_diversity_score(wheel_lines),
                     'efficiency_ratio': actual_coverage / budget_lines
                 },
+                'historical_performance': self.evaluate_wheel_history(game_type, wheel_lines),
                 'generated_at': prob_analysis['analysis_date']
             }
             
@@ -102,6 +105,28 @@ class CoverageOptimizer:
             logger.error(f"Error generating wheel system for {game_type}: {e}")
             return {}
     
+    def evaluate_wheel_history(self, game_type: str, wheel_lines: List[List[int]]) -> Dict[str, Any]:
+        """How the wheel would have done in every past draw - best line per draw and exact ROI"""
+        try:
+            table = get_payout_table(game_type)
+            if not len(table) or not wheel_lines:
+                return {}
+            
+            best = best_match_per_draw(masks_from_lines(wheel_lines), table.main_masks)
+            draws = len(best)
+            return {
+                'draws_evaluated': draws,
+                'comparisons': draws * len(wheel_lines),
+                'draws_with_3_plus': int((best >= 3).sum()),
+                'hit_rate_3_plus': round(float((best >= 3).mean()) * 100, 2),
+                'hit_rate_2_plus': round(float((best >= 2).mean()) * 100, 2),
+                'best_match_distribution': {int(k): int(v) for k, v in enumerate(np.bincount(best)) if v},
+                'returns': table.evaluate_lines(wheel_lines)
+            }
+        except Exception as e:
+            logger.warning(f"Could not evaluate wheel history for {game_type}: {e}")
+            return {}
+    
     def _determine_optimal_pool_size(self, game_type: str, target_coverage: float, sorted_numbers: List) -> int:
         """Determine optimal pool size for target coverage"""
         config = self.game_configs.get(game_type)
@@ -0,0 +1,187 @@
+"""
+Data Streams
+Full-history reads without materialising the table: server-side cursor rows
+decoded into dicts, NumPy blocks of drawn numbers for analytics, and
+NDJSON/CSV encoders for the streaming export endpoint.
+
+Everything here is a generator over db_pool.stream_query/stream_records, so
+memory stays at one cursor batch (DB_STREAM_ITERSIZE rows) however many
+draws or predictions exist.
+"""
+
+import io
+import csv
+import json
+import logging
+from datetime import datetime, date
+from decimal import Decimal
+
+import numpy as np
+
+from db_pool import stream_query, stream_records, STREAM_ITERSIZE
+from lottery_numbers import MAIN_NUMBERS_SQL, BONUS_NUMBERS_SQL
+from match_scoring import MAX_BALL
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Exportable tables: columns, source table and the column filtered by ?lottery_type=
+EXPORT_DATASETS = {
+    'results': {
+        'table': 'lottery_results',
+        'game_column': 'lottery_type',
+        'order_by': 'draw_date DESC, id DESC',
+        'columns': (
+            'id', 'lottery_type', 'draw_number', 'draw_date', 'main_numbers', 'bonus_numbers',
+            'prize_divisions', 'rollover_amount', 'next_jackpot', 'total_pool_size',
+            'total_sales', 'draw_machine', 'next_draw_date', 'created_at'
+        ),
+    },
+    'predictions': {
+        'table': 'lottery_predictions',
+        'game_column': 'game_type',
+        'order_by': 'created_at DESC, id DESC',
+        'columns': (
+            'id', 'game_type', 'predicted_numbers', 'bonus_numbers', 'confidence_score',
+            'prediction_method', 'target_draw_date', 'linked_draw_id', 'created_at',
+            'validation_status', 'is_verified', 'main_number_matches', 'bonus_number_matches',
+            'accuracy_percentage', 'prize_tier'
+        ),
+    },
+}
+
+
+# ========== NumPy blocks ==========
+
+def number_blocks(query, params=None, block_rows=None):
+    """
+    Yield (keys, block) for a query whose last column is an integer array.
+
+    keys holds each row's leading columns as a tuple; block is an int16
+    (rows x longest array) matrix of the arrays, zero-padded on the right.
+    Ball 0 does not exist, so the padding falls out of bincount-style
+    aggregation by dropping column 0.
+    """
+    block_rows = block_rows or STREAM_ITERSIZE
+    keys, arrays = [], []
+    for row in stream_query(query, params, itersize=block_rows, name='number_blocks'):
+        keys.append(row[:-1])
+        arrays.append(row[-1] or ())
+        if len(arrays) >= block_rows:
+            yield keys, _pad_block(arrays)
+            keys, arrays = [], []
+    if arrays:
+        yield keys, _pad_block(arrays)
+
+
+def _pad_block(arrays):
+    width = max((len(a) for a in arrays), default=0)
+    block = np.zeros((len(arrays), width), dtype=np.int16)
+    for i, numbers in enumerate(arrays):
+        block[i, :len(numbers)] = numbers
+    return block
+
+
+def number_frequencies(lottery_type=None, include_bonus=False):
+    """
+    How often each ball was drawn, accumulated block by block.
+
+    Returns {'counts': int64 array indexed by ball number, 'draws': rows read,
+    'lottery_types': set of games seen}.
+    """
+    numbers_sql = f"{MAIN_NUMBERS_SQL} || {BONUS_NUMBERS_SQL}" if include_bonus else MAIN_NUMBERS_SQL
+    query = f"SELECT lottery_type, {numbers_sql} FROM lottery_results WHERE main_numbers IS NOT NULL"
+    params = None
+    if lottery_type and lottery_type != 'all':
+        query += " AND lottery_type = %s"
+        params = (lottery_type,)
+
+    counts = np.zeros(MAX_BALL + 1, dtype=np.int64)
+    draws = 0
+    lottery_types = set()
+    for keys, block in number_blocks(query, params):
+        draws += len(keys)
+        lottery_types.update(key[0] for key in keys)
+        valid = block[(block > 0) & (block <= MAX_BALL)]
+        counts += np.bincount(valid, minlength=MAX_BALL + 1)
+    counts[0] = 0
+    return {'counts': counts, 'draws': draws, 'lottery_types': lottery_types}
+
+
+def ranked_frequencies(counts):
+    """(number, frequency) pairs for drawn numbers, most frequent first, ties by number"""
+    drawn = np.flatnonzero(counts)
+    order = np.lexsort((drawn, -counts[drawn]))
+    return [(int(drawn[i]), int(counts[drawn[i]])) for i in order]
+
+
+# ========== Export encoders ==========
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(records):
+    """One JSON document per line"""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, default=_json_default) + '\n'
+
+
+def csv_lines(records, columns, batch_rows=500):
+    """Header then rows, encoded a batch at a time; list/dict cells are JSON"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    for record in records:
+        writer.writerow([_csv_value(record.get(column)) for column in columns])
+        rows += 1
+        if rows % batch_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_records(dataset, lottery_type=None):
+    """Rows of an export dataset as dicts, newest first"""
+    spec = EXPORT_DATASETS[dataset]
+    query = f"SELECT {', '.join(spec['columns'])} FROM {spec['table']}"
+    params = None
+    if lottery_type and lottery_type != 'all':
+        query += f" WHERE {spec['game_column']} = %s"
+        params = (lottery_type,)
+    query += f" ORDER BY {spec['order_by']}"
+    return stream_records(query, params, name=f"export_{dataset}")
+
+
+def export_stream(dataset, fmt, lottery_type=None):
+    """Encoded export body for a dataset in 'ndjson' or 'csv'"""
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown export dataset '{dataset}'")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    records = export_records(dataset, lottery_type)
+    if fmt == 'csv':
+        return csv_lines(records, EXPORT_DATASETS[dataset]['columns'])
+    return ndjson_lines(records)
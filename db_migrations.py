@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Database Migrations
+Versioned schema changes for tables the app manages with raw SQL.
+
+Each migration runs once and is recorded in ``schema_migrations``. Migrations
+normally run inside a transaction; ones marked non-transactional (for example
+CREATE INDEX CONCURRENTLY, which cannot run in a transaction block) execute in
+autocommit mode and must be safe to re-run. A session advisory lock makes sure
+only one process migrates at a time.
+
+The SQLAlchemy models in models.py mirror the resulting schema.
+
+Usage:
+    python db_migrations.py            # apply pending migrations
+    python db_migrations.py --list     # show applied and pending migrations
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from collections import namedtuple
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key shared by every process that runs migrations
+MIGRATION_LOCK_KEY = 7203410001
+
+Migration = namedtuple('Migration', ['version', 'description', 'apply', 'transactional'])
+
+MIGRATIONS = []
+
+
+def migration(version, description, transactional=True):
+    """Register a migration function taking a cursor; versions must sort in apply order"""
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, description, func, transactional))
+        return func
+    return decorator
+
+
+# ========== lottery_predictions ==========
+
+# Columns added to lottery_predictions after its original CREATE TABLE
+PREDICTION_COLUMNS = [
+    ('is_verified', 'BOOLEAN DEFAULT FALSE'),
+    ('accuracy_score', 'DOUBLE PRECISION'),
+    ('verified_at', 'TIMESTAMP'),
+    ('validation_date', 'TIMESTAMP'),
+    ('matched_main_numbers', 'INTEGER[]'),
+    ('matched_bonus_numbers', 'INTEGER[]'),
+    ('match_details', 'JSONB'),
+    ('is_locked', 'BOOLEAN DEFAULT FALSE'),
+    ('linked_draw_id', 'INTEGER'),
+]
+
+# Index name -> definition, each matched to the queries it serves
+PREDICTION_INDEXES = [
+    # Per-game history, recent-window and calibration queries
+    ('idx_predictions_game_created',
+     'lottery_predictions (game_type, created_at DESC)'),
+    # Predictions for a given draw of a game (latest-draw cards, generator dedupe)
+    ('idx_predictions_game_draw',
+     'lottery_predictions (game_type, linked_draw_id, created_at DESC)'),
+    # Draw-detail pages that list every game's prediction for one draw number
+    ('idx_predictions_linked_draw',
+     'lottery_predictions (linked_draw_id)'),
+    # One-prediction-per-draw lookup in store_prediction
+    ('idx_predictions_game_target',
+     'lottery_predictions (game_type, target_draw_date)'),
+    # Upcoming pending predictions on the homepage and in the workflow
+    ('idx_predictions_pending_target',
+     "lottery_predictions (game_type, target_draw_date, created_at DESC) WHERE validation_status = 'pending'"),
+    # Validation queue
+    ('idx_predictions_unverified',
+     'lottery_predictions (created_at DESC) WHERE is_verified = FALSE'),
+    # Latest predictions across all games
+    ('idx_predictions_created',
+     'lottery_predictions (created_at DESC)'),
+]
+
+
+@migration('0001', 'Create lottery_predictions with every column in use')
+def create_lottery_predictions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS lottery_predictions (
+            id SERIAL PRIMARY KEY,
+            game_type VARCHAR(50) NOT NULL,
+            predicted_numbers INTEGER[] NOT NULL,
+            bonus_numbers INTEGER[],
+            confidence_score DECIMAL(5,4),
+            prediction_method VARCHAR(100),
+            reasoning TEXT,
+            target_draw_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            main_number_matches INTEGER DEFAULT 0,
+            bonus_number_matches INTEGER DEFAULT 0,
+            accuracy_percentage DECIMAL(5,2),
+            prize_tier VARCHAR(50),
+            validation_status VARCHAR(20) DEFAULT 'pending',
+            ensemble_composition JSONB,
+            model_weights JSONB
+        )
+    """)
+    # Existing databases gained these columns by hand over time
+    for column, definition in PREDICTION_COLUMNS:
+        cur.execute(f"ALTER TABLE lottery_predictions ADD COLUMN IF NOT EXISTS {column} {definition}")
+
+
+def create_index_concurrently(cur, name, definition, unique=False):
+    """
+    CREATE INDEX CONCURRENTLY that can be retried: a build interrupted part-way
+    leaves an INVALID index behind, which IF NOT EXISTS would otherwise skip.
+    """
+    cur.execute("""
+        SELECT i.indisvalid FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s
+    """, (name,))
+    row = cur.fetchone()
+    if row is not None and not row[0]:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    cur.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+
+
+@migration('0002', 'Indexes for lottery_predictions hot queries', transactional=False)
+def create_prediction_indexes(cur):
+    for name, definition in PREDICTION_INDEXES:
+        started = time.perf_counter()
+        create_index_concurrently(cur, name, definition)
+        logger.info(f"Index {name} ready ({(time.perf_counter() - started) * 1000:.0f}ms)")
+    cur.execute("ANALYZE lottery_predictions")
+
+
+# ========== lottery_results number arrays ==========
+
+# Draws updated per transaction while backfilling
+BACKFILL_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 1000))
+
+
+@migration('0003', 'smallint[] number columns on lottery_results, kept in sync by trigger')
+def add_number_arrays(cur):
+    # main_numbers/bonus_numbers hold JSON text, {..} array literals or JSON
+    # arrays depending on which importer wrote them; keeping only digits and
+    # commas normalises every form
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION lottery_numbers_array(value TEXT) RETURNS SMALLINT[]
+        LANGUAGE SQL IMMUTABLE PARALLEL SAFE AS $$
+            SELECT array_remove(string_to_array(regexp_replace(value, '[^0-9,]', '', 'g'), ','), '')::SMALLINT[]
+        $$
+    """)
+    cur.execute("ALTER TABLE lottery_results ADD COLUMN IF NOT EXISTS main_numbers_arr SMALLINT[]")
+    cur.execute("ALTER TABLE lottery_results ADD COLUMN IF NOT EXISTS bonus_numbers_arr SMALLINT[]")
+    # Every importer keeps writing the legacy columns; the trigger keeps the
+    # arrays current without touching them
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION sync_lottery_number_arrays() RETURNS TRIGGER
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.main_numbers_arr := lottery_numbers_array(NEW.main_numbers::TEXT);
+            NEW.bonus_numbers_arr := lottery_numbers_array(NEW.bonus_numbers::TEXT);
+            RETURN NEW;
+        END
+        $$
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS trg_sync_lottery_number_arrays ON lottery_results")
+    cur.execute("""
+        CREATE TRIGGER trg_sync_lottery_number_arrays
+        BEFORE INSERT OR UPDATE OF main_numbers, bonus_numbers ON lottery_results
+        FOR EACH ROW EXECUTE FUNCTION sync_lottery_number_arrays()
+    """)
+
+
+@migration('0004', 'Backfill lottery_results number arrays in batches', transactional=False)
+def backfill_number_arrays(cur):
+    # Autocommit: each batch commits on its own, so row locks stay short and
+    # an interrupted run picks up where it stopped
+    last_id = 0
+    total = 0
+    while True:
+        cur.execute("""
+            SELECT MAX(id) FROM (
+                SELECT id FROM lottery_results WHERE id > %s ORDER BY id LIMIT %s
+            ) batch
+        """, (last_id, BACKFILL_BATCH_SIZE))
+        batch_end = cur.fetchone()[0]
+        if batch_end is None:
+            break
+
+        cur.execute("""
+            UPDATE lottery_results SET
+                main_numbers_arr = lottery_numbers_array(main_numbers::TEXT),
+                bonus_numbers_arr = lottery_numbers_array(bonus_numbers::TEXT)
+            WHERE id > %s AND id <= %s
+              AND main_numbers_arr IS NULL
+        """, (last_id, batch_end))
+        total += cur.rowcount
+        last_id = batch_end
+        logger.info(f"Backfilled number arrays up to id {last_id} ({total} draws)")
+
+
+@migration('0005', 'Refresh lottery_results statistics after the number array backfill', transactional=False)
+def analyze_number_arrays(cur):
+    # Containment queries use number_search's in-memory bitsets, so the arrays
+    # get no GIN indexes
+    cur.execute("ANALYZE lottery_results")
+
+
+# ========== lottery_results draw key ==========
+
+@migration('0006', 'Unique (lottery_type, draw_number) on lottery_results', transactional=False)
+def create_draw_unique_index(cur):
+    # Row-by-row importers left repeated draws behind; keep the most complete
+    # copy of each (prize divisions first, then the most recently written)
+    cur.execute("""
+        DELETE FROM lottery_results r
+        USING (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY lottery_type, draw_number
+                ORDER BY (prize_divisions IS NOT NULL
+                          AND prize_divisions::TEXT NOT IN ('[]', 'null', '')) DESC,
+                         COALESCE(updated_at, created_at) DESC NULLS LAST,
+                         id DESC
+            ) AS copy_rank
+            FROM lottery_results
+            WHERE draw_number IS NOT NULL
+        ) ranked
+        WHERE r.id = ranked.id AND ranked.copy_rank > 1
+    """)
+    logger.info(f"Removed {cur.rowcount} duplicate draws from lottery_results")
+    # A duplicate written between the DELETE and the build fails it and leaves
+    # an invalid index, which the next run drops and retries
+    create_index_concurrently(cur, 'uq_results_game_draw',
+                              'lottery_results (lottery_type, draw_number)', unique=True)
+
+
+# ========== Automation ==========
+
+@migration('0007', 'automation_logs with per-step timings')
+def add_automation_step_timings(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS automation_logs (
+            id SERIAL PRIMARY KEY,
+            start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            end_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            success BOOLEAN NOT NULL,
+            message TEXT,
+            duration_seconds INTEGER,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        )
+    """)
+    # [{"step", "game", "status", "seconds", "resumed", "error"}, ...] per run
+    cur.execute("ALTER TABLE automation_logs ADD COLUMN IF NOT EXISTS steps JSONB")
+
+
+@migration('0008', 'Drop automation_lock (replaced by a pg advisory lock)')
+def drop_automation_lock_table(cur):
+    # scheduler_fix.AutomationLock holds pg_try_advisory_lock(7203410002) instead
+    cur.execute("DROP TABLE IF EXISTS automation_lock")
+
+
+# ========== Gemini API usage ==========
+
+@migration('0009', 'gemini_api_calls and gemini_api_daily usage tables')
+def create_gemini_usage_tables(cur):
+    # Written by api_usage_tracker: one row per call plus a per-day rollup
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gemini_api_calls (
+            id BIGSERIAL PRIMARY KEY,
+            called_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            source VARCHAR(50) NOT NULL,
+            operation VARCHAR(100) NOT NULL,
+            model VARCHAR(50),
+            status VARCHAR(20) NOT NULL,
+            latency_ms INTEGER,
+            image_bytes INTEGER DEFAULT 0,
+            prompt_tokens INTEGER,
+            response_tokens INTEGER,
+            total_tokens INTEGER,
+            retries SMALLINT DEFAULT 0,
+            error TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gemini_api_calls_called_at ON gemini_api_calls (called_at DESC)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gemini_api_daily (
+            day DATE NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            operation VARCHAR(100) NOT NULL,
+            model VARCHAR(50) NOT NULL,
+            calls INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            cache_hits INTEGER NOT NULL DEFAULT 0,
+            retries INTEGER NOT NULL DEFAULT 0,
+            total_latency_ms BIGINT NOT NULL DEFAULT 0,
+            max_latency_ms INTEGER NOT NULL DEFAULT 0,
+            image_bytes BIGINT NOT NULL DEFAULT 0,
+            prompt_tokens BIGINT NOT NULL DEFAULT 0,
+            response_tokens BIGINT NOT NULL DEFAULT 0,
+            cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, source, operation, model)
+        )
+    """)
+
+
+# ========== Cache ==========
+
+@migration('0010', 'cache_entries table for the postgres cache backend')
+def create_cache_entries(cur):
+    # cache_manager.PostgresCacheBackend - pickled values per (namespace, key)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            namespace VARCHAR(100) NOT NULL,
+            cache_key TEXT NOT NULL,
+            value BYTEA NOT NULL,
+            expires_at TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            PRIMARY KEY (namespace, cache_key)
+        )
+    """)
+
+
+# ========== Runner ==========
+
+def _ensure_migrations_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(50) PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duration_ms INTEGER
+            )
+        """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    """Versions already recorded in schema_migrations"""
+    _ensure_migrations_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cur.fetchall()}
+
+
+def pending_migrations(conn):
+    applied = applied_versions(conn)
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if m.version not in applied]
+
+
+def _apply(conn, m):
+    started = time.perf_counter()
+    if m.transactional:
+        with conn.cursor() as cur:
+            m.apply(cur)
+    else:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                m.apply(cur)
+        finally:
+            conn.autocommit = False
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO schema_migrations (version, description, duration_ms) VALUES (%s, %s, %s)",
+            (m.version, m.description, duration_ms)
+        )
+    conn.commit()
+    logger.info(f"Applied migration {m.version}: {m.description} ({duration_ms}ms)")
+
+
+def run_migrations(connection_string=None):
+    """Apply every pending migration and return the versions applied"""
+    conn = psycopg2.connect(connection_string or os.environ.get('DATABASE_URL'))
+    applied = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+        try:
+            # Re-read after taking the lock in case another process just finished
+            for m in pending_migrations(conn):
+                try:
+                    _apply(conn, m)
+                except Exception:
+                    conn.rollback()
+                    logger.error(f"Migration {m.version} failed: {m.description}")
+                    raise
+                applied.append(m.version)
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+            conn.commit()
+    finally:
+        conn.close()
+
+    if not applied:
+        logger.info("Database schema is up to date")
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--list', action='store_true', help='List applied and pending migrations')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    if args.list:
+        conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+        try:
+            applied = applied_versions(conn)
+        finally:
+            conn.close()
+        for m in sorted(MIGRATIONS, key=lambda m: m.version):
+            state = 'applied' if m.version in applied else 'pending'
+            print(f"{m.version}  {state:8}  {m.description}")
+        return 0
+
+    applied = run_migrations()
+    print(f"Applied {len(applied)} migration(s)" + (f": {', '.join(applied)}" if applied else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Database Connection Pool
+Thread-safe psycopg2 connection pooling for threaded (gthread) and green
+(gevent) gunicorn workers.
+
+Connections are borrowed per request through get_db_connection(), which
+commits on success, rolls back on error and always returns the connection to
+the pool - unlike `with psycopg2.connect(...)`, which only ends the
+transaction and leaves the connection open until garbage collection.
+"""
+
+import os
+import logging
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+
+from instrumentation import InstrumentedConnection
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+# Rows fetched per round trip by server-side cursors
+STREAM_ITERSIZE = int(os.environ.get('DB_STREAM_ITERSIZE', 2000))
+
+_pool = None
+_pool_pid = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+def _database_url():
+    """DATABASE_URL with the same 5-second connect timeout the app uses"""
+    database_url = os.environ.get('DATABASE_URL')
+    if database_url and 'connect_timeout' not in database_url:
+        separator = '&' if '?' in database_url else '?'
+        database_url = f"{database_url}{separator}connect_timeout=5"
+    return database_url
+
+
+def get_pool():
+    """Get this process's connection pool, creating it on first use"""
+    global _pool, _pool_pid, _pool_slots
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                # A pool inherited through fork shares sockets with the parent
+                # process, so each worker builds its own instead of reusing it
+                _pool = pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, _database_url(),
+                    connection_factory=InstrumentedConnection
+                )
+                _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+                _pool_pid = pid
+                logger.info(f"Database pool created for pid {pid} (max {DB_POOL_MAX} connections)")
+    return _pool
+
+
+@contextmanager
+def get_db_connection():
+    """
+    Borrow a pooled connection for the duration of a `with` block.
+
+    Blocks for up to DB_POOL_TIMEOUT seconds when every connection is in use
+    instead of failing immediately like ThreadedConnectionPool does.
+    """
+    db_pool = get_pool()
+    slots = _pool_slots
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise pool.PoolError(f"No database connection available after {DB_POOL_TIMEOUT}s")
+
+    conn = None
+    discard = False
+    try:
+        conn = db_pool.getconn()
+        yield conn
+        conn.commit()
+    except Exception:
+        if conn is not None:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        raise
+    finally:
+        if conn is not None:
+            db_pool.putconn(conn, close=discard or bool(conn.closed))
+        slots.release()
+
+
+def stream_query(query, params=None, itersize=None, name='stream'):
+    """
+    Yield rows from a server-side (named) cursor, fetching `itersize` rows per
+    round trip, so result sets of any size are read in constant memory.
+    Holds a pooled connection until the generator is exhausted or closed.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor(name=name) as cur:
+            cur.itersize = itersize or STREAM_ITERSIZE
+            cur.execute(query, params)
+            for row in cur:
+                yield row
+
+
+def stream_records(query, params=None, itersize=None, name='stream'):
+    """stream_query, with each row as a {column: value} dict"""
+    with get_db_connection() as conn:
+        with conn.cursor(name=name) as cur:
+            cur.itersize = itersize or STREAM_ITERSIZE
+            cur.execute(query, params)
+            columns = None
+            for row in cur:
+                # A named cursor only has a description once the first batch arrives
+                if columns is None:
+                    columns = [col[0] for col in cur.description]
+                yield dict(zip(columns, row))
+
+
+def get_pool_stats():
+    """Connection usage for the current process's pool"""
+    if _pool is None or _pool_pid != os.getpid():
+        return {'initialized': False, 'max_connections': DB_POOL_MAX}
+    return {
+        'initialized': True,
+        'max_connections': DB_POOL_MAX,
+        'in_use': len(_pool._used),
+        'idle': len(_pool._pool),
+    }
+
+
+def close_pool():
+    """Close every pooled connection (worker shutdown)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _pool_pid = None
@@ -0,0 +1,227 @@
+"""
+Draw Events
+"Draw inserted/updated" notifications for everything derived from lottery_results.
+
+Writers report the draws they changed in two steps:
+1. notify_draw_events(cur, events) inside their transaction - a Postgres
+   NOTIFY on the draw_events channel, delivered to other processes only if
+   the transaction commits
+2. dispatch_draw_events(events) after the commit - runs this process's
+   subscribers
+
+Subscribers take the list of DrawEvents from one save or import batch, so
+downstream work is scoped to the draws that actually changed. Two kinds:
+- every_process: per-process state (rendered pages, the number search index,
+  query caches). Also run for events from other processes, received by the
+  listener thread each web worker starts (start_draw_event_listener).
+- once (the default): real work - prediction validation, prediction
+  generation, model refresh - run only in the process that wrote the draws.
+"""
+
+import os
+import json
+import time
+import uuid
+import select
+import logging
+import threading
+from collections import namedtuple
+from typing import Callable, Dict, List
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'draw_events'
+
+DRAW_INSERTED = 'inserted'
+DRAW_UPDATED = 'updated'
+
+# NOTIFY payloads must stay under 8000 bytes
+NOTIFY_EVENTS_PER_PAYLOAD = 50
+LISTEN_POLL_SECONDS = 5
+LISTEN_RECONNECT_SECONDS = 30
+
+DrawEvent = namedtuple('DrawEvent', ['kind', 'draw_id', 'lottery_type', 'draw_number'])
+
+Subscriber = namedtuple('Subscriber', ['name', 'handler', 'kinds', 'every_process'])
+
+_subscribers: List[Subscriber] = []
+_subscribers_lock = threading.Lock()
+_defaults_registered = False
+_listener_thread = None
+_origin = (None, None)
+
+
+def subscribe(name: str, handler: Callable[[List[DrawEvent]], object], kinds=(DRAW_INSERTED, DRAW_UPDATED),
+              every_process: bool = False):
+    """Register handler(events) for draw events of the given kinds; a name is registered once"""
+    with _subscribers_lock:
+        if any(s.name == name for s in _subscribers):
+            return
+        _subscribers.append(Subscriber(name, handler, tuple(kinds), every_process))
+
+
+def process_origin() -> str:
+    """
+    Identifies this process's own notifications, which its listener skips.
+    Derived per pid - gunicorn workers forked from a preloaded master must not share it.
+    """
+    global _origin
+    pid = os.getpid()
+    if _origin[0] != pid:
+        _origin = (pid, f"{pid}-{uuid.uuid4().hex[:8]}")
+    return _origin[1]
+
+
+def notify_draw_events(cur, events: List[DrawEvent]):
+    """Queue a NOTIFY for other processes in the writer's open transaction"""
+    for start in range(0, len(events), NOTIFY_EVENTS_PER_PAYLOAD):
+        payload = json.dumps({
+            'origin': process_origin(),
+            'events': [list(e) for e in events[start:start + NOTIFY_EVENTS_PER_PAYLOAD]],
+        })
+        cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+
+
+def dispatch_draw_events(events: List[DrawEvent], remote: bool = False) -> Dict[str, object]:
+    """
+    Run the subscribers for a batch of events, in registration order.
+    Returns {subscriber name: handler result}; a failing handler is logged
+    and does not stop the others.
+    """
+    if not events:
+        return {}
+    _register_default_subscribers()
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+
+    results = {}
+    for subscriber in subscribers:
+        if remote and not subscriber.every_process:
+            continue
+        matching = [e for e in events if e.kind in subscriber.kinds]
+        if not matching:
+            continue
+        started = time.perf_counter()
+        try:
+            results[subscriber.name] = subscriber.handler(matching)
+            logger.info(f"Draw event subscriber {subscriber.name}: {len(matching)} events "
+                        f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+        except Exception as e:
+            logger.error(f"Draw event subscriber {subscriber.name} failed: {e}")
+            results[subscriber.name] = None
+    return results
+
+
+# ========== Cross-process listener ==========
+
+def _listen_forever():
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            logger.info(f"Listening for draw events (origin {process_origin()})")
+            while True:
+                if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                events = []
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    try:
+                        payload = json.loads(notification.payload)
+                    except ValueError:
+                        continue
+                    if payload.get('origin') != process_origin():
+                        events.extend(DrawEvent(*event) for event in payload.get('events', []))
+                dispatch_draw_events(events, remote=True)
+        except Exception as e:
+            logger.warning(f"Draw event listener disconnected ({e}) - retrying in {LISTEN_RECONNECT_SECONDS}s")
+            time.sleep(LISTEN_RECONNECT_SECONDS)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+def start_draw_event_listener() -> bool:
+    """Start this process's listener thread (once per worker, after forking)"""
+    global _listener_thread
+    if not os.environ.get('DATABASE_URL'):
+        return False
+    with _subscribers_lock:
+        if _listener_thread is not None and _listener_thread.is_alive():
+            return False
+        _listener_thread = threading.Thread(target=_listen_forever, name='draw-event-listener', daemon=True)
+        _listener_thread.start()
+    return True
+
+
+# ========== Default subscribers ==========
+
+def _invalidate_page_caches(events):
+    from http_cache import invalidate_draw_caches
+    invalidate_draw_caches()
+
+
+def _invalidate_number_index(events):
+    from number_search import invalidate_number_index
+    invalidate_number_index()
+
+
+def _invalidate_query_caches(events):
+    # Frequency, stats and pattern analytics (cache_manager.cached_query)
+    from cache_manager import get_cache_backend
+    get_cache_backend('queries').clear()
+
+
+def _validate_predictions(events):
+    """Score pending predictions against the new or corrected draws only, in one batch"""
+    from enhanced_workflow_integration import get_workflow_orchestrator
+    orchestrator = get_workflow_orchestrator()
+    draw_ids_by_type = {}
+    for event in events:
+        draw_ids_by_type.setdefault(event.lottery_type, []).append(event.draw_id)
+    validated = orchestrator._validate_draws(draw_ids_by_type).get('count', 0)
+    orchestrator.workflow_stats['predictions_validated'] += validated
+    return validated
+
+
+def _refresh_models(events):
+    """Drop today's trained ensembles for the games that gained a draw; the next prediction retrains"""
+    from neural_network_prediction import invalidate_trained_models
+    games = sorted({event.lottery_type for event in events})
+    for game in games:
+        invalidate_trained_models(game)
+    return games
+
+
+def _generate_predictions(events):
+    """Predict the next draw of each game whose latest draw is one of the new ones"""
+    from enhanced_workflow_integration import get_workflow_orchestrator
+    orchestrator = get_workflow_orchestrator()
+    draws = [(event.lottery_type, event.draw_number) for event in events if event.draw_number is not None]
+    games = sorted({lottery_type for lottery_type, _ in draws})
+    result = orchestrator._ensure_future_predictions(', '.join(games), draws)
+    orchestrator.workflow_stats['predictions_generated'] += result.get('count', 0)
+    return result.get('count', 0)
+
+
+def _register_default_subscribers():
+    global _defaults_registered
+    if _defaults_registered:
+        return
+    _defaults_registered = True
+    subscribe('page_cache', _invalidate_page_caches, every_process=True)
+    subscribe('number_index', _invalidate_number_index, every_process=True)
+    subscribe('query_cache', _invalidate_query_caches, every_process=True)
+    subscribe('prediction_validation', _validate_predictions)
+    # Retrain before generating, so new predictions use the new draw
+    subscribe('model_refresh', _refresh_models, kinds=(DRAW_INSERTED,))
+    subscribe('prediction_generation', _generate_predictions, kinds=(DRAW_INSERTED,))
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Draw Extraction Pipeline
+Pluggable backends for turning a captured results page into draw data.
+
+Backends are tried in order until one produces data that passes validation:
+1. DomParserBackend - parses the page HTML saved next to the screenshot at
+   capture time (<screenshot>.html). Deterministic, milliseconds, free.
+2. GeminiVisionBackend - the existing screenshot -> Gemini extraction, used
+   only when the page could not be parsed or failed validation.
+
+Every run records which backend won, its confidence, validation errors and,
+whenever two backends both produced data, field-level agreement between them
+- so parser drift shows up long before bad data reaches the database.
+
+Saved pages double as fixtures:
+    python draw_extraction.py page.html --lottery-type LOTTO [--expect expected.json]
+    python draw_extraction.py --dump recent_draws_20251003_203257.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Share of DOM-parsed draws that are also sent to Gemini to measure agreement.
+# Each one is a paid call, so sampling is opt-in (e.g. 0.05 while watching for parser drift)
+VERIFY_SAMPLE_RATE = float(os.environ.get('EXTRACTION_VERIFY_RATE', 0))
+
+# (main numbers, bonus numbers, highest bonus ball) per game
+GAME_SHAPES = {
+    'LOTTO': (6, 1, 58),
+    'LOTTO PLUS 1': (6, 1, 58),
+    'LOTTO PLUS 2': (6, 1, 58),
+    'POWERBALL': (5, 1, 20),
+    'POWERBALL PLUS': (5, 1, 20),
+    'DAILY LOTTO': (5, 0, 0),
+}
+
+GAME_DIVISION_COUNTS = {
+    'LOTTO': 8, 'LOTTO PLUS 1': 8, 'LOTTO PLUS 2': 8,
+    'POWERBALL': 9, 'POWERBALL PLUS': 9,
+    'DAILY LOTTO': 4,
+}
+
+REQUIRED_FIELDS = ('draw_id', 'draw_date', 'winning_numbers')
+OPTIONAL_FIELDS = ('prize_divisions', 'rollover_amount', 'total_pool_size', 'total_sales',
+                   'next_jackpot', 'draw_machine', 'next_draw_date')
+COMPARED_FIELDS = REQUIRED_FIELDS + ('bonus_numbers',) + OPTIONAL_FIELDS
+
+
+def html_sidecar_path(screenshot_path: str) -> str:
+    return f"{screenshot_path}.html"
+
+
+# ========== Validation and agreement ==========
+
+def validate_draw_data(data: Dict[str, Any], lottery_type: str) -> List[str]:
+    """Problems that make extracted data unsafe to save - empty when it is valid"""
+    errors = []
+    if not data:
+        return ['no data extracted']
+    from number_search import GAME_MAIN_RANGES
+    main_count, bonus_count, max_bonus = GAME_SHAPES.get(lottery_type, (6, 1, 52))
+    max_main = GAME_MAIN_RANGES.get(lottery_type, 52)
+
+    try:
+        if int(str(data.get('draw_id'))) <= 0:
+            errors.append('draw_id must be positive')
+    except (TypeError, ValueError):
+        errors.append(f"draw_id '{data.get('draw_id')}' is not a number")
+
+    try:
+        datetime.strptime(str(data.get('draw_date')), '%Y-%m-%d')
+    except ValueError:
+        errors.append(f"draw_date '{data.get('draw_date')}' is not YYYY-MM-DD")
+
+    main = data.get('winning_numbers') or []
+    if len(main) != main_count:
+        errors.append(f"expected {main_count} winning numbers, got {len(main)}")
+    elif len(set(main)) != len(main):
+        errors.append('winning numbers repeat')
+    if any(not isinstance(n, int) or not 1 <= n <= max_main for n in main):
+        errors.append(f"winning numbers must be 1-{max_main}")
+
+    bonus = data.get('bonus_numbers') or []
+    if len(bonus) != bonus_count:
+        errors.append(f"expected {bonus_count} bonus numbers, got {len(bonus)}")
+    if any(not isinstance(n, int) or not 1 <= n <= max_bonus for n in bonus):
+        errors.append(f"bonus numbers must be 1-{max_bonus}")
+    if lottery_type in ('LOTTO', 'LOTTO PLUS 1', 'LOTTO PLUS 2') and set(bonus) & set(main):
+        errors.append('bonus ball repeats a winning number')
+
+    return errors
+
+
+def _coerce_numbers(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Numeric strings in the number lists (e.g. "07" from a model) become ints"""
+    if not data:
+        return data
+    for field in ('winning_numbers', 'bonus_numbers'):
+        values = data.get(field)
+        if isinstance(values, list):
+            data[field] = [int(v) if isinstance(v, str) and v.strip().isdigit() else v for v in values]
+    return data
+
+
+def _normalise(field: str, value: Any) -> Any:
+    if value in (None, '', []):
+        return None
+    if field in ('winning_numbers', 'bonus_numbers'):
+        return sorted(int(n) for n in value)
+    if field == 'draw_id':
+        return str(value).strip()
+    if field == 'prize_divisions':
+        return [(_money(d.get('amount')), _count(d.get('winners'))) for d in value if isinstance(d, dict)]
+    if field in ('rollover_amount', 'total_pool_size', 'total_sales', 'next_jackpot'):
+        return _money(value)
+    return str(value).strip().upper()
+
+
+def field_agreement(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Per-field comparison of two extractions: {'fields': {name: True/False},
+    'agreement': share of fields both extracted that match}
+    """
+    fields = {}
+    for field in COMPARED_FIELDS:
+        left, right = _normalise(field, a.get(field)), _normalise(field, b.get(field))
+        if left is None or right is None:
+            continue
+        fields[field] = left == right
+    agreed = sum(fields.values())
+    return {
+        'fields': fields,
+        'agreement': round(agreed / len(fields), 3) if fields else None,
+    }
+
+
+# ========== DOM parser ==========
+
+MONTHS = {m: i for i, m in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+
+DATE_PATTERNS = (
+    (re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b'), lambda m: (int(m[1]), int(m[2]), int(m[3]))),
+    (re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+([A-Za-z]{3,9})\s+(\d{4})\b'),
+     lambda m: (int(m[3]), MONTHS.get(m[2][:3].lower()), int(m[1]))),
+    (re.compile(r'\b(\d{1,2})/(\d{1,2})/(\d{4})\b'), lambda m: (int(m[3]), int(m[2]), int(m[1]))),
+)
+
+MONEY_PATTERN = re.compile(r'R\s?[\d\s,]+(?:\.\d{2})?')
+DIVISION_PATTERN = re.compile(r'^(?:Div(?:ision)?\.?\s*)?(\d+)\b', re.I)
+
+# Label -> field for the labelled values of the results page (the drawInfo
+# block and the summary beside the prize table)
+LABELLED_FIELDS = (
+    (re.compile(r'^Draw\s*(?:ID|No|Number)\b\.?', re.I), 'draw_id'),
+    (re.compile(r'^Rollover\s+Amount', re.I), 'rollover_amount'),
+    (re.compile(r'^Rollover\s+(?:No\.?|Number)', re.I), 'rollover_number'),
+    (re.compile(r'^Total\s+Pool\s+Size', re.I), 'total_pool_size'),
+    (re.compile(r'^Total\s+Sales', re.I), 'total_sales'),
+    # "Jackpot for this draw" is the jackpot just played, not the next one
+    (re.compile(r'^(?:Next\s+)?(?:Estimated\s+)?Jackpot(?!\s+for\s+this)', re.I), 'next_jackpot'),
+    (re.compile(r'^(?:Draw\s+Machine|Machine\s+Name)', re.I), 'draw_machine'),
+    (re.compile(r'^Next\s+Draw\s+Date', re.I), 'next_draw_date'),
+    (re.compile(r'^Draw\s+Date', re.I), 'draw_date'),
+)
+
+# "Draw 2,581" / "Draw No. 2581" inside one archive row
+ARCHIVE_DRAW_ID_PATTERN = re.compile(r'\bDraw\s*(?:ID|No\.?|Number|#)?\s*[:#]?\s*(\d[\d,]{2,})', re.I)
+
+# Single-draw page links, e.g. /lotto/results/01-october-2025
+URL_DATE_PATTERN = re.compile(r'/results/(\d{1,2}-[a-z]+-\d{4})/?$', re.I)
+
+# Class tokens of the bonus ball / PowerBall. Exact tokens: game classes such
+# as "powerball-plus" are on every ball of the page
+BONUS_BALL_CLASSES = {'bonus-ball', 'bonus', 'powerball'}
+
+# Prize table column header -> division field
+DIVISION_COLUMNS = {
+    'division': 'division',
+    'numbers matched': 'description',
+    'winnings': 'amount',
+    'prize': 'amount',
+    'winners': 'winners',
+}
+
+
+def _money(value) -> Optional[float]:
+    if value is None:
+        return None
+    cleaned = re.sub(r'[^\d.]', '', str(value))
+    try:
+        return float(cleaned) if cleaned else None
+    except ValueError:
+        return None
+
+
+def _count(value) -> Optional[int]:
+    digits = re.sub(r'[^\d]', '', str(value or ''))
+    return int(digits) if digits else None
+
+
+def _find_date(text: str) -> Optional[str]:
+    for pattern, parts in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            year, month, day = parts(match)
+            try:
+                return datetime(year, month, day).strftime('%Y-%m-%d')
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def _url_date(url: str) -> Optional[str]:
+    match = URL_DATE_PATTERN.search(url or '')
+    return _find_date(match.group(1).replace('-', ' ')) if match else None
+
+
+def _labelled_values(lines: List[str]) -> Dict[str, Any]:
+    """Labelled values: the value is the rest of the label's line or the next text node"""
+    data = {}
+    for i, line in enumerate(lines):
+        for pattern, field in LABELLED_FIELDS:
+            label = pattern.match(line)
+            if not label or field in data:
+                continue
+            value = line[label.end():].strip(' :') or (lines[i + 1] if i + 1 < len(lines) else '')
+            if field in ('draw_date', 'next_draw_date'):
+                value = _find_date(value)
+            elif field == 'draw_id':
+                match = re.match(r'#?\s*([\d,]+)\b', value)
+                value = match.group(1).replace(',', '') if match else None
+            elif field == 'rollover_number':
+                value = _count(value)
+            elif field != 'draw_machine':
+                money = MONEY_PATTERN.search(value)
+                value = money.group(0).strip() if money else None
+            if value not in (None, ''):
+                data[field] = value
+            break
+    return data
+
+
+def _ball_numbers(soup) -> Tuple[List[int], List[int]]:
+    """Numbers shown as ball elements, split into main and bonus/PowerBall by their class tokens"""
+    main, bonus = [], []
+    # The drawn balls of this page, not the other games' balls around it
+    container = soup.find(id='ballsCell') or soup.find(class_='balls') or soup
+    for element in container.find_all(class_=re.compile(r'ball', re.I)):
+        # Nested ball wrappers would count twice - only take leaf elements
+        if element.find(class_=re.compile(r'ball', re.I)):
+            continue
+        text = element.get_text(strip=True)
+        if not text.isdigit():
+            image = element if element.name == 'img' else element.find('img')
+            text = (image.get('alt', '') if image else '').strip()
+            if not text.isdigit():
+                continue
+        classes = {c.lower() for c in element.get('class', [])}
+        target = bonus if classes & BONUS_BALL_CLASSES else main
+        target.append(int(text))
+    return main, bonus
+
+
+def _division_row(cells: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    match = DIVISION_PATTERN.match(cells.get('division', ''))
+    if not match:
+        return None
+    money = MONEY_PATTERN.search(cells.get('amount', ''))
+    return {
+        'division': f"Div {match.group(1)}",
+        'description': cells.get('description', ''),
+        'winners': _count(cells.get('winners')) or 0,
+        'amount': money.group(0).strip() if money else 'R0.00',
+    }
+
+
+def _prize_divisions(soup) -> List[Dict[str, Any]]:
+    """
+    Rows of the prize breakdown table. Cells are matched to columns by their
+    data-title or the table header; tables without either fall back to a
+    "Div N" first cell.
+    """
+    divisions = []
+    for table in soup.find_all('table'):
+        headers = [th.get_text(' ', strip=True).lower() for th in table.find_all('th')]
+        for row in table.find_all('tr'):
+            cells = row.find_all('td')
+            if not cells:
+                continue
+            named = {}
+            for i, cell in enumerate(cells):
+                title = (cell.get('data-title') or (headers[i] if i < len(headers) else '')).lower()
+                if title in DIVISION_COLUMNS:
+                    named.setdefault(DIVISION_COLUMNS[title], cell.get_text(' ', strip=True))
+            if 'division' not in named:
+                # Unlabelled table: "Div N" first, then the prize and the winner count
+                texts = [c.get_text(' ', strip=True) for c in cells]
+                if not re.match(r'^Div', texts[0], re.I):
+                    continue
+                named = {
+                    'division': texts[0],
+                    'amount': next((c for c in texts[1:] if MONEY_PATTERN.search(c)), ''),
+                    'winners': next((c for c in texts[1:] if re.fullmatch(r'[\d\s,]+', c)), ''),
+                    'description': next((c for c in texts[1:] if re.search(r'correct|\+|bonus|power', c, re.I)), ''),
+                }
+            division = _division_row(named)
+            if division:
+                divisions.append(division)
+        if divisions:
+            break
+    return divisions
+
+
+def parse_results_html(html: str, lottery_type: str) -> Dict[str, Any]:
+    """Draw data in the same shape as the Gemini extraction, from a results page"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(['script', 'style', 'noscript']):
+        tag.decompose()
+
+    data: Dict[str, Any] = {'lottery_type': lottery_type}
+    # The draw's own fields first, so nothing elsewhere on the page can shadow them
+    draw_info = soup.find(class_='drawInfo')
+    if draw_info:
+        data.update(_labelled_values(list(draw_info.stripped_strings)))
+    content = soup.find(id='content') or soup.body or soup
+    for field, value in _labelled_values(list(content.stripped_strings)).items():
+        data.setdefault(field, value)
+
+    if 'draw_date' not in data:
+        # Result pages name the draw's date in their heading, e.g. "Lotto Results for Wednesday 1 October 2025"
+        for heading in (soup.find('h1'), soup.title):
+            found = _find_date(heading.get_text(' ', strip=True)) if heading else None
+            if found:
+                data['draw_date'] = found
+                break
+
+    main_count, bonus_count, _ = GAME_SHAPES.get(lottery_type, (6, 1, 52))
+    main, bonus = _ball_numbers(soup)
+    if not bonus and bonus_count and len(main) >= main_count + bonus_count:
+        # Unstyled balls: the bonus/PowerBall is drawn last
+        bonus = main[main_count:main_count + bonus_count]
+    data['winning_numbers'] = sorted(main[:main_count])
+    data['bonus_numbers'] = bonus[:bonus_count]
+
+    data['prize_divisions'] = _prize_divisions(soup)
+    return data
+
+
+def _row_draw_id(row, headers: List[str]) -> Optional[str]:
+    for i, cell in enumerate(row.find_all('td')):
+        title = (cell.get('data-title') or (headers[i] if i < len(headers) else '')).lower()
+        if 'draw' in title and 'date' not in title:
+            match = re.search(r'[\d,]+', cell.get_text(' ', strip=True))
+            if match:
+                return match.group(0).replace(',', '')
+    match = ARCHIVE_DRAW_ID_PATTERN.search(row.get_text(' ', strip=True))
+    return match.group(1).replace(',', '') if match else None
+
+
+def parse_archive_html(html: str, lottery_type: str) -> List[Dict[str, Any]]:
+    """
+    One draw per row of an archive or history page. Rows carry the balls,
+    the date (in the text or the link to the draw's own page) and, where the
+    page shows it, the draw number; prize breakdowns are only on draw pages.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(['script', 'style', 'noscript']):
+        tag.decompose()
+    content = soup.find(id='content') or soup.body or soup
+    main_count, bonus_count, _ = GAME_SHAPES.get(lottery_type, (6, 1, 52))
+
+    draws, seen = [], set()
+    for balls in content.find_all(class_='balls'):
+        row = balls.find_parent('tr') or balls.parent
+        if id(row) in seen:
+            continue
+        seen.add(id(row))
+        table = row.find_parent('table')
+        headers = [th.get_text(' ', strip=True).lower() for th in table.find_all('th')] if table else []
+
+        data: Dict[str, Any] = {'lottery_type': lottery_type}
+        draw_id = _row_draw_id(row, headers)
+        if draw_id:
+            data['draw_id'] = draw_id
+        link = row.find('a', href=URL_DATE_PATTERN)
+        data['draw_date'] = ((_url_date(link['href']) if link else None)
+                             or _find_date(row.get_text(' ', strip=True)))
+        if link:
+            data['source_url'] = link['href']
+
+        main, bonus = _ball_numbers(row)
+        if not bonus and bonus_count and len(main) >= main_count + bonus_count:
+            bonus = main[main_count:main_count + bonus_count]
+        data['winning_numbers'] = sorted(main[:main_count])
+        data['bonus_numbers'] = bonus[:bonus_count]
+        draws.append(data)
+    return draws
+
+
+def check_saved_pages(dump_path: str) -> Dict[str, Any]:
+    """
+    Parse every single-draw page of a fetch dump ({lottery type: [{url, html}]},
+    as written by fetch_recent_draws) and check each against the page itself:
+    the draw must validate, its date must match the date in the URL and its
+    draw number the one in the page title. Truncated pages (no closing
+    </html>) cannot be checked and are only counted.
+    """
+    with open(dump_path, 'r', encoding='utf-8') as f:
+        dump = json.load(f)
+
+    report = {'checked': 0, 'truncated': 0, 'failed': []}
+    for lottery_type, pages in dump.items():
+        for page in pages:
+            url = page.get('url', '')
+            expected_date = _url_date(url)
+            if not expected_date:
+                continue  # archive and history pages list many draws
+            if '</html>' not in page['html'].lower():
+                report['truncated'] += 1
+                continue
+            report['checked'] += 1
+            data = parse_results_html(page['html'], lottery_type)
+            errors = validate_draw_data(data, lottery_type)
+            if data.get('draw_date') != expected_date:
+                errors.append(f"draw_date {data.get('draw_date')} but the URL says {expected_date}")
+            title = re.search(r'<title>[^<]*Draw\s+(\d+)', page['html'])
+            if title and data.get('draw_id') != title.group(1):
+                errors.append(f"draw_id {data.get('draw_id')} but the title says {title.group(1)}")
+            if len(data.get('prize_divisions') or []) != GAME_DIVISION_COUNTS.get(lottery_type):
+                errors.append(f"{len(data.get('prize_divisions') or [])} prize divisions")
+            if errors:
+                report['failed'].append({'url': url, 'errors': errors})
+    return report
+
+
+# ========== Backends ==========
+
+class ExtractionBackend:
+    """One way of extracting draw data from a capture"""
+
+    name = 'base'
+
+    def available(self, screenshot_path: str) -> bool:
+        return True
+
+    def extract(self, screenshot_path: str, lottery_type: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def confidence(self, data: Dict[str, Any], lottery_type: str) -> float:
+        return float(data.get('extraction_confidence') or 0)
+
+
+class DomParserBackend(ExtractionBackend):
+    """Parses the page HTML saved beside the screenshot"""
+
+    name = 'dom'
+
+    def available(self, screenshot_path):
+        return os.path.exists(html_sidecar_path(screenshot_path))
+
+    def extract(self, screenshot_path, lottery_type):
+        with open(html_sidecar_path(screenshot_path), 'r', encoding='utf-8', errors='replace') as f:
+            return parse_results_html(f.read(), lottery_type)
+
+    def confidence(self, data, lottery_type):
+        """Valid required fields earn 90; the rest depends on how complete the optional fields are"""
+        present = sum(1 for field in OPTIONAL_FIELDS if data.get(field))
+        expected_divisions = GAME_DIVISION_COUNTS.get(lottery_type, 8)
+        if len(data.get('prize_divisions') or []) < expected_divisions:
+            present -= 0.5
+        return round(90 + 10 * max(present, 0) / len(OPTIONAL_FIELDS), 1)
+
+
+class GeminiVisionBackend(ExtractionBackend):
+    """The screenshot -> Gemini extraction of CompleteLotteryProcessor"""
+
+    name = 'gemini'
+    # How the processor's call is labelled in api_usage_tracker
+    source = 'processor'
+    operation = 'results_extraction'
+    model = 'gemini-2.5-pro'
+
+    def __init__(self, processor):
+        self.processor = processor
+
+    def available(self, screenshot_path):
+        return os.path.exists(screenshot_path)
+
+    def extract(self, screenshot_path, lottery_type):
+        return self.processor.process_single_image(screenshot_path, lottery_type)
+
+
+class ExtractionPipeline:
+    """Runs backends in order and keeps the first result that validates"""
+
+    def __init__(self, backends: List[ExtractionBackend], verify_backend: Optional[ExtractionBackend] = None,
+                 verify_rate: float = VERIFY_SAMPLE_RATE):
+        self.backends = backends
+        self.verify_backend = verify_backend
+        self.verify_rate = verify_rate
+
+    def _attempt(self, backend, screenshot_path, lottery_type):
+        started = time.perf_counter()
+        try:
+            data = _coerce_numbers(backend.extract(screenshot_path, lottery_type))
+            errors = validate_draw_data(data, lottery_type)
+        except Exception as e:
+            data, errors = None, [f"{type(e).__name__}: {e}"]
+        return {
+            'backend': backend.name,
+            'data': data,
+            'errors': errors,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def run(self, screenshot_path: str, lottery_type: str) -> Dict[str, Any]:
+        """
+        Extracted draw data plus an 'extraction' report: backend, confidence,
+        validation errors per attempt and field agreement between backends.
+        Raises ValueError when no backend produced valid data.
+        """
+        attempts = []
+        chosen = None
+        for backend in self.backends:
+            if not backend.available(screenshot_path):
+                continue
+            attempt = self._attempt(backend, screenshot_path, lottery_type)
+            attempts.append(attempt)
+            if not attempt['errors']:
+                chosen = (backend, attempt)
+                break
+            logger.info(f"{backend.name} extraction rejected for {os.path.basename(screenshot_path)}: "
+                        f"{'; '.join(attempt['errors'])}")
+
+        if chosen is None:
+            raise ValueError(f"No extraction backend produced valid data for {screenshot_path}: "
+                             f"{[(a['backend'], a['errors']) for a in attempts]}")
+
+        backend, attempt = chosen
+        data = attempt['data']
+        data.setdefault('lottery_type', lottery_type)
+        confidence = backend.confidence(data, lottery_type)
+        data['extraction_confidence'] = confidence
+
+        # Sampled cross-check of a parser result against the vision model
+        if (self.verify_backend and backend is not self.verify_backend
+                and self.verify_rate and random.random() < self.verify_rate):
+            attempts.append(self._attempt(self.verify_backend, screenshot_path, lottery_type))
+
+        # A Gemini call the parser made unnecessary is logged as skipped in API usage
+        skipped = [b for b in self.backends[self.backends.index(backend) + 1:]
+                   if isinstance(b, GeminiVisionBackend)]
+        if skipped and not any(a['backend'] == skipped[0].name for a in attempts):
+            from api_usage_tracker import record_skipped_call
+            record_skipped_call(skipped[0].source, skipped[0].operation, skipped[0].model)
+
+        agreement = None
+        others = [a for a in attempts if a is not attempt and a['data']]
+        if others:
+            agreement = field_agreement(data, others[0]['data'])
+            disagreements = [f for f, ok in agreement['fields'].items() if not ok]
+            if disagreements:
+                logger.warning(f"{backend.name} and {others[0]['backend']} disagree on "
+                               f"{', '.join(disagreements)} for {os.path.basename(screenshot_path)}")
+
+        report = {
+            'backend': backend.name,
+            'confidence': confidence,
+            'attempts': [{k: a[k] for k in ('backend', 'errors', 'elapsed_ms')} for a in attempts],
+            'field_agreement': agreement,
+        }
+        logger.info(f"Extracted {lottery_type} draw {data.get('draw_id')} with {backend.name} "
+                    f"({confidence}% confidence, {attempt['elapsed_ms']}ms)")
+        return {**data, 'extraction': report}
+
+
+def main():
+    """Run the DOM parser over saved pages - for checking the parser against fixtures"""
+    parser = argparse.ArgumentParser(description='Parse a saved lottery results page')
+    parser.add_argument('html_file', nargs='?')
+    parser.add_argument('--lottery-type')
+    parser.add_argument('--expect', help='JSON file with the expected extraction')
+    parser.add_argument('--dump', help='Check every results page of a fetch dump (e.g. recent_draws_*.json)')
+    args = parser.parse_args()
+
+    if args.dump:
+        report = check_saved_pages(args.dump)
+        for failure in report['failed']:
+            print(f"FAIL {failure['url']}: {'; '.join(failure['errors'])}")
+        if report['truncated']:
+            print(f"SKIP {report['truncated']} truncated pages")
+        print(f"{report['checked'] - len(report['failed'])}/{report['checked']} saved pages parsed correctly")
+        return 1 if report['failed'] or not report['checked'] else 0
+    if not args.html_file or not args.lottery_type:
+        parser.error('html_file and --lottery-type are required without --dump')
+
+    with open(args.html_file, 'r', encoding='utf-8', errors='replace') as f:
+        data = parse_results_html(f.read(), args.lottery_type)
+    errors = validate_draw_data(data, args.lottery_type)
+    print(json.dumps(data, indent=2))
+    for error in errors:
+        print(f"INVALID: {error}")
+
+    if args.expect:
+        with open(args.expect, 'r') as f:
+            expected = json.load(f)
+        agreement = field_agreement(data, expected)
+        for field, ok in agreement['fields'].items():
+            print(f"{'ok  ' if ok else 'DIFF'} {field}: {data.get(field)!r} vs {expected.get(field)!r}")
+        missing = [f for f in COMPARED_FIELDS if expected.get(f) and not data.get(f)]
+        for field in missing:
+            print(f"MISS {field}: expected {expected.get(field)!r}")
+        errors = errors or [f for f, ok in agreement['fields'].items() if not ok] or missing
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
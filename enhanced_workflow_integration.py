@@ -5,10 +5,13 @@ Coordinates database updates, AI predictions, and screenshot archival seamlessly
 
 import os
 import logging
+import threading
 import psycopg2
 from datetime import datetime
 from typing import Dict, List, Optional
 import json
+from prediction_metrics import invalidate_prediction_metrics
+from match_scoring import score_line
 
 logger = logging.getLogger(__name__)
 
@@ -79,74 +82,65 @@ class EnhancedWorkflowOrchestrator:
     
     def _validate_predictions(self, lottery_type: str, database_record_id: int) -> Dict:
         """Validate predictions against newly uploaded result"""
+        return self._validate_draws({lottery_type: [database_record_id]})
+    
+    def _validate_draws(self, draw_ids_by_type: Dict[str, List[int]]) -> Dict:
+        """
+        Validate pending predictions against a batch of saved draws
+        ({lottery_type: [lottery_results ids]}) in one query and one update.
+        Draws older than a game's oldest pending prediction are never read.
+        """
+        draw_ids = [draw_id for ids in draw_ids_by_type.values() for draw_id in ids]
+        if not draw_ids:
+            return {'success': True, 'count': 0}
         try:
-            conn = psycopg2.connect(self.db_url)
-            cur = conn.cursor()
-            
-            # Get the newly uploaded result
-            cur.execute("""
-                SELECT draw_date, main_numbers, bonus_numbers
-                FROM lottery_results
-                WHERE id = %s
-            """, (database_record_id,))
-            
-            result_row = cur.fetchone()
-            if not result_row:
-                logger.warning(f"No result found for ID {database_record_id}")
-                cur.close()
-                conn.close()
-                return {'success': False, 'count': 0, 'error': 'Result not found'}
-            
-            draw_date, actual_main, actual_bonus = result_row
-            
-            # Find predictions for this date/lottery type
-            cur.execute("""
-                SELECT id, predicted_numbers, bonus_numbers
-                FROM lottery_predictions
-                WHERE game_type = %s 
-                  AND target_draw_date = %s
-                  AND validation_status = 'pending'
-            """, (lottery_type, draw_date))
-            
-            predictions = cur.fetchall()
-            validated_count = 0
-            
-            for pred_id, pred_main, pred_bonus in predictions:
-                # Calculate matches
-                matches = self._calculate_prediction_accuracy(
-                    actual_main, actual_bonus, pred_main, pred_bonus
-                )
-                
-                # Update prediction with validation results
-                cur.execute("""
-                    UPDATE lottery_predictions
-                    SET validation_status = CASE 
-                            WHEN %s >= 4 THEN 'correct'
-                            ELSE 'incorrect'
-                        END,
-                        verified_at = NOW(),
-                        is_verified = TRUE,
-                        main_number_matches = %s,
-                        bonus_number_matches = %s,
-                        accuracy_percentage = %s,
-                        matched_main_numbers = %s
-                    WHERE id = %s
-                """, (
-                    matches['main_matches'],
-                    matches['main_matches'],
-                    matches['bonus_matches'],
-                    matches['accuracy_percentage'],
-                    json.dumps(matches['matched_numbers']),
-                    pred_id
-                ))
-                validated_count += 1
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            logger.info(f"✅ Validated {validated_count} predictions for {lottery_type}")
-            return {'success': True, 'count': validated_count}
+            from psycopg2.extras import execute_values
+            from db_pool import get_db_connection
+            
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        WITH oldest_pending AS (
+                            SELECT game_type, MIN(target_draw_date) AS since
+                            FROM lottery_predictions
+                            WHERE validation_status = 'pending' AND game_type = ANY(%s)
+                            GROUP BY game_type
+                        )
+                        SELECT p.id, p.predicted_numbers, p.bonus_numbers, r.main_numbers, r.bonus_numbers
+                        FROM lottery_results r
+                        JOIN oldest_pending o ON o.game_type = r.lottery_type AND r.draw_date >= o.since
+                        JOIN lottery_predictions p ON p.game_type = r.lottery_type
+                                                  AND p.target_draw_date = r.draw_date
+                                                  AND p.validation_status = 'pending'
+                        WHERE r.id = ANY(%s)
+                    """, (list(draw_ids_by_type), draw_ids))
+                    
+                    rows = []
+                    for pred_id, pred_main, pred_bonus, actual_main, actual_bonus in cur.fetchall():
+                        matches = self._calculate_prediction_accuracy(
+                            actual_main, actual_bonus, pred_main, pred_bonus
+                        )
+                        rows.append((pred_id, matches['main_matches'], matches['bonus_matches'],
+                                     matches['accuracy_percentage'], matches['matched_numbers']))
+                    
+                    if rows:
+                        execute_values(cur, """
+                            UPDATE lottery_predictions p
+                            SET validation_status = CASE WHEN v.main_matches >= 4 THEN 'correct' ELSE 'incorrect' END,
+                                verified_at = NOW(),
+                                is_verified = TRUE,
+                                main_number_matches = v.main_matches,
+                                bonus_number_matches = v.bonus_matches,
+                                accuracy_percentage = v.accuracy,
+                                matched_main_numbers = v.matched
+                            FROM (VALUES %s) AS v (id, main_matches, bonus_matches, accuracy, matched)
+                            WHERE p.id = v.id
+                        """, rows, template='(%s, %s, %s, %s, %s::INTEGER[])')
+            
+            if rows:
+                invalidate_prediction_metrics()
+            logger.info(f"✅ Validated {len(rows)} predictions for {', '.join(sorted(draw_ids_by_type))}")
+            return {'success': True, 'count': len(rows)}
             
         except Exception as e:
             logger.error(f"❌ Prediction validation error: {e}")
@@ -175,18 +169,17 @@ class EnhancedWorkflowOrchestrator:
                     pred_bonus = json.loads(pred_bonus) if pred_bonus not in ['{}', '[]', None] else []
             
             # Calculate matches
-            matched_main = set(actual_main or []) & set(pred_main or [])
-            matched_bonus = set(actual_bonus or []) & set(pred_bonus or [])
+            score = score_line(pred_main, actual_main, pred_bonus, actual_bonus)
             
             total_predicted = len(pred_main or []) + len(pred_bonus or [])
-            total_matched = len(matched_main) + len(matched_bonus)
+            total_matched = score['main_matches'] + score['bonus_matches']
             
             accuracy_pct = (total_matched / total_predicted * 100) if total_predicted > 0 else 0
             
             return {
-                'main_matches': len(matched_main),
-                'bonus_matches': len(matched_bonus),
-                'matched_numbers': sorted(list(matched_main)),
+                'main_matches': score['main_matches'],
+                'bonus_matches': score['bonus_matches'],
+                'matched_numbers': score['matched_main'],
                 'accuracy_percentage': round(accuracy_pct, 2)
             }
             
@@ -199,20 +192,23 @@ class EnhancedWorkflowOrchestrator:
                 'accuracy_percentage': 0.0
             }
     
-    def _ensure_future_predictions(self, lottery_type: str) -> Dict:
-        """Ensure predictions exist for future draws"""
+    def _ensure_future_predictions(self, lottery_type: str, draws=None) -> Dict:
+        """
+        Ensure predictions exist for future draws - only after the given
+        (lottery_type, draw_number) draws when draws is passed
+        """
         try:
             # Import the fresh prediction generator
             from fresh_prediction_generator import generate_fresh_predictions_for_new_draws
             
             # Generate fresh predictions
-            success = generate_fresh_predictions_for_new_draws()
+            generated = generate_fresh_predictions_for_new_draws(draws)
             
-            if success:
-                logger.info(f"✅ Generated fresh predictions for {lottery_type}")
-                return {'success': True, 'count': 1}
+            if generated is not None:
+                logger.info(f"✅ Generated {generated} fresh predictions for {lottery_type}")
+                return {'success': True, 'count': generated}
             else:
-                logger.warning(f"⚠️ Fresh prediction generation returned False")
+                logger.warning(f"⚠️ Fresh prediction generation failed")
                 return {'success': False, 'count': 0}
                 
         except Exception as e:
@@ -222,7 +218,8 @@ class EnhancedWorkflowOrchestrator:
     def handle_post_database_update(self) -> Dict:
         """
         Handle post-database-update workflow for ALL lottery types
-        This is used by the admin automation and scheduler after batch processing
+        Used by the manual /admin/generate-predictions-only run; saved draws
+        trigger the per-draw equivalent through draw_events
         
         Returns:
             Dict with predictions_validated and predictions_generated counts
@@ -248,12 +245,12 @@ class EnhancedWorkflowOrchestrator:
             logger.info("Step 2: Generating fresh predictions for all lottery types...")
             try:
                 from fresh_prediction_generator import generate_fresh_predictions_for_new_draws
-                success = generate_fresh_predictions_for_new_draws()
-                if success:
-                    predictions_generated = 1
-                    logger.info(f"✅ Fresh predictions generated successfully")
+                generated = generate_fresh_predictions_for_new_draws()
+                if generated is not None:
+                    predictions_generated = generated
+                    logger.info(f"✅ Generated {generated} fresh predictions")
                 else:
-                    logger.warning(f"⚠️ Fresh prediction generation returned False")
+                    logger.warning(f"⚠️ Fresh prediction generation failed")
             except Exception as generation_error:
                 logger.error(f"❌ Prediction generation error: {generation_error}")
             
@@ -351,12 +348,15 @@ class EnhancedWorkflowOrchestrator:
 
 # Global orchestrator instance
 _workflow_orchestrator = None
+_workflow_orchestrator_lock = threading.Lock()
 
 def get_workflow_orchestrator() -> EnhancedWorkflowOrchestrator:
     """Get or create the global workflow orchestrator instance"""
     global _workflow_orchestrator
     if _workflow_orchestrator is None:
-        _workflow_orchestrator = EnhancedWorkflowOrchestrator()
+        with _workflow_orchestrator_lock:
+            if _workflow_orchestrator is None:
+                _workflow_orchestrator = EnhancedWorkflowOrchestrator()
     return _workflow_orchestrator
 
 
@@ -12,6 +12,7 @@ import json
 from datetime import datetime, timedelta
 from collections import Counter
 import numpy as np
+from prediction_metrics import invalidate_prediction_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -199,10 +200,14 @@ def cleanup_old_pending_predictions(cur, lottery_type):
         logger.warning(f"⚠️ Error cleaning up old predictions for {lottery_type}: {e}")
         return 0
 
-def generate_fresh_predictions_for_new_draws():
+def generate_fresh_predictions_for_new_draws(draws=None):
     """
     Automatically generate fresh predictions for newly completed draws
     This ensures each upcoming draw has unique prediction numbers
+
+    draws limits the work to (lottery_type, draw_number) pairs that were just
+    saved - a game is only predicted when one of them is its latest draw.
+    Returns the number of predictions generated, or None on failure.
     """
     try:
         logger.info("🎯 Generating fresh predictions for new draws...")
@@ -221,6 +226,17 @@ def generate_fresh_predictions_for_new_draws():
             'DAILY LOTTO': {'main_count': 5, 'main_range': (1, 36), 'bonus_count': 0}
         }
         
+        game_filter, draw_filter, params = '', '', ()
+        if draws is not None:
+            draws = tuple(sorted({(lottery_type, int(draw_number)) for lottery_type, draw_number in draws}))
+            if not draws:
+                cur.close()
+                conn.close()
+                return 0
+            game_filter = 'WHERE lr.lottery_type = ANY(%s)'
+            draw_filter = 'AND (lottery_type, completed_draw) IN %s'
+            params = (sorted({lottery_type for lottery_type, _ in draws}), draws)
+
         # Find the latest completed draw for each game that doesn't have a prediction for the next draw
         cur.execute('''
             WITH latest_draws AS (
@@ -232,6 +248,7 @@ def generate_fresh_predictions_for_new_draws():
                     lr.next_draw_date,
                     ROW_NUMBER() OVER (PARTITION BY lr.lottery_type ORDER BY lr.draw_date DESC) as rn
                 FROM lottery_results lr
+                {game_filter}
             )
             SELECT 
                 lottery_type,
@@ -246,8 +263,9 @@ def generate_fresh_predictions_for_new_draws():
                   WHERE lp.game_type = latest_draws.lottery_type 
                     AND lp.linked_draw_id = latest_draws.next_draw_needed
               )
+              {draw_filter}
             ORDER BY lottery_type
-        ''')
+        '''.format(game_filter=game_filter, draw_filter=draw_filter), params)
         
         new_draws_needed = cur.fetchall()
         
@@ -255,7 +273,7 @@ def generate_fresh_predictions_for_new_draws():
             logger.info("✅ All recent draws already have fresh predictions")
             cur.close()
             conn.close()
-            return True
+            return 0
         
         # Generate fresh predictions for each missing next draw
         for lottery_type, completed_draw, draw_date, next_draw, next_draw_date in new_draws_needed:
@@ -399,15 +417,16 @@ def generate_fresh_predictions_for_new_draws():
             logger.info(f"✅ NEW FRESH PREDICTION: {lottery_type} Draw {next_draw}: {main_numbers} + {bonus_numbers}")
         
         conn.commit()
+        invalidate_prediction_metrics()
         logger.info(f"🎯 Generated {len(new_draws_needed)} fresh predictions!")
         
         cur.close()
         conn.close()
-        return True
+        return len(new_draws_needed)
         
     except Exception as e:
         logger.error(f"❌ Fresh prediction generation failed: {e}")
-        return False
+        return None
 
 if __name__ == "__main__":
     # Test run
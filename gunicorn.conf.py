@@ -4,13 +4,28 @@ import os
 # Deployment provides PORT environment variable, fallback to 5000 for consistency
 port = int(os.environ.get('PORT', 5000))
 bind = f"0.0.0.0:{port}"
-workers = 1
-worker_class = "sync"
+
+# Serving mode - "gthread" (default) serves requests from a thread pool so a slow
+# Gemini call or training run no longer blocks every other visitor, "gevent"
+# uses green threads (needs the gevent extra: gevent + psycogreen), and "sync"
+# is the original one-request-at-a-time worker kept for comparison.
+serving_mode = os.environ.get('SERVING_MODE', 'gthread').lower()
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+if serving_mode == 'gevent':
+    worker_class = "gevent"
+elif serving_mode == 'sync':
+    worker_class = "sync"
+else:
+    worker_class = "gthread"
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
 timeout = 300
 keepalive = 2
 max_requests = 1000
 max_requests_jitter = 50
-preload_app = True
+# gevent patches the standard library in each worker; preloading the app in the
+# master first would leave module-level locks and sockets unpatched
+preload_app = serving_mode != 'gevent'
 
 # Logging
 accesslog = "-"
@@ -22,4 +37,49 @@ proc_name = "sa_lottery_app"
 
 # Worker settings for Cloud Run
 worker_tmp_dir = "/dev/shm"
-worker_connections = 1000
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+
+def on_starting(server):
+    """Apply pending schema migrations once in the master, before any worker serves"""
+    if os.environ.get('RUN_MIGRATIONS', 'true').lower() not in ('true', '1', 'yes'):
+        return
+    try:
+        from db_migrations import run_migrations
+        applied = run_migrations()
+        if applied:
+            server.log.info(f"Applied migrations: {', '.join(applied)}")
+    except Exception as e:
+        server.log.error(f"Database migrations failed: {e}")
+
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative under gevent so queries yield to other requests"""
+    if worker_class == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen not installed - database calls will block the gevent loop")
+
+
+def post_worker_init(worker):
+    """
+    Listen for draw changes made by other processes. Runs after the worker has
+    initialised (and gevent has patched threading), so the listener is a
+    cooperative thread rather than a native one blocking the loop
+    """
+    try:
+        from draw_events import start_draw_event_listener
+        start_draw_event_listener()
+    except Exception as e:
+        worker.log.warning(f"Draw event listener not started: {e}")
+
+
+def worker_exit(server, worker):
+    """Release pooled database connections when a worker shuts down"""
+    try:
+        from db_pool import close_pool
+        close_pool()
+    except Exception as e:
+        server.log.warning(f"Failed to close database pool: {e}")
@@ -0,0 +1,208 @@
+"""
+HTTP Caching Module
+Conditional GET support (ETag / 304 Not Modified) and Cache-Control headers
+for results pages and read-only API endpoints.
+
+Draw data only changes a few times a day, so each response is tagged with an
+ETag derived from the current data version (latest draw id / prediction
+version). Browsers, the CDN and the PWA service worker revalidate with
+If-None-Match and get an empty 304 when nothing has changed.
+
+Rendered pages for anonymous visitors are also kept as pre-rendered bytes,
+keyed by (route, params, data version), so popular draw pages skip Jinja
+rendering entirely. Call invalidate_draw_caches() after a draw is saved.
+"""
+
+import os
+import hashlib
+import logging
+from datetime import date
+from functools import wraps
+
+from flask import request, session, make_response, Response
+from flask_login import current_user
+
+from cache_manager import get_cache_backend
+from db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# How long a computed data version is trusted before it is re-read from the database
+VERSION_TTL = int(os.environ.get('HTTP_CACHE_VERSION_TTL', 15))
+
+# How long a rendered page is kept (it is also dropped when the data version changes)
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 3600))
+
+# Which tables feed each cache scope
+SCOPE_SOURCES = {
+    'results': ('draws', 'predictions'),
+    'draw': ('draws', 'predictions'),
+    'predictions': ('predictions',),
+    'visualization': ('draws',),
+    'draws': ('draws',),
+}
+
+# Scopes whose content depends on CURRENT_DATE (e.g. "upcoming" predictions)
+DATE_SENSITIVE_SCOPES = {'results', 'predictions'}
+
+_version_cache = get_cache_backend('http_versions', default_ttl=VERSION_TTL)
+_page_cache = get_cache_backend('pages', default_ttl=PAGE_CACHE_TTL)
+
+
+def _fetch_source_version(source):
+    """Read a compact version fingerprint for one data source"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if source == 'draws':
+                cur.execute("""
+                    SELECT MAX(id), COUNT(*), MAX(updated_at)
+                    FROM lottery_results
+                """)
+            else:
+                cur.execute("""
+                    SELECT MAX(id), COUNT(*), MAX(created_at), MAX(verified_at), MAX(validation_date)
+                    FROM lottery_predictions
+                """)
+            row = cur.fetchone()
+    return '|'.join(str(value) for value in row)
+
+
+def get_data_version(scope):
+    """
+    Get the data version string for a cache scope, or None if it cannot be
+    determined (in which case callers should skip conditional handling).
+    """
+    parts = []
+    for source in SCOPE_SOURCES.get(scope, ('draws',)):
+        version = _version_cache.get(source)
+        if version is None:
+            try:
+                version = _fetch_source_version(source)
+                _version_cache.set(source, version)
+            except Exception as e:
+                logger.warning(f"Could not determine {source} data version: {e}")
+                return None
+        parts.append(version)
+
+    if scope in DATE_SENSITIVE_SCOPES:
+        parts.append(date.today().isoformat())
+
+    return ':'.join(parts)
+
+
+def invalidate_data_version(source=None):
+    """Forget cached data versions so the next request re-reads them"""
+    if source:
+        _version_cache.delete(source)
+    else:
+        _version_cache.clear()
+
+
+def invalidate_draw_caches():
+    """Drop cached data versions and rendered pages - call after a draw insert/update"""
+    invalidate_data_version()
+    _page_cache.clear()
+    logger.info("HTTP data versions and page cache invalidated")
+
+
+def _is_anonymous():
+    return not (current_user and current_user.is_authenticated)
+
+
+def build_etag(scope, version):
+    """ETag for the current request - path, query string, viewer and data version"""
+    viewer = 'anon'
+    if not _is_anonymous():
+        viewer = f"user-{current_user.get_id()}"
+
+    basis = '\x1f'.join([
+        scope,
+        request.path,
+        request.query_string.decode('utf-8', 'replace'),
+        viewer,
+        version,
+    ])
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+
+def cache_control_value(max_age, stale_while_revalidate):
+    """Cache-Control header - shared caches only for anonymous visitors"""
+    if not _is_anonymous():
+        return 'private, no-cache'
+    return f"public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}"
+
+
+def conditional_get(scope, max_age=60, stale_while_revalidate=300):
+    """
+    Decorator adding ETag / 304 support and Cache-Control to a GET view.
+
+    Requests with pending flash messages are served uncached so the message
+    is not swallowed by a 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            version = get_data_version(scope)
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag = build_etag(scope, version)
+            cache_control = cache_control_value(max_age, stale_while_revalidate)
+
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = cache_control
+                response.headers['Vary'] = 'Cookie'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = cache_control
+                response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_page(scope, ttl=None):
+    """
+    Decorator serving pre-rendered page bytes for anonymous GET requests.
+
+    Entries are keyed by (scope, path, query string, data version), so a new
+    draw produces new keys even before the cache is explicitly invalidated.
+    Place it below conditional_get so a 304 never renders at all.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes') or not _is_anonymous():
+                return view(*args, **kwargs)
+
+            version = get_data_version(scope)
+            if version is None:
+                return view(*args, **kwargs)
+
+            basis = '\x1f'.join([
+                scope,
+                request.path,
+                request.query_string.decode('utf-8', 'replace'),
+                version,
+            ])
+            key = f"{scope}:{hashlib.sha1(basis.encode('utf-8')).hexdigest()}"
+
+            cached = _page_cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                return Response(body, status=200, mimetype=mimetype)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                _page_cache.set(key, (response.get_data(), response.mimetype), ttl)
+            return response
+        return wrapper
+    return decorator
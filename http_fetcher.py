@@ -0,0 +1,206 @@
+"""
+HTTP Fetcher
+Concurrent page fetching for the results scrapers.
+
+One pooled requests.Session is shared by a thread pool, so connections are
+kept alive across pages. Each host gets its own concurrency limit, failed
+requests are retried with exponential backoff (honouring Retry-After on 429
+and 503), and responses are cached on disk:
+
+- every cached page stores its ETag / Last-Modified, and later fetches send
+  them back - a 304 reuses the cached body without downloading it again
+- pages younger than max_age are served from the cache with no request at
+  all (draw pages never change once published)
+
+Point the scrapers at a local server (python -m http.server in a folder of
+saved pages) with --base-url to run them against fixtures.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+FETCH_CACHE_DIR = os.environ.get('SCRAPE_CACHE_DIR', '.scrape_cache')
+# Parallel requests in total and to any single host
+FETCH_MAX_WORKERS = int(os.environ.get('SCRAPE_MAX_WORKERS', 16))
+FETCH_PER_HOST = int(os.environ.get('SCRAPE_PER_HOST', 4))
+FETCH_RETRIES = int(os.environ.get('SCRAPE_RETRIES', 4))
+# Retry n waits backoff * 2^(n-1) seconds
+FETCH_BACKOFF = float(os.environ.get('SCRAPE_BACKOFF', 0.5))
+FETCH_TIMEOUT = float(os.environ.get('SCRAPE_TIMEOUT', 20))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+FetchResult = namedtuple('FetchResult', ['url', 'status', 'text', 'from_cache', 'elapsed_ms'])
+
+
+class ResponseCache:
+    """Pages on disk, one JSON file per URL"""
+
+    def __init__(self, cache_dir=FETCH_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write(self, url, entry):
+        # Temp file + rename, so concurrent readers never see half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(url))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, url, response):
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored_at': time.time(),
+            'text': response.text,
+        }
+        self._write(url, entry)
+        return entry
+
+    def touch(self, url, entry):
+        """Mark a cached page as revalidated now (after a 304)"""
+        entry['stored_at'] = time.time()
+        self._write(url, entry)
+
+
+class HttpFetcher:
+    """
+    Shared-session fetcher. get() is safe to call from many threads;
+    fetch_many() runs a batch of URLs through the pool and yields results as
+    they finish.
+    """
+
+    def __init__(self, cache_dir=FETCH_CACHE_DIR, max_workers=FETCH_MAX_WORKERS, per_host=FETCH_PER_HOST,
+                 retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, timeout=FETCH_TIMEOUT):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # Enough pooled connections per host for every permitted request
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=per_host, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+
+        self._host_limits = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'downloaded': 0, 'not_modified': 0, 'cache_hits': 0, 'errors': 0}
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get(self, url, max_age=0):
+        """
+        Page text for a URL, from the cache when it is fresh or unchanged.
+        Raises requests.RequestException once retries are exhausted.
+        """
+        started = time.perf_counter()
+        cached = self.cache.get(url) if self.cache else None
+        if cached and max_age and time.time() - cached.get('stored_at', 0) < max_age:
+            self._count('cache_hits')
+            return FetchResult(url, 200, cached['text'], True, 0)
+
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        with self._host_limit(url):
+            self._count('requests')
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except requests.RequestException:
+                self._count('errors')
+                raise
+
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        if response.status_code == 304 and cached:
+            self._count('not_modified')
+            self.cache.touch(url, cached)
+            return FetchResult(url, 304, cached['text'], True, elapsed_ms)
+
+        self._count('downloaded')
+        if self.cache:
+            self.cache.put(url, response)
+        return FetchResult(url, response.status_code, response.text, False, elapsed_ms)
+
+    def fetch_many(self, urls, max_age=0):
+        """
+        Yield (url, FetchResult or exception) for each URL as it completes;
+        one failed page does not stop the rest
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            futures = {executor.submit(self.get, url, max_age): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield url, future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to fetch {url}: {e}")
+                    yield url, e
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
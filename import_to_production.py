@@ -21,7 +21,7 @@ LOTTERY_DATA = [
     {"lottery_type": "LOTTO PLUS 2", "draw_number": 2584, "draw_date": "2025-10-11", "main_numbers": "[11, 33, 40, 50, 52, 56]", "bonus_numbers": "[58]", "next_draw_date": "2025-10-15", "prize_divisions": '[{"amount": "R0.00", "winners": 0, "division": "Div 1", "description": "SIX CORRECT NUMBERS"}, {"amount": "R0.00", "winners": 0, "division": "Div 2", "description": "FIVE CORRECT NUMBERS + BONUS BALL"}, {"amount": "R5,241.90", "winners": 12, "division": "Div 3", "description": "FIVE CORRECT NUMBERS"}, {"amount": "R1,367.40", "winners": 40, "division": "Div 4", "description": "FOUR CORRECT NUMBERS + BONUS BALL"}, {"amount": "R156.50", "winners": 874, "division": "Div 5", "description": "FOUR CORRECT NUMBERS"}, {"amount": "R79.00", "winners": 1385, "division": "Div 6", "description": "THREE CORRECT NUMBERS + BONUS BALL"}, {"amount": "R27.60", "winners": 20777, "division": "Div 7", "description": "THREE CORRECT NUMBERS"}, {"amount": "R4.90", "winners": 206664, "division": "Div 8", "description": "AS PER THE GAME RULES AT THE TIME OF DRAW"}]'},
     
     # POWERBALL results
-    {"lottery_type": "POWERBALL", "draw_number": 1658, "draw_date": "2025-10-11", "main_numbers": "[6, 10, 40, 44, 50]", "bonus_numbers": "[11]", "next_draw_date": "2025-10-14", "prize_divisions": '[{"amount": "R0.00", "winners": 0, "division": "Div 1", "description": "FIVE CORRECT NUMBERS + POWERBALL"}, {"amount": "R0.00", "winners": 0, "division": "Div 2", "description": "FIVE CORRECT NUMBERS"}, {"amount": "R19,062.50", "winners": 8, "division": "Div 3", "description": "FOUR CORRECT NUMBERS + POWERBALL"}, {"amount": "R2,382.30", "winners"": 64, "division": "Div 4", "description": "FOUR CORRECT NUMBERS"}, {"amount": "R447.30", "winners": 332, "division": "Div 5", "description": "THREE CORRECT NUMBERS + POWERBALL"}, {"amount": "R112.40", "winners": 1323, "division": "Div 6", "description": "THREE CORRECT NUMBERS"}, {"amount": "R74.40", "winners": 2002, "division": "Div 7", "description": "TWO CORRECT NUMBERS + POWERBALL"}, {"amount": "R35.40", "winners": 7438, "division": "Div 8", "description": "ONE CORRECT NUMBER + POWERBALL"}, {"amount": "R20.00", "winners": 12979, "division": "Div 9", "description": "POWERBALL"}]'},
+    {"lottery_type": "POWERBALL", "draw_number": 1658, "draw_date": "2025-10-11", "main_numbers": "[6, 10, 40, 44, 50]", "bonus_numbers": "[11]", "next_draw_date": "2025-10-14", "prize_divisions": '[{"amount": "R0.00", "winners": 0, "division": "Div 1", "description": "FIVE CORRECT NUMBERS + POWERBALL"}, {"amount": "R0.00", "winners": 0, "division": "Div 2", "description": "FIVE CORRECT NUMBERS"}, {"amount": "R19,062.50", "winners": 8, "division": "Div 3", "description": "FOUR CORRECT NUMBERS + POWERBALL"}, {"amount": "R2,382.30", "winners": 64, "division": "Div 4", "description": "FOUR CORRECT NUMBERS"}, {"amount": "R447.30", "winners": 332, "division": "Div 5", "description": "THREE CORRECT NUMBERS + POWERBALL"}, {"amount": "R112.40", "winners": 1323, "division": "Div 6", "description": "THREE CORRECT NUMBERS"}, {"amount": "R74.40", "winners": 2002, "division": "Div 7", "description": "TWO CORRECT NUMBERS + POWERBALL"}, {"amount": "R35.40", "winners": 7438, "division": "Div 8", "description": "ONE CORRECT NUMBER + POWERBALL"}, {"amount": "R20.00", "winners": 12979, "division": "Div 9", "description": "POWERBALL"}]'},
     
     # POWERBALL PLUS results
     {"lottery_type": "POWERBALL PLUS", "draw_number": 1658, "draw_date": "2025-10-10", "main_numbers": "[3, 22, 27, 43, 50]", "bonus_numbers": "[7]", "next_draw_date": "2025-10-14", "prize_divisions": '[{"amount": "R0.00", "winners": 0, "division": "Div 1", "description": "FIVE CORRECT NUMBERS + POWERBALL"}, {"amount": "R0.00", "winners": 0, "division": "Div 2", "description": "FIVE CORRECT NUMBERS"}, {"amount": "R10,540.10", "winners": 13, "division": "Div 3", "description": "FOUR CORRECT NUMBERS + POWERBALL"}, {"amount": "R1,421.30", "winners": 96, "division": "Div 4", "description": "FOUR CORRECT NUMBERS"}, {"amount": "R267.30", "winners": 512, "division": "Div 5", "description": "THREE CORRECT NUMBERS + POWERBALL"}, {"amount": "R62.80", "winners": 2176, "division": "Div 6", "description": "THREE CORRECT NUMBERS"}, {"amount": "R43.40", "winners": 3144, "division": "Div 7", "description": "TWO CORRECT NUMBERS + POWERBALL"}, {"amount": "R19.80", "winners": 11634, "division": "Div 8", "description": "ONE CORRECT NUMBER + POWERBALL"}, {"amount": "R12.00", "winners": 20277, "division": "Div 9", "description": "POWERBALL"}]'},
@@ -42,59 +42,31 @@ def import_data_to_production():
             print("Make sure you're running this in the production environment.")
             return False
         
-        conn = psycopg2.connect(database_url)
-        cur = conn.cursor()
-        
         print("=" * 60)
         print("🚀 PRODUCTION DATA IMPORT STARTED")
         print("=" * 60)
         print(f"Connected to production database: {database_url[:50]}...")
         
-        imported_count = 0
-        skipped_count = 0
+        # Validated, COPYed and merged in one batch; re-running is a no-op
+        from db_migrations import run_migrations
+        from bulk_import import import_records
+        run_migrations()
+        summary = import_records(LOTTERY_DATA)
         
-        for data in LOTTERY_DATA:
-            # Check if this draw already exists
-            cur.execute("""
-                SELECT id FROM lottery_results 
-                WHERE lottery_type = %s AND draw_number = %s
-            """, (data['lottery_type'], data['draw_number']))
-            
-            existing = cur.fetchone()
-            
-            if existing:
-                print(f"⏭️  SKIPPED: {data['lottery_type']} Draw {data['draw_number']} (already exists)")
-                skipped_count += 1
-                continue
-            
-            # Insert the data
-            cur.execute("""
-                INSERT INTO lottery_results 
-                (lottery_type, draw_number, draw_date, main_numbers, bonus_numbers, next_draw_date, prize_divisions, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-            """, (
-                data['lottery_type'],
-                data['draw_number'],
-                data['draw_date'],
-                data['main_numbers'],
-                data['bonus_numbers'],
-                data.get('next_draw_date'),
-                data.get('prize_divisions')
-            ))
-            
-            print(f"✅ IMPORTED: {data['lottery_type']} Draw {data['draw_number']} ({data['draw_date']})")
-            imported_count += 1
-        
-        # Commit all changes
-        conn.commit()
+        for message in summary['rejections']:
+            print(f"⚠️  REJECTED: {message}")
         
         print("\n" + "=" * 60)
         print(f"✅ IMPORT COMPLETE!")
-        print(f"   • Imported: {imported_count} records")
-        print(f"   • Skipped: {skipped_count} records (already existed)")
+        print(f"   • Imported: {summary['inserted']} records")
+        print(f"   • Updated: {summary['updated']} records")
+        print(f"   • Skipped: {summary['unchanged']} records (already existed)")
+        print(f"   • Rejected: {summary['rejected']} records")
         print("=" * 60)
         
         # Verify the import
+        conn = psycopg2.connect(database_url)
+        cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM lottery_results")
         total_count = cur.fetchone()[0]
         print(f"\n📊 Total lottery results in production database: {total_count}")
@@ -0,0 +1,425 @@
+"""
+Instrumentation Module
+Request latency histograms, database timing, process resources and cache hit
+rates for the admin health dashboard.
+
+Samples are kept in rolling in-memory windows per worker process and flushed
+periodically to the HealthCheck table, so the dashboard and alerting read
+real percentiles instead of hard-coded values. Flushed rows are pruned after
+HEALTHCHECK_RETENTION_DAYS.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timedelta
+
+import psycopg2
+import psycopg2.extensions
+from flask import g, request, has_request_context
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+    logger.warning("psutil not available - process metrics disabled")
+
+# Rolling window the percentiles are computed over
+METRICS_WINDOW_SECONDS = int(os.environ.get('METRICS_WINDOW_SECONDS', 300))
+# How often each worker writes its window to HealthCheck
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 60))
+# Flushed metric rows older than this are deleted (the dashboard shows the last 30)
+HEALTHCHECK_RETENTION_DAYS = float(os.environ.get('HEALTHCHECK_RETENTION_DAYS', 7))
+# How often each worker prunes old metric rows
+HEALTHCHECK_PRUNE_INTERVAL = 3600
+# check_type values written by flush_to_healthcheck - the only rows pruned
+METRIC_CHECK_TYPES = ('request_latency', 'database', 'resources')
+# Samples kept per route / for the query window
+MAX_SAMPLES = 5000
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# p95 latency (ms) above which a check is reported as WARNING / CRITICAL
+LATENCY_WARNING_MS = 1000
+LATENCY_CRITICAL_MS = 5000
+ERROR_RATE_WARNING = 5.0
+
+
+class RollingWindow:
+    """Timestamped samples trimmed to the last METRICS_WINDOW_SECONDS"""
+
+    def __init__(self, window_seconds=METRICS_WINDOW_SECONDS, max_samples=MAX_SAMPLES):
+        self.window_seconds = window_seconds
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, value, **extra):
+        self.samples.append((time.time(), value, extra))
+
+    def _trim(self):
+        cutoff = time.time() - self.window_seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def values(self):
+        self._trim()
+        return [value for _, value, _ in self.samples]
+
+    def entries(self):
+        self._trim()
+        return list(self.samples)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(values_ms):
+    """Count, mean, percentiles and histogram for a list of millisecond samples"""
+    ordered = sorted(values_ms)
+    buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for value in ordered:
+        buckets[bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    return {
+        'count': len(ordered),
+        'avg_ms': round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50), 2),
+        'p95_ms': round(percentile(ordered, 95), 2),
+        'p99_ms': round(percentile(ordered, 99), 2),
+        'max_ms': round(ordered[-1], 2) if ordered else 0.0,
+        'histogram': dict(zip(labels, buckets)),
+    }
+
+
+class Instrumentation:
+    """Per-process metrics registry"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.queries = RollingWindow()
+        self.started_at = time.time()
+        self.total_requests = 0
+        self.total_queries = 0
+        self._flusher_pid = None
+        self._process = None
+
+    def record_request(self, route, status_code, duration_ms, db_time_ms=0.0, db_queries=0):
+        with self.lock:
+            window = self.routes.get(route)
+            if window is None:
+                window = self.routes[route] = RollingWindow()
+            window.add(duration_ms, status=status_code, db_time_ms=db_time_ms, db_queries=db_queries)
+            self.total_requests += 1
+
+    def record_query(self, duration_ms):
+        with self.lock:
+            self.queries.add(duration_ms)
+            self.total_queries += 1
+
+    def route_stats(self):
+        with self.lock:
+            routes = {route: window.entries() for route, window in self.routes.items()}
+
+        stats = {}
+        for route, entries in routes.items():
+            if not entries:
+                continue
+            summary = latency_summary([value for _, value, _ in entries])
+            errors = sum(1 for _, _, extra in entries if extra.get('status', 200) >= 500)
+            summary['error_rate'] = round(errors / len(entries) * 100, 2)
+            summary['avg_db_time_ms'] = round(sum(extra.get('db_time_ms', 0) for _, _, extra in entries) / len(entries), 2)
+            summary['avg_db_queries'] = round(sum(extra.get('db_queries', 0) for _, _, extra in entries) / len(entries), 2)
+            stats[route] = summary
+        return dict(sorted(stats.items(), key=lambda item: item[1]['p95_ms'], reverse=True))
+
+    def overall_stats(self):
+        with self.lock:
+            entries = [entry for window in self.routes.values() for entry in window.entries()]
+        summary = latency_summary([value for _, value, _ in entries])
+        errors = sum(1 for _, _, extra in entries if extra.get('status', 200) >= 500)
+        summary['error_rate'] = round(errors / len(entries) * 100, 2) if entries else 0.0
+        summary['requests_per_minute'] = round(len(entries) / (METRICS_WINDOW_SECONDS / 60), 2)
+        summary['total_requests'] = self.total_requests
+        return summary
+
+    def database_stats(self):
+        with self.lock:
+            query_times = self.queries.values()
+        summary = latency_summary(query_times)
+        summary['total_queries'] = self.total_queries
+        summary['queries_per_minute'] = round(len(query_times) / (METRICS_WINDOW_SECONDS / 60), 2)
+        summary['connections'] = connection_stats()
+        return summary
+
+    def process_stats(self):
+        if not PSUTIL_AVAILABLE:
+            return {'available': False}
+        if self._process is None or self._process.pid != os.getpid():
+            self._process = psutil.Process()
+            self._process.cpu_percent(None)  # prime the CPU counter
+        process = self._process
+        with process.oneshot():
+            memory = process.memory_info()
+            return {
+                'available': True,
+                'pid': process.pid,
+                'rss_mb': round(memory.rss / 1024 / 1024, 1),
+                'cpu_percent': process.cpu_percent(None),
+                'threads': process.num_threads(),
+                'system_cpu_percent': psutil.cpu_percent(None),
+                'system_memory_percent': psutil.virtual_memory().percent,
+                'disk_percent': psutil.disk_usage('/').percent,
+                'uptime_seconds': int(time.time() - self.started_at),
+            }
+
+    def snapshot(self):
+        """Everything the dashboard shows, computed from the current windows"""
+        from cache_manager import get_cache_stats
+        try:
+            cache = get_cache_stats().get('namespaces', {})
+        except Exception as e:
+            logger.warning(f"Cache stats unavailable: {e}")
+            cache = {}
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'window_seconds': METRICS_WINDOW_SECONDS,
+            'requests': self.overall_stats(),
+            'routes': self.route_stats(),
+            'database': self.database_stats(),
+            'process': self.process_stats(),
+            'cache': cache,
+        }
+
+
+metrics = Instrumentation()
+
+
+def connection_stats():
+    """Pool usage for this worker plus server-side connection counts"""
+    from db_pool import get_db_connection, get_pool_stats
+    stats = {'pool': get_pool_stats()}
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT COUNT(*),
+                           COUNT(*) FILTER (WHERE state = 'active'),
+                           COUNT(*) FILTER (WHERE state = 'idle'),
+                           COUNT(*) FILTER (WHERE state = 'idle in transaction')
+                    FROM pg_stat_activity
+                    WHERE datname = current_database()
+                """)
+                total, active, idle, idle_in_transaction = cur.fetchone()
+        stats.update({
+            'server_total': total,
+            'server_active': active,
+            'server_idle': idle,
+            'server_idle_in_transaction': idle_in_transaction,
+        })
+    except Exception as e:
+        stats['error'] = str(e)
+    return stats
+
+
+def _record_query_time(duration_ms):
+    metrics.record_query(duration_ms)
+    if has_request_context():
+        g._instr_db_time = getattr(g, '_instr_db_time', 0.0) + duration_ms
+        g._instr_db_queries = getattr(g, '_instr_db_queries', 0) + 1
+
+
+class _TimedCursorMixin:
+    """Times execute()/executemany() on any psycopg2 cursor class"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record_query_time((time.perf_counter() - started) * 1000)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record_query_time((time.perf_counter() - started) * 1000)
+
+
+_timed_cursor_classes = {}
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection whose cursors report query timings.
+
+    Keeps whatever cursor_factory the caller asks for (RealDictCursor,
+    DictCursor...) by mixing the timer into that class.
+    """
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        timed = _timed_cursor_classes.get(factory)
+        if timed is None:
+            timed = type(f"Timed{factory.__name__}", (_TimedCursorMixin, factory), {})
+            _timed_cursor_classes[factory] = timed
+        kwargs['cursor_factory'] = timed
+        return super().cursor(*args, **kwargs)
+
+
+def _overall_status(snapshot):
+    requests_summary = snapshot['requests']
+    if requests_summary['p95_ms'] > LATENCY_CRITICAL_MS:
+        return 'CRITICAL'
+    if requests_summary['p95_ms'] > LATENCY_WARNING_MS or requests_summary['error_rate'] > ERROR_RATE_WARNING:
+        return 'WARNING'
+    return 'OK'
+
+
+def flush_to_healthcheck(app):
+    """Write the current windows to HealthCheck rows"""
+    from models import db, HealthCheck
+
+    snapshot = metrics.snapshot()
+    status = _overall_status(snapshot)
+    database_summary = snapshot['database']
+    process_summary = snapshot['process']
+
+    with app.app_context():
+        try:
+            db.session.add(HealthCheck(
+                check_type='request_latency',
+                status=status,
+                details={
+                    'pid': os.getpid(),
+                    'window_seconds': snapshot['window_seconds'],
+                    'requests': snapshot['requests'],
+                    'routes': {route: {k: v for k, v in stats.items() if k != 'histogram'}
+                               for route, stats in snapshot['routes'].items()},
+                },
+                response_time=snapshot['requests']['p95_ms'],
+            ))
+            db.session.add(HealthCheck(
+                check_type='database',
+                status='WARNING' if database_summary['connections'].get('error') else 'OK',
+                details=database_summary,
+                response_time=database_summary['p95_ms'],
+            ))
+            db.session.add(HealthCheck(
+                check_type='resources',
+                status='WARNING' if process_summary.get('system_memory_percent', 0) > 90 else 'OK',
+                details={'process': process_summary, 'cache': snapshot['cache']},
+            ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Failed to flush metrics to HealthCheck: {e}")
+
+
+def prune_healthchecks(app):
+    """Delete flushed metric rows older than HEALTHCHECK_RETENTION_DAYS; returns rows removed"""
+    from models import db, HealthCheck
+
+    cutoff = datetime.utcnow() - timedelta(days=HEALTHCHECK_RETENTION_DAYS)
+    with app.app_context():
+        try:
+            deleted = HealthCheck.query.filter(
+                HealthCheck.check_type.in_(METRIC_CHECK_TYPES),
+                HealthCheck.timestamp < cutoff,
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Failed to prune HealthCheck rows: {e}")
+            return 0
+    if deleted:
+        logger.info(f"Pruned {deleted} HealthCheck rows older than {HEALTHCHECK_RETENTION_DAYS:g} days")
+    return deleted
+
+
+def _flush_loop(app):
+    last_prune = 0.0
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            flush_to_healthcheck(app)
+        except Exception as e:
+            logger.warning(f"Metrics flush failed: {e}")
+        if time.time() - last_prune >= HEALTHCHECK_PRUNE_INTERVAL:
+            last_prune = time.time()
+            prune_healthchecks(app)
+
+
+def _ensure_flusher(app):
+    """Start one flush thread per worker process (threads do not survive fork)"""
+    pid = os.getpid()
+    if metrics._flusher_pid == pid:
+        return
+    with metrics.lock:
+        if metrics._flusher_pid == pid:
+            return
+        metrics._flusher_pid = pid
+    thread = threading.Thread(target=_flush_loop, args=(app,), name='metrics-flush', daemon=True)
+    thread.start()
+    logger.info(f"Metrics flusher started for pid {pid} (every {METRICS_FLUSH_INTERVAL}s)")
+
+
+def init_instrumentation(app):
+    """Register request timing hooks and SQLAlchemy query timing"""
+
+    @app.before_request
+    def _start_request_timer():
+        _ensure_flusher(app)
+        g._instr_start = time.perf_counter()
+        g._instr_db_time = 0.0
+        g._instr_db_queries = 0
+
+    @app.after_request
+    def _record_request_timing(response):
+        started = getattr(g, '_instr_start', None)
+        if started is not None and request.endpoint != 'static':
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            metrics.record_request(
+                f"{request.method} {route}",
+                response.status_code,
+                (time.perf_counter() - started) * 1000,
+                db_time_ms=getattr(g, '_instr_db_time', 0.0),
+                db_queries=getattr(g, '_instr_db_queries', 0),
+            )
+        return response
+
+    try:
+        from sqlalchemy import event
+        from models import db
+
+        with app.app_context():
+            engine = db.engine
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('_instr_query_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get('_instr_query_start')
+            if starts:
+                _record_query_time((time.perf_counter() - starts.pop()) * 1000)
+    except Exception as e:
+        logger.warning(f"SQLAlchemy query timing unavailable: {e}")
+
+    logger.info("Request and database instrumentation initialized")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Load test harness for the web app
+Measures throughput and latency on the homepage and results routes, either
+against a running server or by starting gunicorn in each serving mode in turn
+and comparing them side by side.
+
+Usage:
+    python load_test.py --url http://localhost:5000
+    python load_test.py --compare sync gthread --concurrency 20 --duration 30
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_PATHS = ['/', '/results', '/results/lotto']
+
+
+def run_load(base_url, paths, concurrency, duration):
+    """Hit the given paths from `concurrency` threads for `duration` seconds"""
+    latencies = []
+    errors = 0
+    status_counts = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(index):
+        nonlocal errors
+        session = requests.Session()
+        request_number = index
+        while time.monotonic() < deadline:
+            path = paths[request_number % len(paths)]
+            request_number += 1
+            started = time.perf_counter()
+            try:
+                response = session.get(base_url + path, timeout=60)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    status_counts[response.status_code] = status_counts.get(response.status_code, 0) + 1
+            except requests.RequestException:
+                with lock:
+                    errors += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    wall_time = time.monotonic() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': status_counts,
+        'throughput': len(latencies) / wall_time if wall_time else 0.0,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_server(base_url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url + '/health', timeout=5)
+            return True
+        except requests.RequestException:
+            time.sleep(1)
+    return False
+
+
+def run_mode(mode, paths, concurrency, duration, warmup):
+    """Start gunicorn in the given serving mode and load test it"""
+    port = _free_port()
+    env = dict(os.environ, SERVING_MODE=mode, PORT=str(port))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not _wait_for_server(base_url):
+            raise RuntimeError(f"gunicorn ({mode}) did not start on port {port}")
+        if warmup:
+            run_load(base_url, paths, concurrency, warmup)
+        return run_load(base_url, paths, concurrency, duration)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def print_report(rows):
+    print(f"{'mode':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print("-" * 70)
+    for label, stats in rows:
+        print(f"{label:<12}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput']:>10.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+        non_ok = {code: count for code, count in stats['statuses'].items() if code != 200}
+        if non_ok:
+            print(f"{'':<12}non-200 responses: {non_ok}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the homepage and results routes")
+    parser.add_argument('--url', help="Base URL of an already running server")
+    parser.add_argument('--compare', nargs='+', metavar='MODE',
+                        help="Serving modes to start and compare (sync, gthread, gevent)")
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds per run")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Warm-up seconds before measuring")
+    args = parser.parse_args()
+
+    if not args.url and not args.compare:
+        parser.error("pass --url or --compare")
+
+    print(f"Paths: {', '.join(args.paths)} | concurrency {args.concurrency} | {args.duration:.0f}s per run\n")
+
+    rows = []
+    if args.url:
+        base_url = args.url.rstrip('/')
+        if args.warmup:
+            run_load(base_url, args.paths, args.concurrency, args.warmup)
+        rows.append(('server', run_load(base_url, args.paths, args.concurrency, args.duration)))
+    for mode in args.compare or []:
+        print(f"Running {mode}...")
+        rows.append((mode, run_mode(mode, args.paths, args.concurrency, args.duration, args.warmup)))
+
+    print()
+    print_report(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,13 @@ from datetime import datetime, timedelta
 import json
 import logging
 from collections import Counter
+import numpy as np
 from cache_manager import cached_query
+from data_streams import number_frequencies, ranked_frequencies
+from db_pool import get_db_connection
+from match_scoring import count_matches, MAX_BALL
+from number_search import number_index, GAME_MAIN_RANGES, SEARCH_MODES, MODE_SUBSET
+from prediction_metrics import get_prediction_metrics, invalidate_prediction_metrics
 from security_utils import require_admin
 
 logger = logging.getLogger(__name__)
@@ -45,117 +51,35 @@ def frequency_analysis():
         
         logger.info(f"Performing optimized analysis for: lottery_type={lottery_type}, days={days}")
         
-        # Use direct database connection to get real lottery data
-        import psycopg2
-        import os
-        from collections import Counter
-        
-        connection_string = os.environ.get('DATABASE_URL')
-        all_numbers = []
-        lottery_types = set()
-        
+        # Counted block by block from a server-side cursor - the draw history
+        # is never held in memory
         try:
-            with psycopg2.connect(connection_string) as conn:
-                with conn.cursor() as cur:
-                    # Get lottery results from the database (filtered by lottery type if specified)
-                    if lottery_type and lottery_type != 'all':
-                        cur.execute("""
-                            SELECT lottery_type, main_numbers, bonus_numbers
-                            FROM lottery_results 
-                            WHERE main_numbers IS NOT NULL AND lottery_type = %s
-                            ORDER BY draw_date DESC
-                        """, (lottery_type,))
-                    else:
-                        cur.execute("""
-                            SELECT lottery_type, main_numbers, bonus_numbers
-                            FROM lottery_results 
-                            WHERE main_numbers IS NOT NULL
-                            ORDER BY draw_date DESC
-                        """)
-                    
-                    results = cur.fetchall()
-                    
-                    for row in results:
-                        row_lottery_type, numbers, bonus_numbers = row
-                        lottery_types.add(row_lottery_type)
-                        
-                        # Add main numbers
-                        if numbers:
-                            parsed_numbers = []
-                            
-                            if isinstance(numbers, str):
-                                try:
-                                    # Handle PostgreSQL array format {1,2,3} or JSON format [1,2,3]
-                                    if numbers.startswith('{') and numbers.endswith('}'):
-                                        # PostgreSQL array format
-                                        numbers_str = numbers.strip('{}')
-                                        if numbers_str:
-                                            parsed_numbers = [int(x.strip()) for x in numbers_str.split(',')]
-                                    else:
-                                        # JSON format
-                                        parsed_numbers = json.loads(numbers)
-                                except:
-                                    continue
-                            elif isinstance(numbers, list):
-                                parsed_numbers = numbers
-                            
-                            all_numbers.extend(parsed_numbers)
-                        
-                        # Add bonus numbers  
-                        if bonus_numbers:
-                            parsed_bonus = []
-                            
-                            if isinstance(bonus_numbers, str):
-                                try:
-                                    # Handle PostgreSQL array format {1} or JSON format [1]
-                                    if bonus_numbers.startswith('{') and bonus_numbers.endswith('}'):
-                                        # PostgreSQL array format
-                                        bonus_str = bonus_numbers.strip('{}')
-                                        if bonus_str:
-                                            parsed_bonus = [int(x.strip()) for x in bonus_str.split(',')]
-                                    else:
-                                        # JSON format
-                                        parsed_bonus = json.loads(bonus_numbers)
-                                except:
-                                    continue
-                            elif isinstance(bonus_numbers, list):
-                                parsed_bonus = bonus_numbers
-                            elif isinstance(bonus_numbers, (int, float)):
-                                parsed_bonus = [int(bonus_numbers)]
-                            
-                            all_numbers.extend(parsed_bonus)
-                        
+            stats = number_frequencies(lottery_type, include_bonus=True)
         except Exception as e:
             logger.error(f"Database error in frequency analysis: {e}")
-            all_numbers = []
-            lottery_types = set()
-        
-        # Calculate frequency
-        frequency = Counter(all_numbers)
-        
-        # Get top numbers (most frequent)
-        top_numbers = frequency.most_common(50)
-        
-        # Get hot numbers (most frequent)
-        hot_numbers = [num for num, freq in frequency.most_common(10)]
-        
-        # Get cold numbers (least frequent numbers that appear)
-        cold_numbers = [num for num, freq in frequency.most_common()[-10:]]
-        
+            stats = {'counts': np.zeros(MAX_BALL + 1, dtype=np.int64), 'draws': 0, 'lottery_types': set()}
+
+        ranked = ranked_frequencies(stats['counts'])
+        total_numbers = int(stats['counts'].sum())
+
+        # Hot numbers are the most frequent, cold the least frequent that appear
+        hot_numbers = [num for num, freq in ranked[:10]]
+        cold_numbers = [num for num, freq in ranked[-10:]]
+
         # Remove absent numbers logic since all numbers will eventually be drawn in active lottery
-        
+
         response = {
-            'lottery_types': list(lottery_types),
-            'total_draws': len(results) if 'results' in locals() else 0,
-            'total_numbers': len(all_numbers),
-            'unique_numbers': len(set(all_numbers)),
+            'lottery_types': list(stats['lottery_types']),
+            'total_draws': stats['draws'],
+            'total_numbers': total_numbers,
+            'unique_numbers': len(ranked),
             'frequency_data': [
                 {
                     'number': num,
                     'frequency': freq,
-                    'percentage': round((freq / len(all_numbers)) * 100, 2) if all_numbers else 0
+                    'percentage': round((freq / total_numbers) * 100, 2) if total_numbers else 0
                 }
-                for num, freq in top_numbers
+                for num, freq in ranked[:50]
             ],
             'hot_numbers': hot_numbers,
             'cold_numbers': cold_numbers,
@@ -174,12 +98,7 @@ def frequency_analysis():
 def lottery_stats():
     """Get general lottery statistics from authentic database"""
     try:
-        import psycopg2
-        import os
-        
-        connection_string = os.environ.get('DATABASE_URL')
-        
-        with psycopg2.connect(connection_string) as conn:
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Get statistics per lottery type using real database
                 cur.execute("""
@@ -223,17 +142,14 @@ def lottery_stats():
 def pattern_analysis():
     """Analyze number patterns from authentic lottery data"""
     try:
-        import psycopg2
-        import os
         from datetime import datetime, timedelta
         
-        connection_string = os.environ.get('DATABASE_URL')
         all_numbers = []
         consecutive_pairs = []
         even_count = 0
         odd_count = 0
         
-        with psycopg2.connect(connection_string) as conn:
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Get recent results (last 90 days) with proper type handling
                 ninety_days_ago = (datetime.now() - timedelta(days=90)).date()
@@ -404,7 +320,7 @@ def get_lottery_predictions():
             }
         else:
             # Get existing predictions
-            with psycopg2.connect(os.environ.get('DATABASE_URL')) as conn:
+            with get_db_connection() as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT id, predicted_numbers, bonus_numbers, confidence_score,
@@ -526,16 +442,13 @@ def generate_new_prediction():
 def get_prediction_history():
     """Get historical AI predictions with accuracy data"""
     try:
-        import psycopg2
-        import os
-        
         # Get query parameters
         game_type = request.args.get('game_type', 'all')
         limit = int(request.args.get('limit', 10))
         
         logger.info(f"Getting prediction history for: {game_type}, limit: {limit}")
         
-        with psycopg2.connect(os.environ.get('DATABASE_URL')) as conn:
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 if game_type != 'all':
                     db_game_type = map_frontend_to_db_lottery_type(game_type)
@@ -609,70 +522,13 @@ def get_prediction_history():
 def get_system_metrics():
     """Get AI prediction system performance metrics"""
     try:
-        import psycopg2
-        import os
-        from datetime import datetime, timedelta
-        
         logger.info("Getting AI prediction system metrics")
         
-        with psycopg2.connect(os.environ.get('DATABASE_URL')) as conn:
-            with conn.cursor() as cur:
-                # Get total predictions count
-                cur.execute("SELECT COUNT(*) FROM lottery_predictions")
-                total_predictions = cur.fetchone()[0]
-                
-                # Get predictions from last 30 days
-                thirty_days_ago = datetime.now() - timedelta(days=30)
-                cur.execute("""
-                    SELECT COUNT(*) FROM lottery_predictions 
-                    WHERE created_at >= %s
-                """, (thirty_days_ago,))
-                recent_predictions = cur.fetchone()[0]
-                
-                # Get verified predictions count
-                cur.execute("SELECT COUNT(*) FROM lottery_predictions WHERE is_verified = true")
-                verified_predictions = cur.fetchone()[0]
-                
-                # Get average confidence score
-                cur.execute("SELECT AVG(confidence_score) FROM lottery_predictions WHERE confidence_score IS NOT NULL")
-                avg_confidence = cur.fetchone()[0] or 0.0
-                
-                # Get predictions by game type
-                cur.execute("""
-                    SELECT game_type, COUNT(*) as count 
-                    FROM lottery_predictions 
-                    GROUP BY game_type 
-                    ORDER BY count DESC
-                """)
-                predictions_by_game = [{'game_type': row[0], 'count': row[1]} for row in cur.fetchall()]
-                
-                # Get accuracy metrics for verified predictions
-                cur.execute("""
-                    SELECT AVG(accuracy_score) as avg_accuracy,
-                           MIN(accuracy_score) as min_accuracy,
-                           MAX(accuracy_score) as max_accuracy
-                    FROM lottery_predictions 
-                    WHERE is_verified = true AND accuracy_score IS NOT NULL
-                """)
-                accuracy_data = cur.fetchone()
-                
-                accuracy_metrics = {
-                    'average': float(accuracy_data[0]) if accuracy_data[0] else 0.0,
-                    'minimum': float(accuracy_data[1]) if accuracy_data[1] else 0.0,
-                    'maximum': float(accuracy_data[2]) if accuracy_data[2] else 0.0
-                } if accuracy_data else {'average': 0.0, 'minimum': 0.0, 'maximum': 0.0}
-                
+        metrics = get_prediction_metrics()
         response = {
             'success': True,
             'system_status': 'Active',
-            'total_predictions': total_predictions,
-            'recent_predictions_30d': recent_predictions,
-            'verified_predictions': verified_predictions,
-            'verification_rate': (verified_predictions / total_predictions * 100) if total_predictions > 0 else 0.0,
-            'average_confidence': round(float(avg_confidence), 2),
-            'accuracy_metrics': accuracy_metrics,
-            'predictions_by_game': predictions_by_game,
-            'last_updated': datetime.now().isoformat()
+            **metrics
         }
         
         return jsonify(response)
@@ -685,8 +541,6 @@ def get_system_metrics():
 def prediction_history():
     """Get historical AI predictions with optional limit"""
     try:
-        import psycopg2
-        import os
         from datetime import datetime
         
         limit = int(request.args.get('limit', 20))
@@ -694,7 +548,7 @@ def prediction_history():
         
         predictions = []
         
-        with psycopg2.connect(os.environ.get('DATABASE_URL')) as conn:
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Get recent predictions with all details
                 cur.execute("""
@@ -747,8 +601,6 @@ def system_metrics():
 def auto_validate_predictions():
     """Automatically validate pending predictions against actual results"""
     try:
-        import psycopg2
-        import os
         from datetime import datetime
         
         logger.info("Starting auto-validation of predictions")
@@ -759,7 +611,7 @@ def auto_validate_predictions():
             'errors': []
         }
         
-        with psycopg2.connect(os.environ.get('DATABASE_URL')) as conn:
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Get unverified predictions
                 cur.execute("""
@@ -812,12 +664,10 @@ def auto_validate_predictions():
                                     actual_bonus = []
                             
                             # Calculate matches
-                            main_matches = len(set(predicted_main) & set(actual_main))
-                            bonus_matches = 0
-                            if bonus_nums and actual_bonus:
-                                if isinstance(bonus_nums, str):
-                                    bonus_nums = json.loads(bonus_nums)
-                                bonus_matches = len(set(bonus_nums) & set(actual_bonus))
+                            if isinstance(bonus_nums, str):
+                                bonus_nums = json.loads(bonus_nums)
+                            main_matches = count_matches(predicted_main, actual_main)
+                            bonus_matches = count_matches(bonus_nums, actual_bonus) if bonus_nums and actual_bonus else 0
                             
                             # Calculate accuracy score (percentage of numbers matched)
                             total_predicted = len(predicted_main) + (len(bonus_nums) if bonus_nums else 0)
@@ -853,6 +703,9 @@ def auto_validate_predictions():
                 
                 conn.commit()
         
+        if validation_results['validated_count']:
+            invalidate_prediction_metrics()
+        
         logger.info(f"Auto-validation complete: {validation_results['validated_count']}/{validation_results['total_count']} predictions validated")
         
         return jsonify({
@@ -920,6 +773,42 @@ def get_accuracy_insights():
 
 # Duplicate auto-validate endpoint removed - only one needed above
 
+@bp.route('/number-search')
+def number_search():
+    """Search a game's draw history for numbers: subset, exact combination or at-least-k matches"""
+    try:
+        game_type = map_frontend_to_db_lottery_type(request.args.get('game_type', ''))
+        mode = request.args.get('mode', MODE_SUBSET)
+        max_number = GAME_MAIN_RANGES.get(game_type)
+        if max_number is None:
+            return jsonify({'error': 'Unknown or missing game_type'}), 400
+        if mode not in SEARCH_MODES:
+            return jsonify({'error': f"mode must be one of: {', '.join(SEARCH_MODES)}"}), 400
+        
+        try:
+            numbers = sorted({int(n) for n in request.args.get('numbers', '').split(',') if n.strip()})
+            min_matches = int(request.args.get('min_matches', 1))
+            limit = min(int(request.args.get('limit', 100)), 500)
+        except ValueError:
+            return jsonify({'error': 'numbers, min_matches and limit must be integers'}), 400
+        
+        if not numbers:
+            return jsonify({'error': 'Provide numbers as a comma-separated list'}), 400
+        if numbers[0] < 1 or numbers[-1] > max_number:
+            return jsonify({'error': f"{game_type} numbers must be between 1 and {max_number}"}), 400
+        
+        result = number_index.search(game_type, numbers, mode=mode, min_matches=min_matches, limit=limit)
+        return jsonify({
+            'success': True,
+            'numbers': numbers,
+            'mode': mode,
+            **result
+        })
+        
+    except Exception as e:
+        logger.error(f"Number search error: {e}")
+        return jsonify({'error': 'Unable to search draw history'}), 500
+
 @bp.route('/actual-results')
 def get_actual_lottery_results():
     """Get actual lottery results for a specific game and date"""
@@ -930,11 +819,9 @@ def get_actual_lottery_results():
         if not game_type or not target_date:
             return jsonify({'error': 'Missing game_type or date parameter'}), 400
         
-        import psycopg2
-        import os
         import json
         
-        with psycopg2.connect(os.environ.get('DATABASE_URL')) as conn:
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Query for actual lottery results near the target date
                 cur.execute("""
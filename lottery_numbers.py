@@ -0,0 +1,20 @@
+"""
+Lottery Numbers
+Compatibility reader for draw numbers in lottery_results.
+
+The legacy main_numbers/bonus_numbers columns hold JSON strings, PostgreSQL
+array literals or lists depending on which importer wrote the row. Migration
+0003 adds smallint[] copies (main_numbers_arr/bonus_numbers_arr) that a
+trigger keeps current. Readers select MAIN_NUMBERS_SQL/BONUS_NUMBERS_SQL to
+get a plain integer list straight from psycopg2, falling back to parsing the
+legacy text for any row the backfill has not reached yet. Containment
+queries ("draws with 12 and 31") use number_search's in-memory index.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Select expressions that always yield smallint[] (psycopg2 returns a list)
+MAIN_NUMBERS_SQL = "COALESCE(main_numbers_arr, lottery_numbers_array(main_numbers::TEXT))"
+BONUS_NUMBERS_SQL = "COALESCE(bonus_numbers_arr, lottery_numbers_array(bonus_numbers::TEXT))"
@@ -6,7 +6,7 @@ Advanced AI-powered lottery intelligence platform
 import os
 import logging
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, send_file, make_response
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, send_file, make_response, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
@@ -24,13 +24,18 @@ import psycopg2
 # from config import Config  # Removed - not needed
 from models import db, User, LotteryResult, ExtractionReview, HealthCheck, Alert, SystemLog
 from security_utils import limiter, sanitize_input, validate_form_data, RateLimitExceeded, require_admin
+from http_cache import conditional_get, cached_page
+from db_pool import get_db_connection
+from data_streams import number_frequencies, ranked_frequencies, export_stream, EXPORT_DATASETS, EXPORT_FORMATS, EXPORT_MIMETYPES
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Enable template auto-reload for immediate template changes
-app.config['TEMPLATES_AUTO_RELOAD'] = True
-app.jinja_env.auto_reload = True
+# Template auto-reload stats template files on every render - keep it for
+# development, disable in production with TEMPLATES_AUTO_RELOAD=false
+TEMPLATES_AUTO_RELOAD = os.environ.get('TEMPLATES_AUTO_RELOAD', 'true').lower() in ('1', 'true', 'yes')
+app.config['TEMPLATES_AUTO_RELOAD'] = TEMPLATES_AUTO_RELOAD
+app.jinja_env.auto_reload = TEMPLATES_AUTO_RELOAD
 
 # Configure app settings directly from environment
 app.secret_key = os.environ.get("SESSION_SECRET")
@@ -399,11 +404,10 @@ def index():
         import psycopg2
         import os
 
-        connection_string = os.environ.get('DATABASE_URL')
         latest_results = []
 
         try:
-            with psycopg2.connect(connection_string) as conn:
+            with get_db_connection() as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT lottery_type, draw_number, draw_date, main_numbers, bonus_numbers, divisions, 
@@ -656,6 +660,8 @@ def index():
 @app.route('/results')
 @app.route('/results/<lottery_type>')
 @limiter.exempt
+@conditional_get('results', max_age=60, stale_while_revalidate=300)
+@cached_page('results')
 def results(lottery_type=None):
     """Display lottery results"""
     try:
@@ -669,11 +675,10 @@ def results(lottery_type=None):
             import psycopg2
             import os
 
-            connection_string = os.environ.get('DATABASE_URL')
             results = []
 
             try:
-                with psycopg2.connect(connection_string) as conn:
+                with get_db_connection() as conn:
                     with conn.cursor() as cur:
                         cur.execute("""
                             SELECT lottery_type, draw_number, draw_date, main_numbers, bonus_numbers, divisions, 
@@ -777,7 +782,7 @@ def results(lottery_type=None):
             # Fetch UNVALIDATED predictions for UPCOMING draws (same as homepage)
             predictions_data = {}
             try:
-                with psycopg2.connect(connection_string) as conn:
+                with get_db_connection() as conn:
                     with conn.cursor() as cur:
                         # Get unvalidated predictions for future draws (same logic as homepage)
                         cur.execute("""
@@ -834,17 +839,13 @@ def results(lottery_type=None):
                                  lottery_type=lottery_type,
                                  display_name=lottery_type)
         else:
-            # Show all results using direct psycopg2 connection
-            import psycopg2
-            import os
-
-            connection_string = os.environ.get('DATABASE_URL')
+            # Show all results using a pooled psycopg2 connection
             results = []
 
             logger.info("=== RESULTS PAGE: Loading all lottery results ===")
 
             try:
-                with psycopg2.connect(connection_string) as conn:
+                with get_db_connection() as conn:
                     with conn.cursor() as cur:
                         # Get latest result for each lottery type
                         cur.execute("""
@@ -967,7 +968,7 @@ def results(lottery_type=None):
             # Fetch UNVALIDATED predictions for UPCOMING draws (same as homepage)
             predictions_data = {}
             try:
-                with psycopg2.connect(connection_string) as conn:
+                with get_db_connection() as conn:
                     with conn.cursor() as cur:
                         # Get unvalidated predictions for future draws (same logic as homepage)
                         cur.execute("""
@@ -1029,6 +1030,8 @@ def results(lottery_type=None):
 
 @app.route('/results/<lottery_type>/<int:draw_number>')
 @limiter.exempt
+@conditional_get('draw', max_age=300, stale_while_revalidate=3600)
+@cached_page('draw')
 def draw_details(lottery_type, draw_number):
     """Display detailed draw results"""
     try:
@@ -1037,25 +1040,17 @@ def draw_details(lottery_type, draw_number):
 
         logger.info(f"DRAW DETAILS: Looking for lottery_type='{lottery_type}', draw_number={draw_number}")
 
-        # Use direct psycopg2 connection to avoid SQLAlchemy type issues
-        import psycopg2
-        import os
-
-        connection_string = os.environ.get('DATABASE_URL')
+        # Use a pooled psycopg2 connection to avoid SQLAlchemy type issues
         result = None
 
         try:
-            with psycopg2.connect(connection_string) as conn:
+            with get_db_connection() as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
                         SELECT lottery_type, draw_number, draw_date, main_numbers, bonus_numbers, prize_divisions, 
                                rollover_amount, next_jackpot, total_pool_size, total_sales, draw_machine, next_draw_date
                         FROM lottery_results 
                         WHERE lottery_type = %s AND draw_number = %s
-                        ORDER BY 
-                            CASE WHEN prize_divisions IS NOT NULL AND prize_divisions != '[]' AND prize_divisions != 'null' THEN 0 ELSE 1 END,
-                            id DESC
-                        LIMIT 1
                     """, (lottery_type, draw_number))
 
                     row = cur.fetchone()
@@ -1702,6 +1697,7 @@ def trigger_weekly_predictions():
 
 # API endpoint to get predictions data
 @app.route('/api/predictions')
+@conditional_get('predictions', max_age=60, stale_while_revalidate=300)
 def api_predictions():
     """API endpoint for fetching AI predictions"""
     try:
@@ -1951,143 +1947,34 @@ def process_ticket():
         # Save uploaded file
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
+        # Jobs run concurrently, so same-second uploads must not share a path
+        unique_filename = f"{timestamp}_{uuid.uuid4().hex[:8]}_{filename}"
 
         upload_folder = '/tmp/uploads'
         os.makedirs(upload_folder, exist_ok=True)
         file_path = os.path.join(upload_folder, unique_filename)
         file.save(file_path)
 
-        logger.info(f"Processing ticket scanner image: {file_path}")
-
-        # Process with AI using lottery processor
-        from ai_lottery_processor import CompleteLotteryProcessor
-        processor = CompleteLotteryProcessor()
-
-        # Extract data from the image
-        extracted_data = processor.process_lottery_image(file_path)
-
-        if extracted_data and not extracted_data.get('error'):
-            # If we have valid game types, fetch winning numbers for comparison
-            if 'included_games' in extracted_data and extracted_data['included_games']:
-                winning_numbers = {}
-
-                try:
-                    import psycopg2
-                    from psycopg2.extras import RealDictCursor
-
-                    conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
-                    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-                    # Map display names to database names
-                    game_mapping = {
-                        'LOTTO': 'LOTTO',
-                        'LOTTO PLUS 1': 'LOTTO PLUS 1', 
-                        'LOTTO PLUS 2': 'LOTTO PLUS 2',
-                        'POWERBALL': 'POWERBALL',
-                        'POWERBALL PLUS': 'POWERBALL PLUS',
-                        'DAILY LOTTO': 'DAILY LOTTO'
-                    }
-
-                    # Get the ticket's draw date and number for matching
-                    ticket_draw_date = extracted_data.get('draw_date')
-                    ticket_draw_number = extracted_data.get('draw_number')
-
-                    for game_type in extracted_data['included_games']:
-                        if game_type in game_mapping:
-                            db_game_type = game_mapping[game_type]
-
-                            # Try to find winning numbers for the same draw date/number as the ticket
-                            if ticket_draw_date and ticket_draw_number:
-                                # First try to match by draw number (most accurate)
-                                cur.execute("""
-                                    SELECT main_numbers, bonus_numbers, draw_number, draw_date
-                                    FROM lottery_results 
-                                    WHERE lottery_type = %s AND draw_number = %s
-                                    LIMIT 1
-                                """, (db_game_type, ticket_draw_number))
-
-                                latest_result = cur.fetchone()
-
-                                # If no exact draw number match, try by date
-                                if not latest_result and ticket_draw_date:
-                                    cur.execute("""
-                                        SELECT main_numbers, bonus_numbers, draw_number, draw_date
-                                        FROM lottery_results 
-                                        WHERE lottery_type = %s AND draw_date = %s
-                                        LIMIT 1
-                                    """, (db_game_type, ticket_draw_date))
-                                    latest_result = cur.fetchone()
-                            else:
-                                # Fallback to most recent if no ticket date info
-                                cur.execute("""
-                                    SELECT main_numbers, bonus_numbers, draw_number, draw_date
-                                    FROM lottery_results 
-                                    WHERE lottery_type = %s 
-                                    ORDER BY draw_date DESC, draw_number DESC 
-                                    LIMIT 1
-                                """, (db_game_type,))
-                                latest_result = cur.fetchone()
-
-
-                            if latest_result:
-                                # Parse numbers from database format
-                                main_nums = latest_result['main_numbers']
-                                bonus_nums = latest_result['bonus_numbers']
-
-                                if isinstance(main_nums, str):
-                                    try:
-                                        import json
-                                        main_nums = json.loads(main_nums)
-                                    except:
-                                        main_nums = []
+        logger.info(f"Queueing ticket scanner image: {file_path}")
 
-                                if isinstance(bonus_nums, str):
-                                    try:
-                                        import json
-                                        bonus_nums = json.loads(bonus_nums)
-                                    except:
-                                        bonus_nums = []
-
-                                winning_numbers[game_type] = {
-                                    'main_numbers': main_nums or [],
-                                    'bonus_numbers': bonus_nums or [],
-                                    'draw_number': latest_result['draw_number'],
-                                    'draw_date': str(latest_result['draw_date']) if latest_result['draw_date'] else None
-                                }
-                            else:
-                                # No matching winning numbers found for this game type and date
-                                winning_numbers[game_type] = {
-                                    'main_numbers': [],
-                                    'bonus_numbers': [],
-                                    'draw_number': ticket_draw_number,
-                                    'draw_date': ticket_draw_date,
-                                    'not_available': True
-                                }
-
-                    cur.close()
-                    conn.close()
-
-                    # Add winning numbers to result
-                    extracted_data['winning_numbers'] = winning_numbers
-
-                except Exception as e:
-                    logger.error(f"Error fetching winning numbers: {e}")
-                    extracted_data['winning_numbers'] = {}
-
-            # Return the extracted lottery data
-            return jsonify({
-                'success': True,
-                'data': extracted_data,
-                'message': 'Ticket processed successfully'
-            })
-        else:
-            error_msg = extracted_data.get('error', 'Could not extract lottery data from ticket image') if extracted_data else 'Processing failed'
+        # Extraction runs on the ticket worker pool - the client polls for the result
+        from ticket_jobs import submit_ticket_job, TicketQueueFull
+        try:
+            job_id = submit_ticket_job(file_path)
+        except TicketQueueFull:
+            os.remove(file_path)
             return jsonify({
                 'success': False,
-                'error': error_msg,
-                'message': 'Please ensure the ticket is clearly visible and try again'
-            }), 400
+                'error': 'The scanner is busy right now',
+                'message': 'Please try again in a minute'
+            }), 503
+
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('process_ticket_status', job_id=job_id)
+        }), 202
 
     except Exception as e:
         logger.error(f"Error processing ticket: {str(e)}")
@@ -2097,6 +1984,34 @@ def process_ticket():
             'message': 'Please try again or contact support'
         }), 500
 
+@app.route('/process-ticket/status/<job_id>')
+@limiter.exempt
+def process_ticket_status(job_id):
+    """Poll a ticket scanning job - 202 while running, 200 with the ticket data when done"""
+    from ticket_jobs import get_ticket_job, JOB_COMPLETE, JOB_FAILED
+
+    job = get_ticket_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Unknown or expired scan job'}), 404
+
+    if job['status'] == JOB_COMPLETE:
+        return jsonify({
+            'success': True,
+            'status': job['status'],
+            'data': job['result'],
+            'message': 'Ticket processed successfully'
+        })
+
+    if job['status'] == JOB_FAILED:
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'error': job.get('error'),
+            'message': 'Please ensure the ticket is clearly visible and try again'
+        }), 400
+
+    return jsonify({'success': True, 'status': job['status'], 'job_id': job_id}), 202
+
 # Upload Lottery Image Route
 @app.route('/upload', methods=['GET', 'POST'])
 def upload_lottery():
@@ -2365,19 +2280,49 @@ def health_dashboard():
     if not current_user.is_admin:
         return redirect(url_for('index'))
 
-    # Provide basic health status variables for template
+    from instrumentation import metrics, LATENCY_WARNING_MS, LATENCY_CRITICAL_MS, _overall_status
+
+    snapshot = metrics.snapshot()
+
+    # Recent flushed checks drive the history table and the charts
+    health_history = []
+    alerts = []
+    try:
+        health_history = HealthCheck.query.order_by(HealthCheck.timestamp.desc()).limit(20).all()
+        latency_checks = HealthCheck.query.filter_by(check_type='request_latency') \
+            .order_by(HealthCheck.timestamp.desc()).limit(30).all()[::-1]
+        resource_checks = HealthCheck.query.filter_by(check_type='resources') \
+            .order_by(HealthCheck.timestamp.desc()).limit(30).all()[::-1]
+        alerts = Alert.query.order_by(Alert.created_at.desc()).limit(10).all()
+    except Exception as e:
+        logger.error(f"Error loading health history: {e}")
+        latency_checks = []
+        resource_checks = []
+
+    def _detail(check, *path):
+        value = check.details or {}
+        for key in path:
+            value = value.get(key, {}) if isinstance(value, dict) else {}
+        return value if value != {} else None
+
     health_data = {
-        'overall_status': 'HEALTHY',
-        'system_uptime': '24h 15m',
-        'cpu_usage': '15%',
-        'memory_usage': '45%',
-        'disk_usage': '32%',
-        'database_status': 'Connected',
-        'api_status': 'Operational',
-        'last_health_check': '2025-07-20 18:52:00'
+        'overall_status': _overall_status(snapshot),
+        'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'metrics': snapshot,
+        'latency_warning_ms': LATENCY_WARNING_MS,
+        'latency_critical_ms': LATENCY_CRITICAL_MS,
+        'health_history': health_history,
+        'alerts': alerts,
+        'latency_timestamps': [c.timestamp.strftime('%H:%M') for c in latency_checks],
+        'latency_p50_history': [_detail(c, 'requests', 'p50_ms') for c in latency_checks],
+        'latency_p95_history': [_detail(c, 'requests', 'p95_ms') for c in latency_checks],
+        'latency_p99_history': [_detail(c, 'requests', 'p99_ms') for c in latency_checks],
+        'resource_timestamps': [c.timestamp.strftime('%H:%M') for c in resource_checks],
+        'cpu_history': [_detail(c, 'process', 'cpu_percent') for c in resource_checks],
+        'memory_history': [_detail(c, 'process', 'system_memory_percent') for c in resource_checks],
+        'rss_history': [_detail(c, 'process', 'rss_mb') for c in resource_checks],
     }
 
-    flash('System Health Dashboard - Monitor system performance and alerts', 'info')
     return render_template('admin/health_dashboard.html', **health_data)
 
 @app.route('/admin/api_tracking')
@@ -2386,8 +2331,50 @@ def api_tracking_view():
     """API Usage Tracking"""
     if not current_user.is_admin:
         return redirect(url_for('index'))
-    flash('API Usage Tracking - Monitor API calls and performance metrics', 'info')  
-    return render_template('admin/api_tracking.html')
+
+    from api_usage_tracker import get_usage_report
+
+    try:
+        report = get_usage_report(days=30)
+    except Exception as e:
+        logger.error(f"Error loading API usage report: {e}")
+        flash('API usage data is unavailable right now', 'warning')
+        report = {'totals': {}, 'daily': [], 'operations': [], 'models': [], 'recent': []}
+
+    totals = report['totals'] or {}
+    total_requests = int(totals.get('total_requests') or 0)
+
+    service_totals = {}
+    for row in report['operations']:
+        service_totals[row['source']] = service_totals.get(row['source'], 0) + int(row['calls'] or 0)
+
+    return render_template(
+        'admin/api_tracking.html',
+        today_stats={'total_requests': totals.get('today_requests', 0), 'total_tokens': totals.get('today_tokens', 0)},
+        yesterday_stats={'total_requests': totals.get('yesterday_requests', 0), 'total_tokens': totals.get('yesterday_tokens', 0)},
+        this_week_stats={'total_requests': totals.get('week_requests', 0), 'total_tokens': totals.get('week_tokens', 0)},
+        this_month_stats={'total_requests': totals.get('month_requests', 0), 'total_tokens': totals.get('month_tokens', 0)},
+        overall_stats={
+            'total_requests': total_requests,
+            'total_tokens': totals.get('total_tokens', 0),
+            'avg_duration': int((totals.get('total_latency_ms') or 0) / total_requests) if total_requests else 0,
+            'failures': totals.get('failures', 0),
+            'cache_hits': totals.get('cache_hits', 0),
+            'retries': totals.get('retries', 0),
+            'cost_usd': float(totals.get('cost_usd') or 0),
+        },
+        model_breakdown=report['models'],
+        operations=report['operations'],
+        recent_requests=report['recent'],
+        daily_labels=[row['day'].strftime('%Y-%m-%d') for row in report['daily']],
+        daily_requests=[int(row['calls'] or 0) for row in report['daily']],
+        daily_tokens=[int(row['tokens'] or 0) for row in report['daily']],
+        daily_cost=[round(float(row['cost_usd'] or 0), 4) for row in report['daily']],
+        daily_avg_latency=[int(row['avg_latency_ms'] or 0) for row in report['daily']],
+        daily_max_latency=[int(row['max_latency_ms'] or 0) for row in report['daily']],
+        service_labels=list(service_totals.keys()),
+        service_counts=list(service_totals.values()),
+    )
 
 @app.route('/admin/settings')
 @login_required
@@ -2591,14 +2578,34 @@ def export_template():
     flash('Excel template download initiated', 'success')
     return redirect(url_for('automation_control'))
 
+def _zip_download(entries, prefix):
+    """Stream a ZIP built from export entries as a chunked attachment download"""
+    from zip_export import stream_zip
+    filename = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(
+        stream_with_context(stream_zip(entries)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @app.route('/admin/export_screenshots_zip')
 @login_required
 def export_screenshots_zip():
     """Export Screenshots as ZIP"""
     if not current_user.is_admin:
         return redirect(url_for('index'))
-    flash('Screenshots export initiated', 'success')
-    return redirect(url_for('automation_control'))
+
+    try:
+        from models import Screenshot
+        from zip_export import screenshots_export_entries
+
+        screenshots = Screenshot.query.order_by(Screenshot.id)
+        return _zip_download(screenshots_export_entries(screenshots), 'sa_lottery_screenshots')
+
+    except Exception as e:
+        logger.error(f"Error creating screenshots zip: {e}")
+        flash(f'Error creating screenshots archive: {str(e)}', 'error')
+        return redirect(url_for('automation_control'))
 
 @app.route('/admin/export_combined_zip')
 @login_required
@@ -2608,150 +2615,41 @@ def export_combined_zip():
         return redirect(url_for('index'))
 
     try:
-        import zipfile
-        import io
-        import json
-        from datetime import datetime
-        from models import Screenshot, LotteryResult
-
-        # Create in-memory zip file
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # Add screenshots
-            screenshots = Screenshot.query.all()
-            screenshot_count = 0
-            for screenshot in screenshots:
-                # Check both file_path and construct path from filename
-                file_paths_to_try = []
-                if screenshot.file_path:
-                    file_paths_to_try.append(screenshot.file_path)
-                if screenshot.filename:
-                    file_paths_to_try.append(f"/tmp/screenshots/{screenshot.filename}")
-
-                for file_path in file_paths_to_try:
-                    if os.path.exists(file_path):
-                        try:
-                            zip_file.write(file_path, f"screenshots/{screenshot.filename}")
-                            logger.info(f"Added screenshot to zip: {screenshot.filename} from {file_path}")
-                            screenshot_count += 1
-                            break
-                        except Exception as e:
-                            logger.warning(f"Could not add screenshot {screenshot.filename} from {file_path}: {e}")
-                    else:
-                        logger.warning(f"Screenshot file not found: {file_path}")
-
-            logger.info(f"Successfully added {screenshot_count} screenshots to ZIP")
-
-            # Add lottery data as JSON - use raw SQL to avoid PostgreSQL type issues
-            try:
-                import psycopg2
-                # from config import Config  # Removed - not needed
-
-                conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
-                cur = conn.cursor()
-
-                cur.execute("""
-                    SELECT id, lottery_type, draw_number, draw_date, numbers, bonus_numbers, 
-                           divisions, rollover_amount, next_jackpot, total_pool_size, 
-                           total_sales, draw_machine, next_draw_date, created_at
-                    FROM lottery_result 
-                    ORDER BY draw_date DESC
-                """)
-
-                lottery_data = []
-                for row in cur.fetchall():
-                    lottery_data.append({
-                        'id': row[0],
-                        'lottery_type': row[1],
-                        'draw_number': row[2],
-                        'draw_date': row[3].isoformat() if row[3] else None,
-                        'numbers': row[4],
-                        'bonus_numbers': row[5],
-                        'divisions': row[6],
-                        'rollover_amount': str(row[7]) if row[7] else None,
-                        'next_jackpot': str(row[8]) if row[8] else None,
-                        'total_pool_size': str(row[9]) if row[9] else None,
-                        'total_sales': str(row[10]) if row[10] else None,
-                        'draw_machine': row[11],
-                        'next_draw_date': row[12].isoformat() if row[12] else None,
-                        'created_at': row[13].isoformat() if row[13] else None
-                    })
-
-                cur.close()
-                conn.close()
-
-                lottery_json = json.dumps(lottery_data, indent=2, ensure_ascii=False)
-                zip_file.writestr('lottery_data.json', lottery_json)
-                logger.info(f"Added lottery data to zip: {len(lottery_data)} records")
-
-            except Exception as e:
-                logger.warning(f"Could not add lottery data: {e}")
-                # Add fallback empty data
-                zip_file.writestr('lottery_data.json', '{"error": "Could not export lottery data", "message": "' + str(e) + '"}')
-
-            # Add screenshot metadata
-            try:
-                screenshot_data = []
-                for screenshot in screenshots:
-                    screenshot_data.append({
-                        'id': screenshot.id,
-                        'lottery_type': screenshot.lottery_type,
-                        'url': screenshot.url,
-                        'filename': screenshot.filename,
-                        'file_size': screenshot.file_size,
-                        'timestamp': screenshot.timestamp.isoformat() if screenshot.timestamp else None,
-                        'status': screenshot.status,
-                        'capture_method': screenshot.capture_method
-                    })
-
-                screenshot_json = json.dumps(screenshot_data, indent=2, ensure_ascii=False)
-                zip_file.writestr('screenshot_metadata.json', screenshot_json)
-                logger.info("Added screenshot metadata to zip")
-
-            except Exception as e:
-                logger.warning(f"Could not add screenshot metadata: {e}")
-
-            # Add readme file
-            readme_content = f"""
-# South African Lottery Data Export
-Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-## Contents:
-- screenshots/ - All lottery website screenshots
-- lottery_data.json - Complete lottery results data
-- screenshot_metadata.json - Screenshot capture information
-
-## Description:
-This archive contains authentic South African lottery data captured from official sources:
-- {len(screenshots)} screenshots from SA National Lottery website
-- {len(lottery_data) if 'lottery_data' in locals() else 'N/A'} lottery result records
-- All 6 lottery types: LOTTO, LOTTO PLUS 1, LOTTO PLUS 2, POWERBALL, POWERBALL PLUS, DAILY LOTTO
-
-## AI Processing:
-Data extracted using Google Gemini 2.5 Pro with 98-99% accuracy confidence scores.
-"""
-            zip_file.writestr('README.txt', readme_content)
-
-        zip_buffer.seek(0)
-
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'sa_lottery_data_{timestamp}.zip'
+        from models import Screenshot
+        from zip_export import combined_export_entries
 
-        from flask import send_file
-        return send_file(
-            zip_buffer,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=filename
-        )
+        # Archive is written while it downloads - screenshots read in blocks,
+        # result rows from a server-side cursor
+        screenshots = Screenshot.query.order_by(Screenshot.id)
+        return _zip_download(combined_export_entries(screenshots), 'sa_lottery_data')
 
     except Exception as e:
         logger.error(f"Error creating combined zip: {e}")
         flash(f'Error creating combined archive: {str(e)}', 'error')
         return redirect(url_for('automation_control'))
 
+@app.route('/admin/export_data/<dataset>')
+@login_required
+def export_data_stream(dataset):
+    """Stream lottery results or predictions as NDJSON or CSV"""
+    if not current_user.is_admin:
+        return redirect(url_for('index'))
+
+    fmt = request.args.get('format', 'ndjson').lower()
+    if dataset not in EXPORT_DATASETS or fmt not in EXPORT_FORMATS:
+        return jsonify({
+            'error': f"Export must be one of {', '.join(EXPORT_DATASETS)} "
+                     f"in {' or '.join(EXPORT_FORMATS)}"
+        }), 400
+
+    lottery_type = request.args.get('lottery_type')
+    filename = f"sa_lottery_{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(export_stream(dataset, fmt, lottery_type)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @app.route('/admin/sync_all_screenshots', methods=['POST'])
 @login_required
 def sync_all_screenshots():
@@ -2863,38 +2761,26 @@ def run_automation_step():
             else:
                 flash(f'Cleanup failed: {result.get("error", "Unknown error")}', 'error')
 
-        elif step == 'capture':
-            # Capture fresh screenshots from lottery websites
-            from screenshot_capture import capture_all_lottery_screenshots
-            results = capture_all_lottery_screenshots()
-
-            if results['total_success'] > 0:
-                flash(f'Screenshot capture completed: {results["total_success"]}/{results["total_processed"]} successful', 'success')
-                if results['total_failed'] > 0:
-                    failed_types = [result['lottery_type'] for result in results['failed']]
-                    flash(f'{results["total_failed"]} screenshots failed to capture', 'warning')
-            else:
-                flash('Screenshot capture failed: No screenshots were captured successfully', 'error')
+        elif step in ('capture', 'ai_process'):
+            # Same DAG as the nightly run, stopped after capture or run through
+            # to the database - a later step resumes from the earlier one's checkpoint
+            from scheduler_fix import run_automation_now_worker_safe
+            summary = run_automation_now_worker_safe(until='capture' if step == 'capture' else 'save')
 
-        elif step == 'ai_process':
-            # AI processing of captured screenshots with Google Gemini 2.5 Pro
-            try:
-                from ai_lottery_processor import run_complete_ai_workflow
-                ai_results = run_complete_ai_workflow()
-
-                if ai_results['total_success'] > 0:
-                    flash(f'AI processing completed: {ai_results["total_success"]}/{ai_results["total_processed"]} screenshots processed with Gemini 2.5 Pro', 'success')
-                    flash(f'Database records created: {len(ai_results.get("database_records", []))}', 'info')
-                    if ai_results['total_failed'] > 0:
-                        flash(f'{ai_results["total_failed"]} screenshots failed processing', 'warning')
+            if summary is None:
+                flash('Automation is already running in another worker - try again shortly', 'warning')
+            elif step == 'capture':
+                if summary['screenshots'] > 0:
+                    flash(f'Screenshot capture completed: {summary["screenshots"]}/6 successful', 'success')
                 else:
-                    flash('AI processing failed: No screenshots processed successfully', 'error')
-                    if 'error' in ai_results:
-                        flash(f'Error details: {ai_results["error"]}', 'error')
-
-            except Exception as e:
-                logger.error(f"AI processing workflow error: {e}")
-                flash(f'AI workflow error: {str(e)}', 'error')
+                    flash('Screenshot capture failed: No screenshots were captured successfully', 'error')
+            elif summary['extracted'] > 0:
+                flash(f'AI processing completed: {summary["extracted"]}/6 screenshots processed with Gemini 2.5 Pro', 'success')
+                flash(f'Database records: {summary["draws_inserted"]} new, {summary["draws_updated"]} updated', 'info')
+            else:
+                flash('AI processing failed: No screenshots processed successfully', 'error')
+            for error in (summary or {}).get('errors', []):
+                flash(f'Error details: {error}', 'error')
 
         elif step == 'database_update':
             # Database update with processed data
@@ -2985,35 +2871,17 @@ def OLD_run_complete_automation_sync():
         except Exception as verify_error:
             flash(f'Step 4 Warning: Database verification issue: {verify_error}', 'warning')
 
-        # STEP 5: Enhanced AI Prediction Workflow (using new orchestrator)
+        # STEP 5: Prediction validation and generation run off the draw events
+        # published as each draw was saved in step 3 - report what they did
+        validations_completed = ai_results.get('predictions_validated', 0)
+        predictions_generated = ai_results.get('predictions_generated', 0)
         if new_results_count > 0:
-            logger.info(f"Step 5: Running enhanced AI prediction workflow for {new_results_count} new lottery results...")
-            predictions_generated = 0
-            validations_completed = 0
-
-            try:
-                # Use the new enhanced workflow orchestrator
-                from enhanced_workflow_integration import get_workflow_orchestrator
-                orchestrator = get_workflow_orchestrator()
-                
-                # Run the complete post-update workflow
-                workflow_result = orchestrator.handle_post_database_update()
-                
-                validations_completed = workflow_result.get('predictions_validated', 0)
-                predictions_generated = workflow_result.get('predictions_generated', 0)
-                
-                logger.info(f"✅ Enhanced workflow: {validations_completed} validations + {predictions_generated} predictions")
-                flash(f'Step 5 Complete: {validations_completed} predictions validated + {predictions_generated} fresh predictions generated', 'success')
-
-            except Exception as prediction_error:
-                logger.error(f"Step 5 Error: Enhanced workflow failed: {prediction_error}")
-                flash(f'Step 5 Warning: AI prediction workflow encountered an issue: {str(prediction_error)}', 'warning')
-                predictions_generated = 0
-                validations_completed = 0
+            logger.info(f"Step 5: {validations_completed} validations + {predictions_generated} predictions "
+                        f"from draw events ({ai_results.get('draws_inserted', 0)} inserted, "
+                        f"{ai_results.get('draws_updated', 0)} updated)")
+            flash(f'Step 5 Complete: {validations_completed} predictions validated + {predictions_generated} fresh predictions generated', 'success')
         else:
             logger.info("Step 5: Skipped AI prediction workflow (no new results)")
-            predictions_generated = 0
-            validations_completed = 0
 
         # Determine overall workflow success
         success = (ai_results.get('total_processed', 0) > 0 and 
@@ -3190,6 +3058,7 @@ def generate_predictions_only():
 
 # Visualization API endpoints
 @app.route('/api/visualization-data')
+@conditional_get('visualization', max_age=300, stale_while_revalidate=1800)
 def visualization_data():
     """API endpoint for visualization charts data"""
     try:
@@ -3203,42 +3072,18 @@ def visualization_data():
         cur = conn.cursor()
 
         if data_type == 'numbers_frequency':
-            # Get all lottery results to process numbers
-            if lottery_type == 'all':
-                cur.execute("SELECT main_numbers FROM lottery_results WHERE main_numbers IS NOT NULL")
-            else:
-                # Map display names to database values
-                db_lottery_type = lottery_type
-                if lottery_type == 'Lottery':
-                    db_lottery_type = 'LOTTO'
-                elif lottery_type == 'Lotto':
-                    db_lottery_type = 'LOTTO'
+            # Map display names to database values
+            db_lottery_type = lottery_type
+            if lottery_type in ('Lottery', 'Lotto'):
+                db_lottery_type = 'LOTTO'
 
-                cur.execute("SELECT main_numbers FROM lottery_results WHERE lottery_type = %s AND main_numbers IS NOT NULL", (db_lottery_type,))
-
-            rows = cur.fetchall()
-
-            # Process numbers and count frequency
-            number_freq = {}
-            total_records = 0
-
-            for row in rows:
-                total_records += 1
-                try:
-                    if row[0]:  # main_numbers
-                        numbers = json.loads(row[0]) if isinstance(row[0], str) else row[0]
-                        if isinstance(numbers, list):
-                            for num in numbers:
-                                if isinstance(num, (int, str)) and str(num).isdigit():
-                                    num = int(num)
-                                    number_freq[num] = number_freq.get(num, 0) + 1
-                except (json.JSONDecodeError, ValueError, TypeError) as e:
-                    logger.warning(f"Error parsing numbers {row[0]}: {e}")
-                    continue
+            # Counted in NumPy blocks from a server-side cursor instead of fetchall()
+            stats = number_frequencies(db_lottery_type)
+            total_records = stats['draws']
 
             # Convert to chart format - top 10 most frequent
             frequency_data = []
-            for num, freq in sorted(number_freq.items(), key=lambda x: x[1], reverse=True)[:10]:
+            for num, freq in ranked_frequencies(stats['counts'])[:10]:
                 percentage = round((freq / total_records) * 100, 2) if total_records > 0 else 0
                 frequency_data.append({
                     'number': num,
@@ -3260,7 +3105,7 @@ def visualization_data():
                     'borderColor': ['rgba(54, 162, 235, 1)'] * len(frequency_data),
                     'borderWidth': 1
                 }],
-                'total_draws': len(rows),
+                'total_draws': total_records,
                 'lottery_type': lottery_type
             })
 
@@ -3453,6 +3298,17 @@ try:
 except ImportError as e:
     logger.error(f"Critical module missing: {e}")
 
+# Apply pending schema migrations - gunicorn's on_starting does this too, but
+# `python main.py` never goes through it; the advisory lock serialises the runs
+if os.environ.get('RUN_MIGRATIONS', 'true').lower() in ('true', '1', 'yes'):
+    try:
+        from db_migrations import run_migrations
+        applied = run_migrations()
+        if applied:
+            logger.info(f"Applied migrations: {', '.join(applied)}")
+    except Exception as e:
+        logger.error(f"Database migrations failed: {e}")
+
 # Initialize basic cache manager
 try:
     from cache_manager import init_cache_manager
@@ -3461,6 +3317,13 @@ try:
 except ImportError as e:
     logger.warning(f"Cache manager not available: {e}")
 
+# Initialize request/database instrumentation for the health dashboard
+try:
+    from instrumentation import init_instrumentation
+    init_instrumentation(app)
+except ImportError as e:
+    logger.warning(f"Instrumentation not available: {e}")
+
 logger.info("All modules lazy-loaded successfully")
 
 # Initialize WORKER-SAFE scheduler for Gunicorn multi-process environment
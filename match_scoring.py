@@ -0,0 +1,125 @@
+"""
+Match Scoring
+Bitmask scoring of played lines against drawn numbers.
+
+A line or draw becomes an integer with bit n set for ball n (every game draws
+from at most 58 balls, so one 64-bit word holds it). A match count is then a
+single AND plus popcount instead of building two sets per comparison, and
+many lines against many draws is one broadcast NumPy operation - used by
+prediction validation, ticket checking, backtests and wheel evaluation.
+"""
+
+import numpy as np
+
+MAX_BALL = 63
+
+# Games whose bonus ball is drawn from the main pool, so it is matched against
+# the player's main numbers rather than a separately chosen bonus number
+BONUS_FROM_MAIN_POOL = {'LOTTO', 'LOTTO PLUS 1', 'LOTTO PLUS 2'}
+
+# Lines scored per block in batch operations - bounds the (lines x draws) temporary
+SCORE_CHUNK_SIZE = 4096
+
+
+def numbers_to_mask(numbers):
+    """Integer with bit n set for each number n in 1..63"""
+    mask = 0
+    for n in numbers or []:
+        n = int(n)
+        if 1 <= n <= MAX_BALL:
+            mask |= 1 << n
+    return mask
+
+
+def mask_to_numbers(mask):
+    """Sorted numbers whose bits are set"""
+    mask = int(mask)
+    return [n for n in range(1, MAX_BALL + 1) if mask >> n & 1]
+
+
+def masks_from_lines(lines):
+    """uint64 array with one mask per line"""
+    return np.fromiter((numbers_to_mask(line) for line in lines), dtype=np.uint64, count=len(lines))
+
+
+def count_matches(line, draw):
+    """How many numbers two lists have in common"""
+    return (numbers_to_mask(line) & numbers_to_mask(draw)).bit_count()
+
+
+def score_line(predicted_main, actual_main, predicted_bonus=None, actual_bonus=None):
+    """
+    Match counts and matched numbers for one line against one draw:
+    {'main_matches', 'bonus_matches', 'matched_main', 'matched_bonus'}
+    """
+    main_hits = numbers_to_mask(predicted_main) & numbers_to_mask(actual_main)
+    bonus_hits = numbers_to_mask(predicted_bonus) & numbers_to_mask(actual_bonus)
+    return {
+        'main_matches': main_hits.bit_count(),
+        'bonus_matches': bonus_hits.bit_count(),
+        'matched_main': mask_to_numbers(main_hits),
+        'matched_bonus': mask_to_numbers(bonus_hits),
+    }
+
+
+def score_matrix(line_masks, draw_masks):
+    """(lines x draws) uint8 matrix of match counts"""
+    line_masks = np.asarray(line_masks, dtype=np.uint64)
+    draw_masks = np.asarray(draw_masks, dtype=np.uint64)
+    return np.bitwise_count(line_masks[:, None] & draw_masks[None, :])
+
+
+def iter_score_blocks(line_masks, draw_masks, chunk_size=SCORE_CHUNK_SIZE):
+    """Yield (start, block) score matrices for successive chunks of lines"""
+    line_masks = np.asarray(line_masks, dtype=np.uint64)
+    draw_masks = np.asarray(draw_masks, dtype=np.uint64)
+    for start in range(0, len(line_masks), chunk_size):
+        yield start, score_matrix(line_masks[start:start + chunk_size], draw_masks)
+
+
+def match_histogram(line_masks, draw_masks, max_matches=MAX_BALL):
+    """
+    How many (line, draw) pairs matched exactly k numbers, for k = 0..max_matches.
+    Scores in chunks, so millions of comparisons never hold the full matrix.
+    """
+    histogram = np.zeros(max_matches + 1, dtype=np.int64)
+    for _, block in iter_score_blocks(line_masks, draw_masks):
+        histogram += np.bincount(block.ravel(), minlength=max_matches + 1)[:max_matches + 1]
+    return histogram
+
+
+def best_match_per_draw(line_masks, draw_masks):
+    """Highest match count any of the lines achieved in each draw (e.g. a wheel's best line)"""
+    best = np.zeros(len(draw_masks), dtype=np.uint8)
+    for _, block in iter_score_blocks(line_masks, draw_masks):
+        np.maximum(best, block.max(axis=0), out=best)
+    return best
+
+
+def score_ticket_lines(game_type, lines, actual_main, actual_bonus=None, line_bonus=None):
+    """
+    Score every line on a ticket against one draw.
+
+    For Lotto games the drawn bonus ball counts when it appears among a line's
+    main numbers; for PowerBall it counts when it equals the line's own
+    PowerBall (line_bonus, one per line).
+    """
+    if not lines:
+        return []
+    counts = score_matrix(masks_from_lines(lines), [numbers_to_mask(actual_main)])[:, 0]
+    bonus_mask = numbers_to_mask(actual_bonus)
+
+    results = []
+    for i, line in enumerate(lines):
+        if game_type in BONUS_FROM_MAIN_POOL:
+            bonus_match = bool(numbers_to_mask(line) & bonus_mask)
+        elif line_bonus and i < len(line_bonus) and line_bonus[i] is not None:
+            bonus_match = bool(numbers_to_mask([line_bonus[i]]) & bonus_mask)
+        else:
+            bonus_match = False
+        results.append({
+            'line': i + 1,
+            'main_matches': int(counts[i]),
+            'bonus_match': bonus_match,
+        })
+    return results
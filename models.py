@@ -4,6 +4,7 @@ Database models for the South African Lottery Scanner
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from datetime import datetime
 import json
 
@@ -45,6 +46,49 @@ class LotteryResult(db.Model):
         db.Index('idx_lottery_type', 'lottery_type'),
     )
 
+class LotteryPredictionRecord(db.Model):
+    """AI prediction for an upcoming draw - schema and indexes are applied by db_migrations"""
+    __tablename__ = 'lottery_predictions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    game_type = db.Column(db.String(50), nullable=False)
+    predicted_numbers = db.Column(ARRAY(db.Integer), nullable=False)
+    bonus_numbers = db.Column(ARRAY(db.Integer))
+    confidence_score = db.Column(db.Numeric(5, 4))
+    prediction_method = db.Column(db.String(100))
+    reasoning = db.Column(db.Text)
+    target_draw_date = db.Column(db.Date)
+    linked_draw_id = db.Column(db.Integer)  # Draw number this prediction is for
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    validation_status = db.Column(db.String(20), default='pending')  # pending, validated, correct, incorrect, corrected
+    is_verified = db.Column(db.Boolean, default=False)
+    is_locked = db.Column(db.Boolean, default=False)
+    verified_at = db.Column(db.DateTime)
+    validation_date = db.Column(db.DateTime)
+    accuracy_score = db.Column(db.Float)
+    accuracy_percentage = db.Column(db.Numeric(5, 2))
+    main_number_matches = db.Column(db.Integer, default=0)
+    bonus_number_matches = db.Column(db.Integer, default=0)
+    matched_main_numbers = db.Column(ARRAY(db.Integer))
+    matched_bonus_numbers = db.Column(ARRAY(db.Integer))
+    match_details = db.Column(JSONB)
+    prize_tier = db.Column(db.String(50))
+    ensemble_composition = db.Column(JSONB)
+    model_weights = db.Column(JSONB)
+
+    # Mirrors db_migrations.PREDICTION_INDEXES
+    __table_args__ = (
+        db.Index('idx_predictions_game_created', 'game_type', db.text('created_at DESC')),
+        db.Index('idx_predictions_game_draw', 'game_type', 'linked_draw_id', db.text('created_at DESC')),
+        db.Index('idx_predictions_linked_draw', 'linked_draw_id'),
+        db.Index('idx_predictions_game_target', 'game_type', 'target_draw_date'),
+        db.Index('idx_predictions_pending_target', 'game_type', 'target_draw_date', db.text('created_at DESC'),
+                 postgresql_where=db.text("validation_status = 'pending'")),
+        db.Index('idx_predictions_unverified', db.text('created_at DESC'),
+                 postgresql_where=db.text('is_verified = FALSE')),
+        db.Index('idx_predictions_created', db.text('created_at DESC')),
+    )
+
 class ExtractionReview(db.Model):
     """Model for tracking image extraction reviews"""
     id = db.Column(db.Integer, primary_key=True)
@@ -21,12 +21,14 @@ from cross_game_intelligence import (
     get_cross_game_intelligence_summary
 )
 from confidence_calibration import calibrate_prediction_confidence, get_calibrator
+from cache_manager import get_cache_backend
 
 logger = logging.getLogger(__name__)
 
 # Cache for trained models (avoid retraining every time)
-MODEL_CACHE = {}
+# Backed by cache_manager so trained ensembles are shared across workers/instances
 CACHE_TIMEOUT_HOURS = 24
+MODEL_CACHE = get_cache_backend('models', default_ttl=CACHE_TIMEOUT_HOURS * 3600)
 
 
 def full_ensemble_prediction(lottery_type: str, config: Dict, historical_df) -> Tuple[Optional[List[int]], Optional[List[int]], Optional[float], Optional[str]]:
@@ -301,6 +303,17 @@ def validate_and_update_models(lottery_type: str, actual_numbers: List[int],
         logger.error(f"Error validating and updating models: {e}")
 
 
+def invalidate_trained_models(lottery_type: str) -> None:
+    """
+    Drop today's cached models for a game after it gains a draw, so the next
+    prediction retrains on it
+    """
+    today = datetime.now().strftime('%Y%m%d')
+    for cache_key in (f"{lottery_type}_ensemble_{today}", f"{lottery_type}_{today}"):
+        MODEL_CACHE.delete(cache_key)
+    logger.info(f"Cleared cached models for {lottery_type}")
+
+
 def train_all_models_fresh():
     """
     Train all models from scratch for all game types
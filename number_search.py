@@ -0,0 +1,181 @@
+"""
+Number Search
+In-memory bitset index over draw history for containment and combination
+queries ("which draws contained 12 and 31", "has this exact line ever been
+drawn", "draws sharing at least 4 numbers with my ticket").
+
+Each draw's main numbers become one 64-bit mask (bit n set for number n - all
+games draw from at most 58 balls), held per game in a NumPy uint64 array, so
+a query over the full history is a single vectorised AND/compare/popcount.
+
+The index is rebuilt lazily when the draws data version changes: in this
+process straight away after a save (invalidate_number_index), and in other
+workers within INDEX_CHECK_INTERVAL seconds through the shared data version.
+"""
+
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+
+from db_pool import get_db_connection
+from lottery_numbers import MAIN_NUMBERS_SQL, BONUS_NUMBERS_SQL
+from match_scoring import numbers_to_mask, masks_from_lines
+
+logger = logging.getLogger(__name__)
+
+# Seconds between data version checks on the query path
+INDEX_CHECK_INTERVAL = float(os.environ.get('NUMBER_INDEX_CHECK_INTERVAL', 5))
+
+# Highest main-ball number per game, for validating queries
+GAME_MAIN_RANGES = {
+    'LOTTO': 58,
+    'LOTTO PLUS 1': 58,
+    'LOTTO PLUS 2': 58,
+    'POWERBALL': 50,
+    'POWERBALL PLUS': 50,
+    'DAILY LOTTO': 36,
+}
+
+MODE_SUBSET = 'subset'
+MODE_EXACT = 'exact'
+MODE_AT_LEAST = 'at_least'
+SEARCH_MODES = (MODE_SUBSET, MODE_EXACT, MODE_AT_LEAST)
+
+
+class GameIndex:
+    """Bitsets for one game's draws, oldest first"""
+
+    def __init__(self, game_type, rows):
+        self.game_type = game_type
+        self.draw_numbers = np.array([r[0] for r in rows], dtype=np.int64)
+        self.draw_dates = [r[1] for r in rows]
+        self.main_numbers = [sorted(r[2] or []) for r in rows]
+        self.bonus_numbers = [list(r[3] or []) for r in rows]
+        self.masks = masks_from_lines([r[2] for r in rows])
+
+    def __len__(self):
+        return len(self.masks)
+
+    def match_counts(self, query_mask):
+        return np.bitwise_count(self.masks & np.uint64(query_mask))
+
+    def search(self, numbers, mode=MODE_SUBSET, min_matches=None):
+        """Positions of matching draws and the number of query numbers each one contains"""
+        query_mask = numbers_to_mask(numbers)
+        counts = self.match_counts(query_mask)
+        if mode == MODE_EXACT:
+            hits = self.masks == np.uint64(query_mask)
+        elif mode == MODE_AT_LEAST:
+            hits = counts >= (min_matches or 1)
+        else:
+            hits = counts == bin(query_mask).count('1')
+        positions = np.flatnonzero(hits)
+        return positions, counts[positions]
+
+
+class NumberSearchIndex:
+    """Per-game GameIndex objects, rebuilt when the draws data version changes"""
+
+    def __init__(self):
+        self._games = {}
+        self._version = None
+        self._stale = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        from http_cache import get_data_version
+        return get_data_version('draws')
+
+    def _load(self):
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    SELECT lottery_type, draw_number, draw_date, {MAIN_NUMBERS_SQL}, {BONUS_NUMBERS_SQL}
+                    FROM lottery_results
+                    WHERE main_numbers IS NOT NULL
+                    ORDER BY lottery_type, draw_date, draw_number
+                """)
+                rows = cur.fetchall()
+
+        by_game = {}
+        for game_type, draw_number, draw_date, main, bonus in rows:
+            by_game.setdefault(game_type, []).append((draw_number, draw_date, main, bonus))
+        return {game: GameIndex(game, game_rows) for game, game_rows in by_game.items()}
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if not self._stale and now - self._checked_at < INDEX_CHECK_INTERVAL:
+            return
+        with self._lock:
+            if not self._stale and now - self._checked_at < INDEX_CHECK_INTERVAL:
+                return
+            # An unknown version (database hiccup) rebuilds at most once per interval
+            version = self._current_version()
+            if self._stale or version is None or version != self._version:
+                started = time.perf_counter()
+                self._games = self._load()
+                self._version = version
+                self._stale = False
+                logger.info(f"Number search index built for {sum(len(g) for g in self._games.values())} draws "
+                            f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+            self._checked_at = now
+
+    def invalidate(self):
+        self._stale = True
+
+    def game(self, game_type):
+        self._ensure_fresh()
+        return self._games.get(game_type)
+
+    def search(self, game_type, numbers, mode=MODE_SUBSET, min_matches=None, limit=100):
+        """
+        Search a game's full draw history.
+
+        subset:   draws containing every number given
+        exact:    draws whose main numbers are exactly the numbers given
+        at_least: draws containing at least min_matches of the numbers given
+        Results are newest first.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'")
+        index = self.game(game_type)
+        if index is None:
+            return {'game_type': game_type, 'total_matches': 0, 'draws_searched': 0,
+                    'search_time_us': 0, 'matches': []}
+
+        started = time.perf_counter()
+        positions, counts = index.search(numbers, mode, min_matches)
+        elapsed_us = (time.perf_counter() - started) * 1_000_000
+
+        # Positions are in draw order, oldest first
+        matches = []
+        for i in range(len(positions) - 1, max(len(positions) - 1 - limit, -1), -1):
+            pos = positions[i]
+            draw_date = index.draw_dates[pos]
+            matches.append({
+                'draw_number': int(index.draw_numbers[pos]),
+                'draw_date': draw_date.isoformat() if draw_date else None,
+                'main_numbers': index.main_numbers[pos],
+                'bonus_numbers': index.bonus_numbers[pos],
+                'match_count': int(counts[i]),
+            })
+
+        return {
+            'game_type': game_type,
+            'total_matches': len(positions),
+            'draws_searched': len(index),
+            'search_time_us': round(elapsed_us, 1),
+            'matches': matches,
+        }
+
+
+number_index = NumberSearchIndex()
+
+
+def invalidate_number_index():
+    """Rebuild this process's index on the next query - call after a draw is saved"""
+    number_index.invalidate()
@@ -5,7 +5,6 @@ Parse fetched HTML data and import lottery results into the database
 
 import json
 import re
-import psycopg2
 import logging
 import os
 from datetime import datetime
@@ -106,52 +105,19 @@ def import_to_database(results):
     Import parsed results to PostgreSQL database
     """
     try:
-        conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
-        cur = conn.cursor()
-        
-        imported = 0
-        skipped = 0
-        
-        for result in results:
-            if not result:
-                continue
-            
-            # Check if already exists
-            cur.execute("""
-                SELECT COUNT(*) FROM lottery_results 
-                WHERE lottery_type = %s AND draw_date = %s
-            """, (result['lottery_type'], result['draw_date']))
-            
-            if cur.fetchone()[0] > 0:
-                logger.info(f"Skipping {result['lottery_type']} {result['draw_date']} - already exists")
-                skipped += 1
-                continue
-            
-            # Insert new result
-            cur.execute("""
-                INSERT INTO lottery_results 
-                (lottery_type, draw_number, draw_date, numbers, bonus_numbers, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
-            """, (
-                result['lottery_type'],
-                result['draw_number'],
-                result['draw_date'],
-                json.dumps(result['main_numbers']),
-                json.dumps(result['bonus_numbers']) if result['bonus_numbers'] else None
-            ))
-            
-            logger.info(f"✅ Imported {result['lottery_type']} {result['draw_date']}")
-            imported += 1
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        from bulk_import import import_records
+        summary = import_records(result for result in results if result)
+        
+        for message in summary['rejections']:
+            logger.warning(f"Rejected {message}")
         
         logger.info(f"\n{'='*60}")
-        logger.info(f"Import complete: {imported} new results, {skipped} skipped")
+        logger.info(f"Import complete: {summary['inserted']} new results, "
+                    f"{summary['updated']} updated, {summary['unchanged']} skipped, "
+                    f"{summary['rejected']} rejected")
         logger.info(f"{'='*60}")
         
-        return imported, skipped
+        return summary['inserted'], summary['unchanged']
         
     except Exception as e:
         logger.error(f"Database error: {e}")
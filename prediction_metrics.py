@@ -0,0 +1,114 @@
+"""
+Prediction Metrics
+Aggregated statistics over lottery_predictions for the analytics dashboard.
+
+Every figure the system-metrics endpoint reports comes from one grouped scan
+with FILTER clauses; overall totals are rolled up from the per-game rows in
+Python. The result is cached in the 'metrics' namespace and dropped whenever
+predictions are stored or validated, so polling the dashboard is cheap no
+matter how large the table grows.
+"""
+
+import os
+import logging
+from datetime import datetime
+
+from cache_manager import get_cache_backend
+from db_pool import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on staleness if a writer forgets to invalidate
+METRICS_TTL = int(os.environ.get('PREDICTION_METRICS_TTL', 300))
+
+_METRICS_KEY = 'prediction_metrics'
+
+_metrics_cache = get_cache_backend('metrics', default_ttl=METRICS_TTL)
+
+
+def _query_metrics():
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT game_type,
+                       COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE created_at >= NOW() - INTERVAL '30 days') AS recent,
+                       COUNT(*) FILTER (WHERE is_verified = true) AS verified,
+                       SUM(confidence_score) AS confidence_sum,
+                       COUNT(confidence_score) AS confidence_count,
+                       SUM(accuracy_score) FILTER (WHERE is_verified = true) AS accuracy_sum,
+                       COUNT(accuracy_score) FILTER (WHERE is_verified = true) AS accuracy_count,
+                       MIN(accuracy_score) FILTER (WHERE is_verified = true) AS accuracy_min,
+                       MAX(accuracy_score) FILTER (WHERE is_verified = true) AS accuracy_max
+                FROM lottery_predictions
+                GROUP BY game_type
+            """)
+            rows = cur.fetchall()
+
+    totals = {
+        'total': 0, 'recent': 0, 'verified': 0,
+        'confidence_sum': 0.0, 'confidence_count': 0,
+        'accuracy_sum': 0.0, 'accuracy_count': 0,
+    }
+    accuracy_min = None
+    accuracy_max = None
+    by_game = []
+
+    for (game_type, total, recent, verified, confidence_sum, confidence_count,
+         accuracy_sum, accuracy_count, game_min, game_max) in rows:
+        totals['total'] += total
+        totals['recent'] += recent
+        totals['verified'] += verified
+        totals['confidence_sum'] += float(confidence_sum or 0)
+        totals['confidence_count'] += confidence_count
+        totals['accuracy_sum'] += float(accuracy_sum or 0)
+        totals['accuracy_count'] += accuracy_count
+        if game_min is not None:
+            accuracy_min = float(game_min) if accuracy_min is None else min(accuracy_min, float(game_min))
+        if game_max is not None:
+            accuracy_max = float(game_max) if accuracy_max is None else max(accuracy_max, float(game_max))
+        by_game.append({
+            'game_type': game_type,
+            'count': total,
+            'recent_30d': recent,
+            'verified': verified,
+        })
+
+    by_game.sort(key=lambda game: game['count'], reverse=True)
+    total = totals['total']
+
+    return {
+        'total_predictions': total,
+        'recent_predictions_30d': totals['recent'],
+        'verified_predictions': totals['verified'],
+        'verification_rate': (totals['verified'] / total * 100) if total > 0 else 0.0,
+        'average_confidence': round(totals['confidence_sum'] / totals['confidence_count'], 2)
+        if totals['confidence_count'] else 0.0,
+        'accuracy_metrics': {
+            'average': totals['accuracy_sum'] / totals['accuracy_count'] if totals['accuracy_count'] else 0.0,
+            'minimum': accuracy_min or 0.0,
+            'maximum': accuracy_max or 0.0,
+        },
+        'predictions_by_game': by_game,
+        'last_updated': datetime.now().isoformat(),
+    }
+
+
+def get_prediction_metrics(use_cache=True):
+    """Get system-wide prediction metrics, computing them on a cache miss"""
+    if use_cache:
+        metrics = _metrics_cache.get(_METRICS_KEY)
+        if metrics is not None:
+            return metrics
+
+    metrics = _query_metrics()
+    _metrics_cache.set(_METRICS_KEY, metrics)
+    return metrics
+
+
+def invalidate_prediction_metrics():
+    """Drop cached metrics after predictions are stored, deleted or validated"""
+    try:
+        _metrics_cache.delete(_METRICS_KEY)
+    except Exception as e:
+        logger.warning(f"Could not invalidate prediction metrics: {e}")
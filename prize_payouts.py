@@ -0,0 +1,257 @@
+"""
+Prize Payouts
+Prize division rules and per-draw payout tables built from the prize_divisions
+stored with every lottery_results row.
+
+Division rules are lookup arrays indexed by [main matches, bonus matched], so
+whole (lines x draws) match matrices map to divisions - and then to the rand
+amount actually paid in each draw - with NumPy fancy indexing. Backtests and
+wheels get exact historical ROI in one pass instead of guessed prize values.
+
+Payout tables are parsed once per game and kept in the 'payouts' cache
+namespace keyed by the draws data version, so a new draw rebuilds them.
+"""
+
+import os
+import re
+import json
+import logging
+import statistics
+
+import numpy as np
+
+from cache_manager import get_cache_backend
+from db_pool import get_db_connection
+from lottery_numbers import MAIN_NUMBERS_SQL, BONUS_NUMBERS_SQL
+from match_scoring import BONUS_FROM_MAIN_POOL, masks_from_lines, score_matrix
+
+logger = logging.getLogger(__name__)
+
+PAYOUT_CACHE_TTL = int(os.environ.get('PAYOUT_CACHE_TTL', 86400))
+
+NO_PRIZE = 'No prize'
+
+# Price of one line in rand
+TICKET_COSTS = {
+    'LOTTO': 5.0,
+    'LOTTO PLUS 1': 2.5,
+    'LOTTO PLUS 2': 2.5,
+    'POWERBALL': 5.0,
+    'POWERBALL PLUS': 2.5,
+    'DAILY LOTTO': 3.0,
+}
+
+# (main matches, bonus matched) -> division, per game family
+_LOTTO_DIVISIONS = {(6, 0): 1, (6, 1): 1, (5, 1): 2, (5, 0): 3, (4, 1): 4, (4, 0): 5,
+                    (3, 1): 6, (3, 0): 7, (2, 1): 8}
+_POWERBALL_DIVISIONS = {(5, 1): 1, (5, 0): 2, (4, 1): 3, (4, 0): 4, (3, 1): 5, (3, 0): 6,
+                        (2, 1): 7, (1, 1): 8, (0, 1): 9}
+_DAILY_LOTTO_DIVISIONS = {(5, 0): 1, (4, 0): 2, (3, 0): 3, (2, 0): 4}
+
+GAME_DIVISIONS = {
+    'LOTTO': _LOTTO_DIVISIONS,
+    'LOTTO PLUS 1': _LOTTO_DIVISIONS,
+    'LOTTO PLUS 2': _LOTTO_DIVISIONS,
+    'POWERBALL': _POWERBALL_DIVISIONS,
+    'POWERBALL PLUS': _POWERBALL_DIVISIONS,
+    'DAILY LOTTO': _DAILY_LOTTO_DIVISIONS,
+}
+
+_payout_cache = get_cache_backend('payouts', default_ttl=PAYOUT_CACHE_TTL)
+
+
+def _division_lookup(rules):
+    """int8 array [main, bonus] -> division (0 = no prize)"""
+    lookup = np.zeros((7, 2), dtype=np.int8)
+    for (main, bonus), division in rules.items():
+        lookup[main, bonus] = division
+    return lookup
+
+
+DIVISION_LOOKUPS = {game: _division_lookup(rules) for game, rules in GAME_DIVISIONS.items()}
+
+
+def division_count(game_type):
+    return max(GAME_DIVISIONS.get(game_type, _LOTTO_DIVISIONS).values())
+
+
+def divisions_for(game_type, main_matches, bonus_matches):
+    """Division numbers for arrays (or scalars) of match counts - 0 means no prize"""
+    lookup = DIVISION_LOOKUPS.get(game_type, DIVISION_LOOKUPS['LOTTO'])
+    main = np.clip(np.asarray(main_matches, dtype=np.int64), 0, lookup.shape[0] - 1)
+    bonus = (np.asarray(bonus_matches, dtype=np.int64) > 0).astype(np.int64)
+    return lookup[main, bonus]
+
+
+def prize_tier(game_type, main_matches, bonus_matches):
+    """'Division N' or 'No prize' for one line"""
+    division = int(divisions_for(game_type, main_matches, bonus_matches))
+    return f"Division {division}" if division else NO_PRIZE
+
+
+def _parse_amount(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return 0.0
+    cleaned = re.sub(r'[^0-9.]', '', str(value))
+    try:
+        return float(cleaned) if cleaned else 0.0
+    except ValueError:
+        return 0.0
+
+
+def parse_divisions(prize_divisions):
+    """{division number: (payout per winner, winners)} from stored prize_divisions JSON"""
+    if isinstance(prize_divisions, str):
+        try:
+            prize_divisions = json.loads(prize_divisions)
+        except json.JSONDecodeError:
+            return {}
+    if isinstance(prize_divisions, dict):
+        prize_divisions = [{**v, 'division': v.get('division', k)} if isinstance(v, dict)
+                           else {'division': k, 'amount': v}
+                           for k, v in prize_divisions.items()]
+
+    parsed = {}
+    for entry in prize_divisions or []:
+        if not isinstance(entry, dict):
+            continue
+        digits = re.search(r'\d+', str(entry.get('division', '')))
+        if not digits:
+            continue
+        amount = entry.get('amount', entry.get('prize', entry.get('prize_amount', entry.get('payout'))))
+        winners = entry.get('winners', 0)
+        try:
+            winners = int(str(winners).replace(',', '') or 0)
+        except ValueError:
+            winners = 0
+        parsed[int(digits.group())] = (_parse_amount(amount), winners)
+    return parsed
+
+
+class PayoutTable:
+    """
+    One game's draws, oldest first: main/bonus masks and a (draws x divisions+1)
+    payout matrix where column d is what a single Division d winner was paid
+    (column 0 is always 0).
+
+    Divisions nobody won show R0.00 in the published results; a hypothetical
+    winner would have shared that pool, so they are filled with the rollover
+    for Division 1 and the game's median payout for that division otherwise.
+    """
+
+    def __init__(self, game_type, rows):
+        self.game_type = game_type
+        self.draw_numbers = np.array([r[0] for r in rows], dtype=np.int64)
+        self.main_masks = masks_from_lines([r[1] for r in rows])
+        self.bonus_masks = masks_from_lines([r[2] for r in rows])
+
+        columns = division_count(game_type) + 1
+        payouts = np.zeros((len(rows), columns), dtype=np.float64)
+        known = np.zeros((len(rows), columns), dtype=bool)
+        for i, row in enumerate(rows):
+            for division, (amount, winners) in parse_divisions(row[3]).items():
+                if 0 < division < columns and amount > 0:
+                    payouts[i, division] = amount
+                    known[i, division] = True
+            rollover = _parse_amount(row[4])
+            if not known[i, 1] and rollover > 0:
+                payouts[i, 1] = rollover
+                known[i, 1] = True
+
+        for division in range(1, columns):
+            paid = payouts[known[:, division], division]
+            if len(paid):
+                payouts[~known[:, division], division] = statistics.median(paid.tolist())
+        self.payouts = payouts
+        self.ticket_cost = TICKET_COSTS.get(game_type, 5.0)
+
+    def __len__(self):
+        return len(self.draw_numbers)
+
+    def positions_for(self, draw_numbers):
+        """Row positions for draw numbers (-1 where the draw is unknown)"""
+        draw_numbers = np.asarray(draw_numbers, dtype=np.int64)
+        if not len(self):
+            return np.full(len(draw_numbers), -1, dtype=np.int64)
+        order = np.argsort(self.draw_numbers)
+        sorted_numbers = self.draw_numbers[order]
+        idx = np.clip(np.searchsorted(sorted_numbers, draw_numbers), 0, len(sorted_numbers) - 1)
+        return np.where(sorted_numbers[idx] == draw_numbers, order[idx], -1)
+
+    def bonus_match_matrix(self, line_masks, line_bonus_masks=None):
+        """(lines x draws) 0/1 - bonus ball in the line for Lotto, PowerBall equal for PowerBall games"""
+        if self.game_type in BONUS_FROM_MAIN_POOL:
+            return score_matrix(line_masks, self.bonus_masks)
+        if line_bonus_masks is None:
+            return np.zeros((len(line_masks), len(self)), dtype=np.uint8)
+        return score_matrix(line_bonus_masks, self.bonus_masks)
+
+    def evaluate_lines(self, lines, line_bonus=None):
+        """
+        Exact historical result of playing every line in every draw:
+        winnings, cost, ROI and how often each division was hit.
+        """
+        line_masks = masks_from_lines(lines)
+        bonus_masks = masks_from_lines([[b] for b in line_bonus]) if line_bonus else None
+        main = score_matrix(line_masks, self.main_masks)
+        bonus = self.bonus_match_matrix(line_masks, bonus_masks)
+        divisions = divisions_for(self.game_type, main, bonus)
+        winnings = self.payouts[np.arange(len(self))[None, :], divisions]
+        return _roi_summary(self.game_type, divisions, winnings, divisions.size * self.ticket_cost)
+
+
+def _roi_summary(game_type, divisions, winnings, total_cost):
+    total_winnings = float(winnings.sum())
+    counts = np.bincount(np.asarray(divisions).ravel(), minlength=division_count(game_type) + 1)
+    return {
+        'lines_played': int(np.asarray(divisions).size),
+        'total_cost': round(total_cost, 2),
+        'total_winnings': round(total_winnings, 2),
+        'roi': round((total_winnings - total_cost) / total_cost, 4) if total_cost else -1.0,
+        'division_hits': {f"Division {d}": int(c) for d, c in enumerate(counts) if d and c},
+    }
+
+
+def _load_payout_table(game_type):
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT draw_number, {MAIN_NUMBERS_SQL}, {BONUS_NUMBERS_SQL}, prize_divisions, rollover_amount
+                FROM lottery_results
+                WHERE lottery_type = %s AND main_numbers IS NOT NULL
+                ORDER BY draw_date, draw_number
+            """, (game_type,))
+            rows = cur.fetchall()
+    return PayoutTable(game_type, rows)
+
+
+def get_payout_table(game_type):
+    """Cached payout table for a game, rebuilt when draws change"""
+    from http_cache import get_data_version
+    key = f"{game_type}:{get_data_version('draws')}"
+    table = _payout_cache.get(key)
+    if table is None:
+        table = _load_payout_table(game_type)
+        _payout_cache.set(key, table)
+        logger.info(f"Payout table built for {game_type}: {len(table)} draws")
+    return table
+
+
+def roi_for_matches(game_type, draw_numbers, main_matches, bonus_matches):
+    """
+    Exact ROI for already-scored lines - one (draw number, main matches,
+    bonus matches) triple per line played, e.g. every prediction in a backtest.
+    """
+    table = get_payout_table(game_type)
+    positions = table.positions_for(draw_numbers)
+    divisions = divisions_for(game_type, main_matches, bonus_matches)
+    divisions = np.where(positions >= 0, divisions, 0)
+    winnings = np.where(positions >= 0, table.payouts[np.maximum(positions, 0), divisions], 0.0)
+    return _roi_summary(game_type, divisions, winnings, len(divisions) * table.ticket_cost)
+
+
+def evaluate_lines(game_type, lines, line_bonus=None):
+    """Exact historical ROI of playing the given lines (e.g. a wheel) in every past draw of a game"""
+    return get_payout_table(game_type).evaluate_lines(lines, line_bonus)
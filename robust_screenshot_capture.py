@@ -16,6 +16,9 @@ from playwright.async_api import async_playwright
 # Add current directory to path
 sys.path.append('.')
 
+from screenshot_preprocessing import record_results_region, crop_sidecar_path
+from draw_extraction import html_sidecar_path
+
 def setup_logging():
     """Configure logging for screenshot capture"""
     logging.basicConfig(
@@ -59,6 +62,14 @@ async def capture_with_retry(page, url, lottery_type, filepath, logger, max_retr
             # Take screenshot
             await page.screenshot(path=filepath, full_page=True)
             
+            # Keep the rendered page for the DOM parser, and where the draw
+            # header, balls and prize table are so the AI fallback can crop to them
+            with open(html_sidecar_path(filepath), 'w', encoding='utf-8') as f:
+                f.write(await page.content())
+            region = await record_results_region(page, filepath)
+            if not region:
+                logger.info(f"No results region found for {lottery_type} - full page will be sent")
+            
             # Verify file was created and has reasonable size
             if os.path.exists(filepath):
                 file_size = os.path.getsize(filepath)
@@ -67,7 +78,9 @@ async def capture_with_retry(page, url, lottery_type, filepath, logger, max_retr
                     return True
                 else:
                     logger.warning(f"Screenshot too small ({file_size} bytes), retrying...")
-                    os.remove(filepath)
+                    for path in (filepath, crop_sidecar_path(filepath), html_sidecar_path(filepath)):
+                        if os.path.exists(path):
+                            os.remove(path)
             
         except Exception as e:
             logger.error(f"Attempt {attempt + 1} failed for {lottery_type}: {str(e)}")
@@ -77,34 +90,111 @@ async def capture_with_retry(page, url, lottery_type, filepath, logger, max_retr
                 await asyncio.sleep(wait_time)
             
             # Clean up failed file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            for path in (filepath, crop_sidecar_path(filepath), html_sidecar_path(filepath)):
+                if os.path.exists(path):
+                    os.remove(path)
     
     logger.error(f"❌ Failed to capture {lottery_type} after {max_retries} attempts")
     return False
 
+LOTTERY_URLS = {
+    'lotto': 'https://www.nationallottery.co.za/results/lotto',
+    'lotto_plus_1': 'https://www.nationallottery.co.za/results/lotto-plus-1-results',
+    'lotto_plus_2': 'https://www.nationallottery.co.za/results/lotto-plus-2-results',
+    'powerball': 'https://www.nationallottery.co.za/results/powerball',
+    'powerball_plus': 'https://www.nationallottery.co.za/results/powerball-plus',
+    'daily_lotto': 'https://www.nationallottery.co.za/results/daily-lotto'
+}
+
+BROWSER_PATHS = [
+    "/nix/store/zi4f80l169xlmivz8vja8wlphq74qqk0-chromium-125.0.6422.141/bin/chromium",
+    "/usr/bin/chromium-browser", 
+    "/usr/bin/chromium",
+    None  # Use Playwright's bundled browser
+]
+
+BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox', 
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--no-first-run',
+    '--disable-extensions',
+    '--disable-default-apps',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding'
+]
+
+async def launch_browser(p, logger):
+    """Launch headless Chromium from the first path that works, or None"""
+    for browser_path in BROWSER_PATHS:
+        try:
+            if browser_path:
+                logger.info(f"Trying browser path: {browser_path}")
+                browser = await p.chromium.launch(executable_path=browser_path, headless=True, args=BROWSER_ARGS)
+            else:
+                logger.info("Using Playwright's bundled Chromium")
+                browser = await p.chromium.launch(headless=True)
+            
+            logger.info("Browser launched successfully")
+            return browser
+            
+        except Exception as e:
+            logger.warning(f"Failed to launch browser with path {browser_path}: {e}")
+            continue
+    
+    logger.error("Failed to launch any browser")
+    return None
+
+async def new_capture_page(browser):
+    # Create browser context with optimized settings
+    context = await browser.new_context(
+        viewport={'width': 1920, 'height': 1080},
+        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    )
+    return await context.new_page()
+
+async def capture_single_screenshot(lottery_type, timestamp=None):
+    """
+    Capture one game's results page in its own browser, so games can be
+    captured side by side. Returns the screenshot path, or None.
+    """
+    logger = setup_logging()
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    filepath = os.path.join('screenshots', f"{timestamp}_{lottery_type}.png")
+    os.makedirs('screenshots', exist_ok=True)
+    
+    try:
+        async with async_playwright() as p:
+            browser = await launch_browser(p, logger)
+            if not browser:
+                return None
+            try:
+                page = await new_capture_page(browser)
+                success = await capture_with_retry(page, LOTTERY_URLS[lottery_type], lottery_type, filepath, logger)
+            finally:
+                await browser.close()
+    except Exception as e:
+        logger.error(f"Screenshot capture failed for {lottery_type}: {str(e)}")
+        return None
+    
+    return filepath if success else None
+
 async def robust_screenshot_capture():
     """Main screenshot capture function with enhanced error handling"""
     
     logger = setup_logging()
     logger.info("=== STARTING ROBUST SCREENSHOT CAPTURE ===")
     
-    # Lottery URLs
-    lottery_urls = {
-        'lotto': 'https://www.nationallottery.co.za/results/lotto',
-        'lotto_plus_1': 'https://www.nationallottery.co.za/results/lotto-plus-1-results',
-        'lotto_plus_2': 'https://www.nationallottery.co.za/results/lotto-plus-2-results',
-        'powerball': 'https://www.nationallottery.co.za/results/powerball',
-        'powerball_plus': 'https://www.nationallottery.co.za/results/powerball-plus',
-        'daily_lotto': 'https://www.nationallottery.co.za/results/daily-lotto'
-    }
-    
     # Create screenshots directory
     os.makedirs('/tmp/screenshots', exist_ok=True)
     
     # Test network connectivity first
     logger.info("Testing network connectivity...")
-    test_url = lottery_urls['lotto']
+    test_url = LOTTERY_URLS['lotto']
     if not test_network_connectivity(test_url, logger):
         logger.error("Network connectivity test failed - aborting screenshot capture")
         return 0
@@ -115,62 +205,14 @@ async def robust_screenshot_capture():
     
     try:
         async with async_playwright() as p:
-            # Try multiple browser paths
-            browser_paths = [
-                "/nix/store/zi4f80l169xlmivz8vja8wlphq74qqk0-chromium-125.0.6422.141/bin/chromium",
-                "/usr/bin/chromium-browser", 
-                "/usr/bin/chromium",
-                None  # Use Playwright's bundled browser
-            ]
-            
-            browser = None
-            for browser_path in browser_paths:
-                try:
-                    if browser_path:
-                        logger.info(f"Trying browser path: {browser_path}")
-                        browser = await p.chromium.launch(
-                            executable_path=browser_path,
-                            headless=True,
-                            args=[
-                                '--no-sandbox',
-                                '--disable-setuid-sandbox', 
-                                '--disable-dev-shm-usage',
-                                '--disable-gpu',
-                                '--disable-web-security',
-                                '--disable-features=VizDisplayCompositor',
-                                '--no-first-run',
-                                '--disable-extensions',
-                                '--disable-default-apps',
-                                '--disable-background-timer-throttling',
-                                '--disable-backgrounding-occluded-windows',
-                                '--disable-renderer-backgrounding'
-                            ]
-                        )
-                    else:
-                        logger.info("Using Playwright's bundled Chromium")
-                        browser = await p.chromium.launch(headless=True)
-                    
-                    logger.info("Browser launched successfully")
-                    break
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to launch browser with path {browser_path}: {e}")
-                    continue
-            
+            browser = await launch_browser(p, logger)
             if not browser:
-                logger.error("Failed to launch any browser")
                 return 0
             
-            # Create browser context with optimized settings
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            
-            page = await context.new_page()
+            page = await new_capture_page(browser)
             
             # Process each lottery type
-            for lottery_type, url in lottery_urls.items():
+            for lottery_type, url in LOTTERY_URLS.items():
                 # Safety check - abort if taking too long
                 if time.time() - start_time > 600:  # 10 minutes max
                     logger.warning("Screenshot capture taking too long, aborting remaining captures")
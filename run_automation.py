@@ -15,19 +15,27 @@ def main():
     print("="*60)
     print("\nThis workflow will:")
     print("  1. Clean up old screenshots")
-    print("  2. Capture fresh screenshots from lottery website")
-    print("  3. Process screenshots with Google Gemini AI")
+    print("  2. Capture fresh screenshots from lottery website (per game)")
+    print("  3. Process each screenshot as soon as it is captured")
     print("  4. Update database with new lottery results")
     print("  5. Validate existing predictions")
     print("  6. Generate fresh AI predictions")
+    print("\nAn unfinished previous run is resumed from its failed steps.")
     print("\n" + "="*60 + "\n")
     
     # Initialize and run the scheduler workflow
     scheduler = WorkerSafeLotteryScheduler()
-    scheduler.run_automation_now()
+    summary = scheduler.run_automation_now()
     
     print("\n" + "="*60)
-    print("WORKFLOW COMPLETE")
+    if summary is None:
+        print("SKIPPED - ANOTHER WORKER IS RUNNING THE AUTOMATION")
+    else:
+        print(f"WORKFLOW {summary['status'].upper()} in {summary['seconds']}s")
+        for step in summary['steps']:
+            label = f"{step['step']} {step['game'] or ''}".strip()
+            note = ' (resumed)' if step['resumed'] else (f" - {step['error']}" if step['error'] else '')
+            print(f"  {label:<28} {step['status']:<8} {step['seconds']:>7.1f}s{note}")
     print("="*60)
 
 if __name__ == '__main__':
@@ -6,6 +6,7 @@ Ensures automation runs reliably at 23:45 SA time regardless of worker restarts
 
 import os
 import sys
+import json
 import time
 import logging
 import threading
@@ -25,216 +26,198 @@ logger = logging.getLogger(__name__)
 # South African timezone (UTC+2)
 SA_TIMEZONE = timezone(timedelta(hours=2))
 
+# pg advisory lock key for the automation run (db_migrations uses 7203410001)
+AUTOMATION_LOCK_KEY = 7203410002
+# How often the lock holder pings its session
+AUTOMATION_HEARTBEAT_SECONDS = int(os.environ.get('AUTOMATION_HEARTBEAT_SECONDS', 30))
+# A scheduled run is skipped when another worker or instance already ran it this recently
+AUTOMATION_MIN_INTERVAL_MINUTES = int(os.environ.get('AUTOMATION_MIN_INTERVAL_MINUTES', 60))
+
+
+class AutomationLock:
+    """
+    Session-level pg_try_advisory_lock on one autocommit connection.
+
+    Postgres releases the lock when the session ends, so a crashed worker or
+    instance frees it at once - no lock table and no expiry to wait out. The
+    session never sits in a transaction; a heartbeat thread pings it so
+    idle-connection timeouts do not drop it, and sets `lost` if it goes away
+    (the lock went with it).
+    """
+
+    def __init__(self, key=AUTOMATION_LOCK_KEY):
+        self.key = key
+        self.worker_id = f"worker_{os.getpid()}_{int(time.time())}"
+        self.conn = None
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self._conn_lock = threading.Lock()
+
+    def acquire(self):
+        """True if this worker now holds the lock; never waits for it"""
+        try:
+            # Named so the holder shows up in pg_stat_activity (see automation_lock_holder)
+            conn = psycopg2.connect(os.environ.get('DATABASE_URL'), application_name=f"automation {self.worker_id}")
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+                acquired = cur.fetchone()[0]
+        except Exception as e:
+            logger.error(f"❌ Failed to acquire automation lock: {e}")
+            return False
+
+        if not acquired:
+            conn.close()
+            return False
+        self.conn = conn
+        self._heartbeat = threading.Thread(target=self._beat, name='automation-heartbeat', daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _beat(self):
+        while not self._stop.wait(AUTOMATION_HEARTBEAT_SECONDS):
+            try:
+                with self._conn_lock, self.conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            except Exception as e:
+                logger.error(f"❌ WORKER-SAFE: Automation lock session lost ({e}) - stopping the run")
+                self.lost.set()
+                return
+
+    def release(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=5)
+        with self._conn_lock:
+            try:
+                if not self.lost.is_set():
+                    with self.conn.cursor() as cur:
+                        cur.execute("SELECT pg_advisory_unlock(%s)", (self.key,))
+            except Exception as e:
+                logger.warning(f"Failed to unlock automation lock - released with the session: {e}")
+            finally:
+                self.conn.close()
+                self.conn = None
+
+
+def automation_lock_holder():
+    """The session holding the automation lock (name, since, last heartbeat), or None"""
+    from db_pool import get_db_connection
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            # A bigint advisory key is stored as classid (high 32 bits) + objid (low 32 bits)
+            cur.execute("""
+                SELECT a.application_name, a.backend_start, a.state_change
+                FROM pg_locks l
+                JOIN pg_stat_activity a ON a.pid = l.pid
+                WHERE l.locktype = 'advisory' AND l.granted
+                  AND l.classid = %s AND l.objid = %s AND l.objsubid = 1
+            """, (AUTOMATION_LOCK_KEY >> 32, AUTOMATION_LOCK_KEY & 0xFFFFFFFF))
+            row = cur.fetchone()
+    if not row:
+        return None
+    return {'holder': row[0], 'since': row[1].isoformat(), 'last_heartbeat': row[2].isoformat()}
+
 class WorkerSafeLotteryScheduler:
     """
     A scheduler that works reliably with Gunicorn multi-worker processes
-    Uses APScheduler with database persistence to ensure jobs run exactly once
+    Every worker schedules the job; a Postgres advisory lock (AutomationLock)
+    lets exactly one of them run it at a time
     """
 
     def __init__(self):
         self.scheduler = None
         self.running = False
-
-    def run_automation_now(self):
-        """Run the automation workflow - same proven working system with database locking"""
+        # Threaded/green workers can import the app from several threads at once
+        self._start_lock = threading.Lock()
+
+    def run_automation_now(self, until='save', skip_if_recent=False):
+        """
+        Run the automation DAG (automation_pipeline) under the advisory lock,
+        resuming the last unfinished run. Returns the run summary, or None
+        when another worker holds the lock or (skip_if_recent) already ran it.
+        """
         logger.info("🚀 WORKER-SAFE: Starting scheduled automation...")
 
-        # Try to acquire database lock first
-        conn, worker_id = self._get_database_lock()
-        if not conn or not worker_id:
+        lock = AutomationLock()
+        if not lock.acquire():
             logger.info("🚫 WORKER-SAFE: Skipping automation - another worker is already running")
-            return
+            return None
+        logger.info(f"🔐 WORKER-SAFE: Acquired automation lock with worker_id={lock.worker_id}")
 
         start_time = datetime.now(SA_TIMEZONE)
+        summary = None
 
         try:
+            # Every worker of every instance fires the cron job; whoever gets the
+            # lock after the first one has finished sees its log row
+            if skip_if_recent and self._ran_recently():
+                logger.info(f"🚫 WORKER-SAFE: Skipping automation - already ran in the last "
+                            f"{AUTOMATION_MIN_INTERVAL_MINUTES} minutes")
+                return None
+
             # Import Flask app and use same working system
             sys.path.append('.')
             from app import app
-            import glob
+            from automation_pipeline import run_automation, RUN_FAILED
 
             # Run within Flask application context
             with app.app_context():
-                logger.info("=== WORKER-SAFE: Using SAME 4-step system as manual button ===")
-
-                # Step 1: Clean screenshots
-                logger.info("Step 1: Clean up existing screenshots")
-                existing_screenshots = glob.glob('screenshots/*.png')
-                for screenshot in existing_screenshots:
-                    try:
-                        os.remove(screenshot)
-                        logger.info(f"Deleted old screenshot: {screenshot}")
-                    except Exception as e:
-                        logger.warning(f"Failed to delete {screenshot}: {e}")
-
-                # Step 2: Capture screenshots using robust system
-                logger.info("Step 2: Capturing 6 fresh screenshots")
-                try:
-                    from screenshot_capture import capture_all_lottery_screenshots
-                    capture_results = capture_all_lottery_screenshots()
-                    logger.info(f"Screenshot capture results: {capture_results}")
-
-                    # Verify we have exactly 6 screenshots
-                    screenshots = glob.glob('screenshots/*.png')
-                    logger.info(f"Step 2 Complete: Captured {len(screenshots)} fresh screenshots")
-
-                    if len(screenshots) >= 6:
-                        # Step 3: Process with AI (EXACT SAME as manual button)
-                        logger.info("Step 3: Processing screenshots with Google Gemini 2.5 Pro AI")
-                        from ai_lottery_processor import CompleteLotteryProcessor
-
-                        # Initialize and run the comprehensive AI processor (EXACT SAME as manual button)
-                        processor = CompleteLotteryProcessor()
-                        workflow_result = processor.process_all_screenshots()
-
-                        # Check if processing was successful - comprehensive processor returns dict with results
-                        success = workflow_result.get('total_success', 0) > 0 or len(workflow_result.get('database_records', [])) > 0
-                        new_results = len(workflow_result.get('database_records', []))
-                        logger.info(f"✅ WORKER-SAFE SUCCESS: {len(screenshots)} screenshots, {new_results} new results")
-
-                        # STEP 4: AUTO-VALIDATE EXISTING PREDICTIONS AND GENERATE NEW ONES
-                        if new_results > 0:
-                            logger.info("Step 4a: Auto-validating existing predictions against new lottery results...")
-                            validation_results = 0
-                            try:
-                                from prediction_validation_system import PredictionValidationSystem
-
-                                validation_system = PredictionValidationSystem()
-                                validation_result = validation_system.validate_all_pending_predictions()
-                                validation_results = len(validation_result.get('validated_predictions', []))
-                                logger.info(f"✅ WORKER-SAFE VALIDATION SUCCESS: Validated {validation_results} existing predictions")
-
-                            except Exception as validation_error:
-                                logger.warning(f"⚠️ WORKER-SAFE VALIDATION WARNING: Prediction validation failed: {validation_error}")
-
-                            logger.info("Step 4b: FRESH prediction generation for next draws...")
-                            try:
-                                # Use ONLY the intelligent fresh prediction system to ensure unique numbers for each draw
-                                from fresh_prediction_generator import generate_fresh_predictions_for_new_draws
-                                fresh_predictions_success = generate_fresh_predictions_for_new_draws()
-                                logger.info(f"✅ WORKER-SAFE FRESH PREDICTION SUCCESS: Generated fresh predictions using intelligent system only")
-
-                                predictions_generated = 1 if fresh_predictions_success else 0
-
-                                # Log success with predictions and validation
-                                self._log_automation_run(start_time, datetime.now(SA_TIMEZONE), True, 
-                                                       f"Captured {len(screenshots)} screenshots, found {new_results} new results, validated {validation_results} predictions, generated {predictions_generated} AI predictions")
-                            except Exception as prediction_error:
-                                logger.warning(f"⚠️ WORKER-SAFE PREDICTION PARTIAL: Lottery results captured and predictions validated, but immediate prediction generation failed: {prediction_error}")
-                                # Log success for results and validation but note prediction failure
-                                self._log_automation_run(start_time, datetime.now(SA_TIMEZONE), True, 
-                                                       f"Captured {len(screenshots)} screenshots, found {new_results} new results, validated {validation_results} predictions (generation failed: {prediction_error})")
-                        else:
-                            # Log success without predictions (no new results)
-                            self._log_automation_run(start_time, datetime.now(SA_TIMEZONE), True, 
-                                                   f"Captured {len(screenshots)} screenshots, found {new_results} new results")
-
-                    else:
-                        error_msg = f'Expected 6 screenshots, only captured {len(screenshots)}'
-                        logger.error(f"❌ WORKER-SAFE FAILED: {error_msg}")
-                        self._log_automation_run(start_time, datetime.now(SA_TIMEZONE), False, error_msg)
-
-                except Exception as e:
-                    logger.error(f"❌ WORKER-SAFE ERROR: {e}")
-                    self._log_automation_run(start_time, datetime.now(SA_TIMEZONE), False, str(e))
+                summary = run_automation(until=until, cancel=lock.lost)
+
+            changed = summary['draws_inserted'] + summary['draws_updated']
+            message = (f"Run {summary['run_id']} {summary['status']}{' (resumed)' if summary['resumed'] else ''}: "
+                       f"captured {summary['screenshots']} screenshots, extracted {summary['extracted']} results "
+                       f"({changed} new or updated), validated {summary['predictions_validated']} predictions, "
+                       f"generated {summary['predictions_generated']} AI predictions")
+            if summary['errors']:
+                message += f" - errors: {'; '.join(summary['errors'])}"
+            logger.info(f"{'❌' if summary['status'] == RUN_FAILED else '✅'} WORKER-SAFE: {message}")
+            self._log_automation_run(start_time, datetime.now(SA_TIMEZONE), summary['status'] != RUN_FAILED,
+                                     message, steps=summary['steps'])
 
         except Exception as e:
             logger.error(f"💥 WORKER-SAFE CRITICAL ERROR: {e}")
             self._log_automation_run(start_time, datetime.now(SA_TIMEZONE), False, f"Critical error: {str(e)}")
         finally:
-            # Always release the database lock
-            if conn and worker_id:
-                self._release_database_lock(conn, worker_id)
-
-    def _get_database_lock(self):
-        """Try to acquire database lock for automation - prevents multiple workers running simultaneously"""
-        try:
-            conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
-            cur = conn.cursor()
-
-            # Create automation lock table
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS automation_lock (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    worker_id VARCHAR(100),
-                    locked_at TIMESTAMP WITH TIME ZONE,
-                    expires_at TIMESTAMP WITH TIME ZONE,
-                    CHECK (id = 1)
-                );
-                INSERT INTO automation_lock (id, worker_id, locked_at, expires_at) 
-                VALUES (1, NULL, NULL, NULL) ON CONFLICT (id) DO NOTHING;
-            """)
-
-            # Try to acquire lock with 1 hour expiry (in case worker crashes)
-            worker_id = f"worker_{os.getpid()}_{int(time.time())}"
-            cur.execute("""
-                UPDATE automation_lock 
-                SET worker_id = %s, 
-                    locked_at = NOW(), 
-                    expires_at = NOW() + INTERVAL '1 hour'
-                WHERE id = 1 AND (worker_id IS NULL OR expires_at < NOW())
-                RETURNING worker_id
-            """, (worker_id,))
-
-            result = cur.fetchone()
-            conn.commit()
-
-            if result and result[0] == worker_id:
-                logger.info(f"🔐 WORKER-SAFE: Acquired automation lock with worker_id={worker_id}")
-                cur.close()
-                return conn, worker_id
-            else:
-                cur.close()
-                conn.close()
-                logger.info("🔒 WORKER-SAFE: Another worker is already running automation")
-                return None, None
-
-        except Exception as e:
-            logger.error(f"❌ Failed to acquire database lock: {e}")
-            return None, None
-
-    def _release_database_lock(self, conn, worker_id):
-        """Release database lock"""
-        try:
-            cur = conn.cursor()
-            cur.execute("UPDATE automation_lock SET worker_id = NULL, locked_at = NULL, expires_at = NULL WHERE worker_id = %s", (worker_id,))
-            conn.commit()
-            cur.close()
-            conn.close()
-            logger.info(f"🔓 WORKER-SAFE: Released automation lock for worker_id={worker_id}")
-        except Exception as e:
-            logger.error(f"❌ Failed to release database lock: {e}")
-
-
-
-    def _log_automation_run(self, start_time, end_time, success, message):
-        """Log automation run to database"""
+            # Always release the lock
+            lock.release()
+            logger.info(f"🔓 WORKER-SAFE: Released automation lock for worker_id={lock.worker_id}")
+
+        return summary
+
+    def run_scheduled_automation(self):
+        """Cron job entry point - at most one run per schedule across workers and instances"""
+        self.run_automation_now(skip_if_recent=True)
+
+    def _ran_recently(self):
+        from db_pool import get_db_connection
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT EXISTS (
+                        SELECT 1 FROM automation_logs
+                        WHERE success AND start_time > NOW() - make_interval(mins => %s)
+                          AND steps @> '[{"step": "save"}]'::JSONB
+                    )
+                """, (AUTOMATION_MIN_INTERVAL_MINUTES,))
+                return cur.fetchone()[0]
+
+    def _log_automation_run(self, start_time, end_time, success, message, steps=None):
+        """Log automation run to database, with per-step timings when the DAG ran"""
         try:
-            conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
-            cur = conn.cursor()
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS automation_logs (
-                    id SERIAL PRIMARY KEY,
-                    start_time TIMESTAMP WITH TIME ZONE NOT NULL,
-                    end_time TIMESTAMP WITH TIME ZONE NOT NULL,
-                    success BOOLEAN NOT NULL,
-                    message TEXT,
-                    duration_seconds INTEGER,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-                )
-            """)
-
+            from db_pool import get_db_connection
             duration_seconds = int((end_time - start_time).total_seconds())
 
-            cur.execute("""
-                INSERT INTO automation_logs (start_time, end_time, success, message, duration_seconds)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (start_time, end_time, success, message, duration_seconds))
-
-            conn.commit()
-            cur.close()
-            conn.close()
+            # automation_logs is created by db_migrations at startup
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO automation_logs (start_time, end_time, success, message, duration_seconds, steps)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                    """, (start_time, end_time, success, message, duration_seconds,
+                          json.dumps(steps) if steps is not None else None))
 
             logger.info(f"📊 WORKER-SAFE: Logged run - success={success}, duration={duration_seconds}s")
 
@@ -243,6 +226,10 @@ class WorkerSafeLotteryScheduler:
 
     def start(self):
         """Start the worker-safe scheduler using APScheduler"""
+        with self._start_lock:
+            return self._start_locked()
+
+    def _start_locked(self):
         if self.running:
             logger.warning("WORKER-SAFE: Scheduler already running")
             return False
@@ -258,7 +245,7 @@ class WorkerSafeLotteryScheduler:
 
             # Schedule daily at 23:45 SA time
             self.scheduler.add_job(
-                func=self.run_automation_now,
+                func=self.run_scheduled_automation,
                 trigger=CronTrigger(hour=23, minute=45, timezone=SA_TIMEZONE),
                 id='daily_lottery_automation',
                 name='Daily Lottery Automation',
@@ -295,10 +282,18 @@ class WorkerSafeLotteryScheduler:
         if jobs:
             next_run = jobs[0].next_run_time.strftime('%Y-%m-%d %H:%M:%S %Z') if jobs[0].next_run_time else None
 
+        try:
+            lock_holder = automation_lock_holder()
+        except Exception as e:
+            logger.warning(f"Could not check automation lock: {e}")
+            lock_holder = None
+
         return {
             'running': self.running,
             'jobs': len(jobs),
             'next_run': next_run,
+            'automation_running': lock_holder is not None,
+            'automation_lock': lock_holder,
             'scheduler_type': 'APScheduler (worker-safe)',
             'timezone': 'South Africa (UTC+2)'
         }
@@ -318,10 +313,9 @@ def get_worker_safe_status():
     """Get worker-safe scheduler status"""
     return _worker_safe_scheduler.get_status()
 
-def run_automation_now_worker_safe():
-    """Run automation immediately via worker-safe scheduler"""
-    _worker_safe_scheduler.run_automation_now()
-    return True
+def run_automation_now_worker_safe(until='save'):
+    """Run automation immediately via worker-safe scheduler; None if another worker is running it"""
+    return _worker_safe_scheduler.run_automation_now(until=until)
 
 if __name__ == "__main__":
     # Test the worker-safe scheduler
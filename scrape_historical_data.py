@@ -1,17 +1,35 @@
 #!/usr/bin/env python3
 """
 Scrape historical lottery data from za.national-lottery.com
-This will fetch the last 10 draws for each lottery type and save them to the database
+
+Reads each game's yearly archive pages for links to individual draws, fetches
+the draw pages concurrently through http_fetcher (pooled keep-alive session,
+per-host limits, retries, on-disk ETag cache) and streams them into
+bulk_import, which parses, validates and upserts them in batches.
+
+Usage:
+    python scrape_historical_data.py                          # this year, every game
+    python scrape_historical_data.py --years 2023 2024 2025 --games LOTTO POWERBALL
+    python scrape_historical_data.py --output pages.ndjson    # save pages, import later
+
+Fixture run against saved pages, without the network or a database:
+    python scrape_historical_data.py --fixture-site recent_draws_20251003_203257.json fixture_site
+    python -m http.server 8000 --directory fixture_site &
+    python scrape_historical_data.py --base-url http://localhost:8000 --years 2025 --dry-run
 """
 
-import requests
-from bs4 import BeautifulSoup
+import os
+import re
 import json
+import time
 import logging
-import os
-import sys
+import argparse
 from datetime import datetime
-import psycopg2
+from urllib.parse import urljoin, urlsplit
+
+from bs4 import BeautifulSoup
+
+from http_fetcher import HttpFetcher
 
 # Setup logging
 logging.basicConfig(
@@ -20,116 +38,192 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def fetch_historical_results(lottery_type_url, lottery_type_name):
+BASE_URL = 'https://za.national-lottery.com'
+
+# Path segment of each game on the results site
+LOTTERY_SLUGS = {
+    'LOTTO': 'lotto',
+    'LOTTO PLUS 1': 'lotto-plus-1',
+    'LOTTO PLUS 2': 'lotto-plus-2',
+    'POWERBALL': 'powerball',
+    'POWERBALL PLUS': 'powerball-plus',
+    'DAILY LOTTO': 'daily-lotto',
+}
+
+# Published draw pages do not change; skip the request entirely for a week
+DRAW_PAGE_MAX_AGE = 7 * 24 * 3600
+
+MONTHS = 'january|february|march|april|may|june|july|august|september|october|november|december'
+
+
+def archive_url(base_url, slug, year):
+    return f"{base_url.rstrip('/')}/{slug}/results/{year}-archive"
+
+
+def draw_links(html, page_url, slug):
+    """Individual draw pages (/<slug>/results/DD-month-YYYY) linked from a page, in page order"""
+    pattern = re.compile(rf'/{re.escape(slug)}/results/\d{{1,2}}-({MONTHS})-\d{{4}}/?$', re.I)
+    links = []
+    for link in BeautifulSoup(html, 'html.parser').find_all('a', href=True):
+        url = urljoin(page_url, link['href'])
+        if pattern.search(url) and url not in links:
+            links.append(url)
+    return links
+
+
+def scrape_pages(games, years, max_draws=None, fetcher=None, base_url=BASE_URL):
     """
-    Fetch historical results from the za.national-lottery.com website
+    Yield {'url', 'lottery_type', 'html', 'fetched_at'} for every draw page
+    linked from the games' archives for the given years, as pages arrive
     """
-    try:
-        logger.info(f"Fetching {lottery_type_name} historical results from: {lottery_type_url}")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    fetcher = fetcher or HttpFetcher()
+
+    # Archive pages for the current year change with every draw - always revalidated
+    archives = {archive_url(base_url, LOTTERY_SLUGS[game], year): game for game in games for year in years}
+    links = {game: [] for game in games}
+    for url, result in fetcher.fetch_many(archives):
+        if isinstance(result, Exception):
+            continue
+        game = archives[url]
+        links[game].extend(draw_links(result.text, url, LOTTERY_SLUGS[game]))
+
+    draw_pages = {}
+    for game in games:
+        found = list(dict.fromkeys(links[game]))
+        logger.info(f"Found {len(found)} draw links for {game}")
+        for url in found[:max_draws] if max_draws else found:
+            draw_pages[url] = game
+
+    for url, result in fetcher.fetch_many(draw_pages, max_age=DRAW_PAGE_MAX_AGE):
+        if isinstance(result, Exception):
+            continue
+        yield {
+            'url': url,
+            'lottery_type': draw_pages[url],
+            'html': result.text,
+            'fetched_at': datetime.now().isoformat(),
         }
-        
-        response = requests.get(lottery_type_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find draw result links or tables containing results
-        # The structure varies, but typically there are links to individual draws
-        draw_links = []
-        
-        # Try to find links that contain '/results/' in them
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if '/results/' in href and lottery_type_name.lower().replace(' ', '-') in href.lower():
-                full_url = href if href.startswith('http') else f"https://za.national-lottery.com{href}"
-                if full_url not in draw_links:
-                    draw_links.append(full_url)
-        
-        logger.info(f"Found {len(draw_links)} draw links for {lottery_type_name}")
-        
-        # Get first 10 draws
-        results = []
-        for i, draw_url in enumerate(draw_links[:10]):
-            try:
-                logger.info(f"  Fetching draw {i+1}: {draw_url}")
-                draw_response = requests.get(draw_url, headers=headers, timeout=20)
-                draw_response.raise_for_status()
-                
-                draw_soup = BeautifulSoup(draw_response.text, 'html.parser')
-                
-                # Extract draw data from the page
-                # This structure may vary, but typically includes:
-                # - Draw number/ID
-                # - Draw date
-                # - Winning numbers
-                # - Prize information
-                
-                result_data = {
-                    'url': draw_url,
-                    'html': str(draw_soup)[:5000],  # Save first 5000 chars for analysis
-                    'lottery_type': lottery_type_name
-                }
-                
-                results.append(result_data)
-                
-            except Exception as e:
-                logger.error(f"  Error fetching draw {i+1}: {str(e)}")
-                continue
-        
-        return results
-        
+
+
+def fetch_historical_results(lottery_type_url, lottery_type_name, max_draws=10, fetcher=None):
+    """
+    Fetch the draw pages linked from one results/archive page
+    """
+    fetcher = fetcher or HttpFetcher()
+    slug = LOTTERY_SLUGS[lottery_type_name]
+    try:
+        index = fetcher.get(lottery_type_url)
     except Exception as e:
         logger.error(f"Error fetching {lottery_type_name} results: {str(e)}")
         return []
+    links = draw_links(index.text, lottery_type_url, slug)[:max_draws]
+    return [
+        {'url': url, 'lottery_type': lottery_type_name, 'html': result.text,
+         'fetched_at': datetime.now().isoformat()}
+        for url, result in fetcher.fetch_many(links, max_age=DRAW_PAGE_MAX_AGE)
+        if not isinstance(result, Exception)
+    ]
 
-def main():
+
+def write_fixture_site(dump_path, directory):
+    """
+    Lay out the draw pages of a fetch dump (recent_draws_*.json) as the
+    results site, under their URL paths, with a yearly archive page per game
+    linking to them - serve it with python -m http.server for --base-url runs
+    """
+    with open(dump_path, 'r', encoding='utf-8') as f:
+        dump = json.load(f)
+
+    archives = {}
+    for game, pages in dump.items():
+        slug = LOTTERY_SLUGS.get(game)
+        for page in pages:
+            path = urlsplit(page.get('url', '')).path
+            match = re.search(rf'^/{re.escape(slug or "")}/results/\d{{1,2}}-({MONTHS})-(\d{{4}})$', path, re.I)
+            # Archive pages and truncated saves are not draw pages
+            if not slug or not match or '</html>' not in page['html'].lower():
+                continue
+            target = os.path.join(directory, path.lstrip('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(page['html'])
+            archives.setdefault((slug, match.group(2)), []).append(path)
+
+    for (slug, year), paths in archives.items():
+        target = os.path.join(directory, slug, 'results', f"{year}-archive")
+        links = '\n'.join(f'<li><a href="{path}">{path}</a></li>' for path in paths)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(f"<html><body><ul>\n{links}\n</ul></body></html>\n")
+    return sum(len(paths) for paths in archives.values())
+
+
+def main(argv=None):
     """
     Main function to scrape historical data for all lottery types
     """
-    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', nargs='+', default=list(LOTTERY_SLUGS), choices=list(LOTTERY_SLUGS),
+                        metavar='GAME', help='Lottery types (default: all)')
+    parser.add_argument('--years', nargs='+', type=int, default=[datetime.now().year],
+                        help='Archive years to scrape (default: this year)')
+    parser.add_argument('--max-draws', type=int, help='Most recent draws per game (default: all linked)')
+    parser.add_argument('--base-url', default=BASE_URL, help='Results site, or a local fixture server')
+    parser.add_argument('--output', help='Write pages to this NDJSON file instead of importing them')
+    parser.add_argument('--dry-run', action='store_true', help='Parse and validate without writing to the database')
+    parser.add_argument('--fixture-site', nargs=2, metavar=('DUMP', 'DIR'),
+                        help='Write the pages of a fetch dump to DIR as a local copy of the site, then exit')
+    args = parser.parse_args(argv)
+
+    if args.fixture_site:
+        written = write_fixture_site(*args.fixture_site)
+        print(f"Wrote {written} draw pages to {args.fixture_site[1]}")
+        return {'pages': written}
+
     logger.info("Starting historical lottery data scrape")
     logger.info("=" * 60)
-    
-    # Lottery types and their history URLs
-    lottery_types = {
-        'LOTTO': 'https://za.national-lottery.com/lotto/results/history',
-        'LOTTO PLUS 1': 'https://za.national-lottery.com/lotto-plus-1/results/history',
-        'LOTTO PLUS 2': 'https://za.national-lottery.com/lotto-plus-2/results/history',
-        'POWERBALL': 'https://za.national-lottery.com/powerball/results/history',
-        'POWERBALL PLUS': 'https://za.national-lottery.com/powerball-plus/results/history',
-        'DAILY LOTTO': 'https://za.national-lottery.com/daily-lotto/results/history'
-    }
-    
-    all_results = {}
-    
-    for lottery_name, history_url in lottery_types.items():
-        results = fetch_historical_results(history_url, lottery_name)
-        all_results[lottery_name] = results
-        logger.info(f"✅ Fetched {len(results)} draws for {lottery_name}")
-        logger.info("")
-    
-    # Save results to a JSON file for analysis
-    output_file = f"historical_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
-    
-    logger.info("=" * 60)
-    logger.info(f"✅ SCRAPE COMPLETE")
-    logger.info(f"Total draws fetched: {sum(len(v) for v in all_results.values())}")
-    logger.info(f"Data saved to: {output_file}")
-    
-    # Print summary
+    started = time.perf_counter()
+
+    with HttpFetcher() as fetcher:
+        pages = scrape_pages(args.games, args.years, args.max_draws, fetcher, args.base_url)
+        if args.output:
+            written = 0
+            with open(args.output, 'w', encoding='utf-8') as f:
+                for page in pages:
+                    f.write(json.dumps(page, ensure_ascii=False) + '\n')
+                    written += 1
+            summary = {'pages': written}
+        else:
+            from bulk_import import import_records
+            if not args.dry_run:
+                from db_migrations import run_migrations
+                run_migrations()
+            summary = import_records(pages, dry_run=args.dry_run)
+        stats = dict(fetcher.stats)
+
+    elapsed = time.perf_counter() - started
     print("\n" + "=" * 60)
     print("HISTORICAL DATA SCRAPE SUMMARY")
     print("=" * 60)
-    for lottery_name, results in all_results.items():
-        print(f"{lottery_name:20s}: {len(results):2d} draws")
+    print(f"HTTP requests:    {stats['requests']} ({stats['downloaded']} downloaded, "
+          f"{stats['not_modified']} not modified, {stats['errors']} failed)")
+    print(f"Cache hits:       {stats['cache_hits']}")
+    if args.output:
+        print(f"Pages saved:      {summary['pages']} -> {args.output}")
+    else:
+        print(f"Pages parsed:     {summary['read']}")
+        print(f"Valid draws:      {summary['valid']}")
+        print(f"Rejected:         {summary['rejected']}")
+        if not args.dry_run:
+            print(f"Inserted:         {summary['inserted']}")
+            print(f"Updated:          {summary['updated']}")
+            print(f"Unchanged:        {summary['unchanged']}")
+        for message in summary['rejections']:
+            print(f"  - {message}")
+    print(f"Time:             {elapsed:.1f}s")
     print("=" * 60)
-    
-    return all_results
+
+    return summary
+
 
 if __name__ == '__main__':
     main()
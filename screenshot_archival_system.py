@@ -4,12 +4,15 @@ Manages historical storage of lottery screenshots that yielded successful result
 """
 
 import os
-import shutil
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
 
+from archive_blobs import (sha256_file, perceptual_hash, store_blob, link_blob,
+                           PERCEPTUAL_DEDUP, PERCEPTUAL_MAX_DISTANCE)
+from archive_manifest import ArchiveManifest, remove_archived_files
+
 logger = logging.getLogger(__name__)
 
 class ScreenshotArchivalSystem:
@@ -20,6 +23,7 @@ class ScreenshotArchivalSystem:
     def __init__(self, archive_base_path: str = "screenshots_archive"):
         self.archive_base_path = archive_base_path
         self._ensure_archive_structure()
+        self.manifest = ArchiveManifest(archive_base_path)
     
     def _ensure_archive_structure(self):
         """Ensure the archive folder structure exists"""
@@ -40,25 +44,9 @@ class ScreenshotArchivalSystem:
             Boolean indicating if draw is already archived
         """
         try:
-            date_obj = datetime.strptime(draw_date, '%Y-%m-%d')
-            year = date_obj.strftime('%Y')
-            month = date_obj.strftime('%m')
-            day = date_obj.strftime('%d')
-            
-            archive_folder = os.path.join(self.archive_base_path, year, month, day)
-            
-            if not os.path.exists(archive_folder):
-                return False
-            
-            # Check for any existing archives matching lottery type and draw number
-            lottery_safe_name = lottery_type.replace(' ', '_').lower()
-            pattern = f"{draw_date}_{lottery_safe_name}_draw{draw_number}_"
-            
-            for filename in os.listdir(archive_folder):
-                if filename.startswith(pattern) and filename.endswith('.png'):
-                    logger.info(f"⏭️  Screenshot already archived for {lottery_type} Draw {draw_number}")
-                    return True
-            
+            if self.manifest.is_archived(lottery_type, draw_number, draw_date):
+                logger.info(f"⏭️  Screenshot already archived for {lottery_type} Draw {draw_number}")
+                return True
             return False
             
         except Exception as e:
@@ -121,8 +109,16 @@ class ScreenshotArchivalSystem:
             archived_filename = f"{draw_date}_{lottery_safe_name}_draw{draw_number}_{original_filename}"
             archived_path = os.path.join(archive_folder, archived_filename)
             
-            # Copy screenshot to archive
-            shutil.copy2(screenshot_path, archived_path)
+            # Store the content once by SHA-256 and hard-link it into the dated folder;
+            # an unchanged re-capture (or, with perceptual dedup, a visually identical
+            # one) reuses the existing blob instead of writing another copy
+            content_sha256 = sha256_file(screenshot_path)
+            phash = perceptual_hash(screenshot_path) if PERCEPTUAL_DEDUP else None
+            similar = self.manifest.find_similar(
+                lottery_type, draw_number, phash, PERCEPTUAL_MAX_DISTANCE) if phash else None
+            blob, content_sha256, stored_new = store_blob(
+                screenshot_path, self.archive_base_path, content_sha256, reuse_sha256=similar)
+            link_blob(blob, archived_path)
             
             # Create metadata file
             metadata = {
@@ -133,7 +129,9 @@ class ScreenshotArchivalSystem:
                 'database_id': database_id,
                 'original_filename': original_filename,
                 'archived_at': datetime.now().isoformat(),
-                'screenshot_size_bytes': os.path.getsize(screenshot_path)
+                'screenshot_size_bytes': os.path.getsize(blob),
+                'content_sha256': content_sha256,
+                'perceptual_hash': phash
             }
             
             metadata_filename = archived_filename.replace('.png', '_metadata.json')
@@ -142,13 +140,17 @@ class ScreenshotArchivalSystem:
             with open(metadata_path, 'w') as f:
                 json.dump(metadata, f, indent=2)
             
-            logger.info(f"✅ Archived screenshot: {archived_filename}")
+            self.manifest.add(metadata, archived_path, metadata_path)
+            
+            logger.info(f"✅ Archived screenshot: {archived_filename}"
+                        f"{'' if stored_new else ' (content already stored)'}")
             
             return {
                 'success': True,
                 'archived_path': archived_path,
                 'metadata_path': metadata_path,
-                'archive_folder': archive_folder
+                'archive_folder': archive_folder,
+                'deduplicated': not stored_new
             }
             
         except Exception as e:
@@ -177,50 +179,17 @@ class ScreenshotArchivalSystem:
         Returns:
             List of dictionaries with screenshot metadata
         """
-        archived_items = []
-        
         try:
-            # Determine search path
-            if year and month and day:
-                search_path = os.path.join(self.archive_base_path, year, month, day)
-            elif year and month:
-                search_path = os.path.join(self.archive_base_path, year, month)
-            elif year:
-                search_path = os.path.join(self.archive_base_path, year)
-            else:
-                search_path = self.archive_base_path
-            
-            if not os.path.exists(search_path):
-                return archived_items
-            
-            # Walk through archive folder
-            for root, dirs, files in os.walk(search_path):
-                for file in files:
-                    if file.endswith('_metadata.json'):
-                        metadata_path = os.path.join(root, file)
-                        
-                        try:
-                            with open(metadata_path, 'r') as f:
-                                metadata = json.load(f)
-                            
-                            # Apply lottery type filter if specified
-                            if lottery_type and metadata.get('lottery_type') != lottery_type:
-                                continue
-                            
-                            # Add file paths
-                            screenshot_filename = file.replace('_metadata.json', '')
-                            metadata['screenshot_path'] = os.path.join(root, screenshot_filename)
-                            metadata['metadata_path'] = metadata_path
-                            
-                            archived_items.append(metadata)
-                            
-                        except Exception as e:
-                            logger.warning(f"Failed to read metadata {metadata_path}: {e}")
-            
-            # Sort by date descending
-            archived_items.sort(key=lambda x: x.get('draw_date', ''), reverse=True)
+            # Draw dates are YYYY-MM-DD, so year/month/day filters are a prefix
+            date_prefix = None
+            if year:
+                date_prefix = year
+                if month:
+                    date_prefix += f"-{month}"
+                    if day:
+                        date_prefix += f"-{day}"
             
-            return archived_items
+            return self.manifest.entries(lottery_type=lottery_type, date_prefix=date_prefix)
             
         except Exception as e:
             logger.error(f"❌ Failed to retrieve archived screenshots: {e}")
@@ -234,41 +203,7 @@ class ScreenshotArchivalSystem:
             Dict with archive statistics
         """
         try:
-            all_archives = self.get_archived_screenshots()
-            
-            if not all_archives:
-                return {
-                    'total_screenshots': 0,
-                    'lottery_types': {},
-                    'oldest_date': None,
-                    'newest_date': None,
-                    'total_size_mb': 0
-                }
-            
-            lottery_counts = {}
-            total_size = 0
-            dates = []
-            
-            for archive in all_archives:
-                # Count by lottery type
-                lottery_type = archive.get('lottery_type', 'Unknown')
-                lottery_counts[lottery_type] = lottery_counts.get(lottery_type, 0) + 1
-                
-                # Track dates
-                if archive.get('draw_date'):
-                    dates.append(archive['draw_date'])
-                
-                # Sum file sizes
-                if os.path.exists(archive.get('screenshot_path', '')):
-                    total_size += os.path.getsize(archive['screenshot_path'])
-            
-            return {
-                'total_screenshots': len(all_archives),
-                'lottery_types': lottery_counts,
-                'oldest_date': min(dates) if dates else None,
-                'newest_date': max(dates) if dates else None,
-                'total_size_mb': round(total_size / (1024 * 1024), 2)
-            }
+            return {**self.manifest.statistics(), **self.manifest.storage_statistics()}
             
         except Exception as e:
             logger.error(f"❌ Failed to get archive statistics: {e}")
@@ -288,20 +223,10 @@ class ScreenshotArchivalSystem:
             cutoff_date = datetime.now() - timedelta(days=days_to_keep)
             cutoff_str = cutoff_date.strftime('%Y-%m-%d')
             
-            all_archives = self.get_archived_screenshots()
-            removed_count = 0
-            
-            for archive in all_archives:
-                if archive.get('draw_date', '9999-99-99') < cutoff_str:
-                    # Remove screenshot and metadata
-                    try:
-                        if os.path.exists(archive.get('screenshot_path', '')):
-                            os.remove(archive['screenshot_path'])
-                        if os.path.exists(archive.get('metadata_path', '')):
-                            os.remove(archive['metadata_path'])
-                        removed_count += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to remove old archive: {e}")
+            expired = self.manifest.entries(before_date=cutoff_str)
+            removed = remove_archived_files(expired, self.archive_base_path)
+            self.manifest.remove(removed)
+            removed_count = len(removed)
             
             logger.info(f"🗑️ Cleaned up {removed_count} old archived screenshots")
             
@@ -99,6 +99,20 @@ def capture_all_lottery_screenshots():
             'error': str(e)
         }
 
+def capture_lottery_screenshot(lottery_type, timestamp=None):
+    """
+    Capture one game's screenshot ('lotto', 'powerball_plus', ...)
+    Returns the screenshot path, or None when the capture failed
+    """
+    if not ROBUST_CAPTURE_AVAILABLE:
+        # Fallback mode: reuse the newest existing screenshot for the game
+        existing = sorted(glob.glob(os.path.join('screenshots', f"????????_??????_{lottery_type}.png")))
+        return existing[-1] if existing else None
+
+    import asyncio
+    from robust_screenshot_capture import capture_single_screenshot
+    return asyncio.run(capture_single_screenshot(lottery_type, timestamp))
+
 def cleanup_old_screenshots(days_old=7):
     """
     Clean up old screenshot files
@@ -125,6 +139,10 @@ def cleanup_old_screenshots(days_old=7):
         for filepath in screenshot_files:
             try:
                 os.remove(filepath)
+                # Crop region and page HTML recorded alongside the capture
+                for sidecar in (f"{filepath}.crop.json", f"{filepath}.html"):
+                    if os.path.exists(sidecar):
+                        os.remove(sidecar)
                 deleted_count += 1
                 logger.info(f"Deleted: {filepath}")
             except Exception as e:
@@ -152,4 +170,4 @@ def cleanup_old_screenshots(days_old=7):
         }
 
 # For compatibility with different import styles
-__all__ = ['capture_all_lottery_screenshots', 'cleanup_old_screenshots']
\ No newline at end of file
+__all__ = ['capture_all_lottery_screenshots', 'capture_lottery_screenshot', 'cleanup_old_screenshots']
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Screenshot Preprocessing
+Shrinks lottery screenshots before they are uploaded for AI extraction.
+
+Full-page captures are mostly navigation, adverts and footer. Each image is
+cropped to the results / prize-division region, downscaled to a width that
+keeps the smallest table text legible, and re-encoded as WebP (or optimised
+PNG), so far fewer bytes and image tokens go to the model per draw.
+
+Crop region, in order of preference:
+1. the DOM bounding box recorded next to the screenshot at capture time
+   (<screenshot>.crop.json, written by robust_screenshot_capture) - the
+   union of the draw header, balls and prize table boxes
+2. a stored template for the lottery type - fractions of the page
+   (left, top, right, bottom), from SCREENSHOT_CROP_TEMPLATES (a JSON file)
+3. no crop
+
+Without Pillow, or if anything fails, the original PNG is sent unchanged.
+"""
+
+import io
+import os
+import json
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+PREPROCESS_ENABLED = os.environ.get('SCREENSHOT_PREPROCESS', 'true').lower() == 'true'
+# Narrowest width at which the prize tables stay readable
+PREPROCESS_MAX_WIDTH = int(os.environ.get('SCREENSHOT_MAX_WIDTH', 1024))
+# Tall pages are split into tiles by the model anyway; cap the height too
+PREPROCESS_MAX_HEIGHT = int(os.environ.get('SCREENSHOT_MAX_HEIGHT', 3072))
+UPLOAD_FORMAT = os.environ.get('SCREENSHOT_UPLOAD_FORMAT', 'webp').lower()
+WEBP_QUALITY = int(os.environ.get('SCREENSHOT_WEBP_QUALITY', 90))
+CROP_TEMPLATES_PATH = os.environ.get('SCREENSHOT_CROP_TEMPLATES', 'screenshot_crop_templates.json')
+# Padding kept around a DOM bounding box, in CSS pixels
+CROP_MARGIN = 16
+
+# Parts of a results page the extraction needs, each as selectors to try in
+# order. The crop is the union of their boxes; a page missing a required part
+# is sent uncropped, since no single container is known to hold them all
+RESULTS_PARTS = {
+    'header': ['h1'],
+    'balls': ['#ballsCell', 'ul.balls'],
+    'prizes': ['table.prizebreakdown'],
+    'draw_info': ['.drawInfo'],
+}
+OPTIONAL_PARTS = ('draw_info',)
+
+MIME_TYPES = {'webp': 'image/webp', 'png': 'image/png'}
+
+_templates = None
+
+
+def crop_sidecar_path(screenshot_path: str) -> str:
+    return f"{screenshot_path}.crop.json"
+
+
+def _crop_templates() -> Dict:
+    global _templates
+    if _templates is None:
+        _templates = {}
+        if os.path.exists(CROP_TEMPLATES_PATH):
+            try:
+                with open(CROP_TEMPLATES_PATH, 'r') as f:
+                    _templates = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not load crop templates from {CROP_TEMPLATES_PATH}: {e}")
+    return _templates
+
+
+def crop_box(screenshot_path: str, lottery_type: str, image_size: Tuple[int, int]) -> Tuple[Optional[Tuple], str]:
+    """(left, top, right, bottom) pixel box and where it came from"""
+    width, height = image_size
+    sidecar = crop_sidecar_path(screenshot_path)
+    if os.path.exists(sidecar):
+        try:
+            with open(sidecar, 'r') as f:
+                region = json.load(f)
+            scale = region.get('device_scale_factor', 1)
+            box = (
+                max(0, int((region['x'] - CROP_MARGIN) * scale)),
+                max(0, int((region['y'] - CROP_MARGIN) * scale)),
+                min(width, int((region['x'] + region['width'] + CROP_MARGIN) * scale)),
+                min(height, int((region['y'] + region['height'] + CROP_MARGIN) * scale)),
+            )
+            if box[2] > box[0] and box[3] > box[1]:
+                return box, 'dom'
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable crop region {sidecar}: {e}")
+
+    template = _crop_templates().get(lottery_type)
+    if template:
+        left, top, right, bottom = template
+        return (int(left * width), int(top * height), int(right * width), int(bottom * height)), 'template'
+
+    return None, 'none'
+
+
+def prepare_for_extraction(screenshot_path: str, lottery_type: str) -> Tuple[bytes, str, Dict]:
+    """
+    Image bytes to upload, their MIME type, and a report of what was done:
+    {'crop', 'original_bytes', 'prepared_bytes', 'original_size', 'prepared_size', 'reduction_pct'}
+    """
+    with open(screenshot_path, 'rb') as f:
+        original = f.read()
+    report = {
+        'crop': 'none',
+        'original_bytes': len(original),
+        'prepared_bytes': len(original),
+        'original_size': None,
+        'prepared_size': None,
+        'reduction_pct': 0.0,
+    }
+    if not PREPROCESS_ENABLED or not PIL_AVAILABLE:
+        return original, 'image/png', report
+
+    try:
+        with Image.open(io.BytesIO(original)) as image:
+            image.load()
+            report['original_size'] = list(image.size)
+
+            box, report['crop'] = crop_box(screenshot_path, lottery_type, image.size)
+            if box:
+                image = image.crop(box)
+
+            # Downscale only - never enlarge a small capture
+            scale = min(1.0, PREPROCESS_MAX_WIDTH / image.width, PREPROCESS_MAX_HEIGHT / image.height)
+            if scale < 1.0:
+                image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                                     Image.LANCZOS)
+            report['prepared_size'] = list(image.size)
+
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            buffer = io.BytesIO()
+            fmt = UPLOAD_FORMAT if UPLOAD_FORMAT in MIME_TYPES else 'webp'
+            if fmt == 'webp':
+                image.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=6)
+            else:
+                image.save(buffer, format='PNG', optimize=True)
+            prepared = buffer.getvalue()
+
+    except Exception as e:
+        logger.warning(f"Preprocessing failed for {screenshot_path}, sending original: {e}")
+        return original, 'image/png', report
+
+    if len(prepared) >= len(original) and report['crop'] == 'none':
+        # Re-encoding alone did not help - keep the original bytes
+        return original, 'image/png', report
+
+    report['prepared_bytes'] = len(prepared)
+    report['reduction_pct'] = round((1 - len(prepared) / len(original)) * 100, 1) if original else 0.0
+    logger.info(f"Preprocessed {os.path.basename(screenshot_path)}: "
+                f"{report['original_bytes']:,} -> {report['prepared_bytes']:,} bytes "
+                f"({report['reduction_pct']}% smaller, crop: {report['crop']}, "
+                f"{report['original_size']} -> {report['prepared_size']})")
+    return prepared, MIME_TYPES[fmt], report
+
+
+async def _first_box(page, selectors) -> Optional[Dict]:
+    for selector in selectors:
+        try:
+            element = await page.query_selector(selector)
+            box = await element.bounding_box() if element else None
+            if box and box['width'] > 0 and box['height'] > 0:
+                return box
+        except Exception as e:
+            logger.debug(f"Results region lookup failed for {selector}: {e}")
+    return None
+
+
+async def record_results_region(page, screenshot_path: str, parts=None) -> Optional[Dict]:
+    """
+    Save the bounding box (page coordinates, CSS pixels) covering the draw
+    header, balls and prize table next to the screenshot, for cropping later.
+    Nothing is saved - so the image goes uncropped - unless every required
+    part is found.
+    """
+    boxes = {}
+    for part, selectors in (parts or RESULTS_PARTS).items():
+        box = await _first_box(page, selectors)
+        if box:
+            boxes[part] = box
+        elif part not in OPTIONAL_PARTS:
+            logger.info(f"No {part} element on the page - screenshot will not be cropped")
+            if os.path.exists(crop_sidecar_path(screenshot_path)):
+                os.remove(crop_sidecar_path(screenshot_path))
+            return None
+
+    try:
+        scroll = await page.evaluate("() => [window.scrollX, window.scrollY, window.devicePixelRatio]")
+        left = min(box['x'] for box in boxes.values())
+        top = min(box['y'] for box in boxes.values())
+        right = max(box['x'] + box['width'] for box in boxes.values())
+        bottom = max(box['y'] + box['height'] for box in boxes.values())
+        region = {
+            'parts': sorted(boxes),
+            'x': left + scroll[0],
+            'y': top + scroll[1],
+            'width': right - left,
+            'height': bottom - top,
+            'device_scale_factor': scroll[2],
+        }
+        with open(crop_sidecar_path(screenshot_path), 'w') as f:
+            json.dump(region, f)
+        return region
+    except Exception as e:
+        logger.debug(f"Could not record results region for {screenshot_path}: {e}")
+        return None
@@ -0,0 +1,36 @@
+// Snap Lotto ticket scanning jobs
+// /process-ticket answers 202 with a job id while the AI extraction runs in the
+// background. pollTicketJob() follows the job until it finishes and resolves to
+// a Response carrying the final JSON, so callers keep their existing handling:
+//   fetch('/process-ticket', {...}).then(pollTicketJob).then(response => ...)
+
+const TICKET_POLL_INTERVAL_MS = 1500;
+const TICKET_POLL_TIMEOUT_MS = 180000;
+
+function pollTicketJob(response) {
+    if (response.status !== 202) {
+        return Promise.resolve(response);
+    }
+
+    return response.json().then(function(job) {
+        const statusUrl = job.status_url || ('/process-ticket/status/' + job.job_id);
+        const deadline = Date.now() + TICKET_POLL_TIMEOUT_MS;
+
+        return new Promise(function(resolve, reject) {
+            function poll() {
+                fetch(statusUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+                    .then(function(statusResponse) {
+                        if (statusResponse.status !== 202) {
+                            resolve(statusResponse);
+                        } else if (Date.now() > deadline) {
+                            reject(new Error('Ticket scan is taking too long - please try again'));
+                        } else {
+                            setTimeout(poll, TICKET_POLL_INTERVAL_MS);
+                        }
+                    })
+                    .catch(reject);
+            }
+            setTimeout(poll, TICKET_POLL_INTERVAL_MS);
+        });
+    });
+}
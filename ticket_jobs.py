@@ -0,0 +1,254 @@
+"""
+Ticket Scanning Jobs
+Runs ticket AI extraction on a small background worker pool so scanner
+uploads never tie up web workers for the length of a Gemini call.
+
+/process-ticket submits a job and returns 202 straight away; clients poll
+/process-ticket/status/<job_id> for the result. Job state lives in the shared
+'ticket_jobs' cache namespace, which is always a shared backend (postgres or
+file, never per-process memory) so any gunicorn worker can answer a poll.
+"""
+
+import os
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.extras import RealDictCursor
+
+from cache_manager import get_cache_backend
+from db_pool import get_db_connection
+from lottery_numbers import MAIN_NUMBERS_SQL, BONUS_NUMBERS_SQL
+from match_scoring import score_ticket_lines
+
+logger = logging.getLogger(__name__)
+
+# Concurrent Gemini extractions per process
+TICKET_WORKERS = int(os.environ.get('TICKET_WORKERS', 2))
+# Jobs allowed to wait in this process before new uploads are turned away
+TICKET_MAX_PENDING = int(os.environ.get('TICKET_MAX_PENDING', 20))
+# How long finished jobs can still be polled
+TICKET_JOB_TTL = int(os.environ.get('TICKET_JOB_TTL', 3600))
+
+JOB_QUEUED = 'queued'
+JOB_PROCESSING = 'processing'
+JOB_COMPLETE = 'complete'
+JOB_FAILED = 'failed'
+
+_jobs = get_cache_backend('ticket_jobs', default_ttl=TICKET_JOB_TTL, shared=True)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+# One processor (and Gemini client) per worker thread, reused across jobs
+_thread_state = threading.local()
+
+
+class TicketQueueFull(Exception):
+    """Raised when too many ticket jobs are already waiting"""
+
+
+def _get_executor():
+    """Get this process's worker pool - a pool inherited through fork has no threads"""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=TICKET_WORKERS, thread_name_prefix='ticket-job')
+                _executor_pid = pid
+    return _executor
+
+
+def _get_processor():
+    processor = getattr(_thread_state, 'processor', None)
+    if processor is None:
+        from ai_lottery_processor import CompleteLotteryProcessor
+        processor = CompleteLotteryProcessor()
+        _thread_state.processor = processor
+    return processor
+
+
+def fetch_winning_numbers(ticket_data):
+    """
+    Look up winning numbers for every game on the ticket in a single query.
+
+    Each game is matched by the ticket's draw number first and then by its
+    draw date (ignored unless it is a valid YYYY-MM-DD date); a ticket with
+    neither gets the latest draw.
+    """
+    games = ticket_data.get('included_games') or []
+    if not games:
+        return {}
+
+    ticket_draw_date = ticket_data.get('draw_date')
+    ticket_draw_number = ticket_data.get('draw_number')
+    draw_number = _readable(ticket_draw_number) if ticket_draw_number else None
+    # Only a well-formed date reaches the query - a bad one must not fail the draw number match
+    try:
+        draw_date = datetime.strptime(str(ticket_draw_date).strip(), '%Y-%m-%d').date() if ticket_draw_date else None
+    except ValueError:
+        logger.info(f"Ignoring unreadable ticket draw date {ticket_draw_date!r}")
+        draw_date = None
+
+    if draw_number is not None or draw_date is not None:
+        query = f"""
+            SELECT DISTINCT ON (lottery_type) lottery_type, {MAIN_NUMBERS_SQL} AS main_numbers,
+                   {BONUS_NUMBERS_SQL} AS bonus_numbers, draw_number, draw_date
+            FROM lottery_results
+            WHERE lottery_type = ANY(%s)
+              AND (draw_number = %s OR draw_date = %s)
+            ORDER BY lottery_type, (draw_number = %s) IS TRUE DESC, id DESC
+        """
+        params = (games, draw_number, draw_date, draw_number)
+    else:
+        query = f"""
+            SELECT DISTINCT ON (lottery_type) lottery_type, {MAIN_NUMBERS_SQL} AS main_numbers,
+                   {BONUS_NUMBERS_SQL} AS bonus_numbers, draw_number, draw_date
+            FROM lottery_results
+            WHERE lottery_type = ANY(%s)
+            ORDER BY lottery_type, draw_date DESC, draw_number DESC
+        """
+        params = (games,)
+
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query, params)
+            rows = {row['lottery_type']: row for row in cur.fetchall()}
+
+    winning_numbers = {}
+    for game_type in games:
+        row = rows.get(game_type)
+        if row:
+            winning_numbers[game_type] = {
+                'main_numbers': list(row['main_numbers'] or []),
+                'bonus_numbers': list(row['bonus_numbers'] or []),
+                'draw_number': row['draw_number'],
+                'draw_date': str(row['draw_date']) if row['draw_date'] else None
+            }
+        else:
+            # No matching winning numbers found for this game type and date
+            winning_numbers[game_type] = {
+                'main_numbers': [],
+                'bonus_numbers': [],
+                'draw_number': ticket_draw_number,
+                'draw_date': ticket_draw_date,
+                'not_available': True
+            }
+    return winning_numbers
+
+
+def _readable(value):
+    """A ticket number as an int, or None where the extraction could not read it"""
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def score_ticket(ticket_data):
+    """
+    Per-line match counts for every game on the ticket that has winning numbers.
+    Numbers the extraction could not read are left out of a line and counted
+    in its 'unreadable_numbers'.
+    """
+    raw_lines = ticket_data.get('all_lines') or ([ticket_data['main_numbers']] if ticket_data.get('main_numbers') else [])
+    lines, unreadable = [], []
+    for line in raw_lines:
+        numbers = [_readable(n) for n in line] if isinstance(line, (list, tuple)) else [None]
+        lines.append([n for n in numbers if n is not None])
+        unreadable.append(numbers.count(None))
+    line_bonus = ticket_data.get('all_powerball')
+    line_bonus = [_readable(n) for n in line_bonus] if isinstance(line_bonus, (list, tuple)) else None
+
+    scores = {}
+    for game_type, winning in (ticket_data.get('winning_numbers') or {}).items():
+        if winning.get('not_available') or not winning.get('main_numbers'):
+            continue
+        scores[game_type] = score_ticket_lines(game_type, lines, winning['main_numbers'],
+                                               winning.get('bonus_numbers'), line_bonus)
+        for result in scores[game_type]:
+            if unreadable[result['line'] - 1]:
+                result['unreadable_numbers'] = unreadable[result['line'] - 1]
+    return scores
+
+
+def _update_job(job_id, **fields):
+    job = _jobs.get(job_id) or {'job_id': job_id}
+    job.update(fields)
+    _jobs.set(job_id, job)
+    return job
+
+
+def _run_ticket_job(job_id, file_path):
+    global _pending
+    _update_job(job_id, status=JOB_PROCESSING, started_at=datetime.now().isoformat())
+    try:
+        extracted_data = _get_processor().process_ticket_image(file_path)
+
+        if not extracted_data or extracted_data.get('error'):
+            error_msg = extracted_data.get('error') if extracted_data else None
+            _update_job(job_id, status=JOB_FAILED,
+                        error=error_msg or 'Could not extract lottery data from ticket image',
+                        finished_at=datetime.now().isoformat())
+            return
+
+        try:
+            extracted_data['winning_numbers'] = fetch_winning_numbers(extracted_data)
+        except Exception as e:
+            logger.error(f"Error fetching winning numbers: {e}")
+            extracted_data['winning_numbers'] = {}
+        try:
+            extracted_data['line_matches'] = score_ticket(extracted_data)
+        except Exception as e:
+            # The extracted numbers are still worth returning without match counts
+            logger.error(f"Error scoring ticket lines: {e}")
+            extracted_data['line_matches'] = {}
+
+        _update_job(job_id, status=JOB_COMPLETE, result=extracted_data,
+                    finished_at=datetime.now().isoformat())
+        logger.info(f"Ticket job {job_id} complete")
+
+    except Exception as e:
+        logger.error(f"Ticket job {job_id} failed: {e}")
+        _update_job(job_id, status=JOB_FAILED, error='An error occurred while processing your ticket',
+                    finished_at=datetime.now().isoformat())
+    finally:
+        with _pending_lock:
+            _pending -= 1
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+def submit_ticket_job(file_path):
+    """Queue a saved ticket image for extraction and return its job id"""
+    global _pending
+    with _pending_lock:
+        if _pending >= TICKET_MAX_PENDING:
+            raise TicketQueueFull(f"{_pending} ticket jobs already waiting")
+        _pending += 1
+
+    job_id = uuid.uuid4().hex
+    _update_job(job_id, status=JOB_QUEUED, submitted_at=datetime.now().isoformat())
+    try:
+        _get_executor().submit(_run_ticket_job, job_id, file_path)
+    except Exception:
+        with _pending_lock:
+            _pending -= 1
+        _jobs.delete(job_id)
+        raise
+
+    logger.info(f"Ticket job {job_id} queued for {file_path}")
+    return job_id
+
+
+def get_ticket_job(job_id):
+    """Get a job's state dict, or None if it is unknown or expired"""
+    return _jobs.get(job_id)